@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import time
+from rich.console import Console
+
+import config
+from tracing import tracer
+import event_loop
+
+class BatchRunner:
+    """
+    Runs every prompt of a JSONL file through its own agent, with at most `concurrency` prompts at once,
+    and appends one JSONL result per prompt: the answer, plan, critic loops, per-stage timings and token
+    counts. Prompts that already have a successful result in the output file are skipped, so an
+    interrupted run can simply be started again. The prompts run as tasks on the shared event loop.
+    """
+
+    def __init__(self, console: Console, agent_factory, concurrency: int = config.BATCH_CONCURRENCY):
+        self.console = console
+        self.agent_factory = agent_factory
+        self.concurrency = max(1, concurrency)
+
+    @staticmethod
+    def read_prompts(input_path: str) -> list:
+        """Returns (id, prompt) pairs. Lines may be {"id": ..., "prompt": ...} objects or plain JSON strings; ids default to the line number."""
+        prompts = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip(): continue
+                record = json.loads(line)
+                if isinstance(record, str): record = {"prompt": record}
+                prompts.append((str(record.get("id", number)), record["prompt"]))
+        return prompts
+
+    @staticmethod
+    def completed_ids(output_path: str) -> set:
+        """The ids with a successful result. A result cut off by an interruption is removed from the file."""
+        done = set()
+        if not os.path.exists(output_path): return done
+        with open(output_path, 'r+b') as f:
+            end = 0
+            for line in f:
+                if not line.endswith(b"\n"): break
+                end += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not record.get("error"): done.add(record["id"])
+            f.truncate(end)
+        return done
+
+    async def arun_prompt(self, prompt_id: str, prompt: str) -> dict:
+        """Answers one prompt without conversation history and returns its result record."""
+        result = {"id": prompt_id, "prompt": prompt, "answer": "", "plan": [], "critic_loops": 0}
+        start, first_token = time.perf_counter(), None
+        # The turn's spans are children of this one, so their timings and token counts can be collected.
+        with tracer.span("batch_prompt", prompt_id=prompt_id) as span:
+            tracer.watch_turn(span.turn_id)
+            try:
+                agent = await asyncio.to_thread(self.agent_factory, prompt_id) # Loads the session log and the journal
+                agent.conversation_history.clear()
+                async for item in agent.arun(prompt):
+                    if isinstance(item, str):
+                        if item and first_token is None: first_token = time.perf_counter() - start
+                    elif "plan" in item:
+                        result["plan"] = item["plan"]
+                result["answer"] = agent.full_response
+                result["critic_loops"] = agent.critic_loops
+            except Exception as e:
+                result["error"] = f"Error: {e}"
+            summary = tracer.turn_summary(span.turn_id)
+        result.update(seconds=round(time.perf_counter() - start, 3), ttft=round(first_token, 3) if first_token is not None else None,
+                      llm_calls=summary["llm_calls"], tokens=summary["tokens"],
+                      stages={stage: round(seconds, 3) for stage, seconds in summary["stages"].items()})
+        return result
+
+    def run(self, input_path: str, output_path: str) -> dict:
+        """Runs the prompts that have no result yet and returns throughput statistics for this run."""
+        prompts = self.read_prompts(input_path)
+        done = self.completed_ids(output_path)
+        pending = [(prompt_id, prompt) for prompt_id, prompt in prompts if prompt_id not in done]
+        self.console.print(f"Running {len(pending)} of {len(prompts)} prompts with concurrency {self.concurrency} ({len(done)} already done).")
+        stats = {"prompts": len(pending), "errors": 0, "seconds": 0.0}
+        start = time.perf_counter()
+        with open(output_path, 'a', encoding='utf-8') as out:
+            event_loop.run(self._arun_pending(pending, out, stats))
+        stats["seconds"] = time.perf_counter() - start
+        stats["prompts_per_minute"] = stats["prompts"] * 60 / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    async def _arun_pending(self, pending: list, out, stats: dict):
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def answer(prompt_id: str, prompt: str) -> dict:
+            async with slots:
+                return await self.arun_prompt(prompt_id, prompt)
+
+        # Results are written as soon as they finish, so an interruption loses only the prompts in progress.
+        for finished in asyncio.as_completed([answer(prompt_id, prompt) for prompt_id, prompt in pending]):
+            result = await finished
+            out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            if result.get("error"):
+                stats["errors"] += 1
+                self.console.print(f"[bold red]Prompt {result['id']} failed: {result['error']}[/bold red]")
+            else:
+                self.console.print(f"[dim]Prompt {result['id']} answered in {result['seconds']:.1f}s.[/dim]")
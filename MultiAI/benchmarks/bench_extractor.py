@@ -0,0 +1,120 @@
+"""
+Throughput benchmark for the streaming HTML text extractor against the BeautifulSoup extractor it replaced.
+Runs over a directory of saved pages (*.html), or over generated pages when none is given.
+Run from the MultiAI directory: python -m benchmarks.bench_extractor --corpus saved_pages/
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+AGENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, AGENT_DIR)
+
+from bs4 import BeautifulSoup
+from html_extractor import TextExtractor
+
+MAX_CHARS = 4000
+CHUNK_SIZE = 16384
+
+WORDS = "solar panel energy battery storage grid efficiency silicon cell voltage current inverter rooftop output research".split()
+
+def legacy_extract(html: str) -> str:
+    """The extractor scrape_webpage used before: a full BeautifulSoup tree, then the first MAX_CHARS characters."""
+    soup = BeautifulSoup(html, 'html.parser')
+    text = ' '.join(p.get_text() for p in soup.find_all(['p', 'h1', 'h2', 'h3']))
+    return re.sub(r'\s{2,}', ' ', text).strip()[:MAX_CHARS]
+
+def streaming_extract(html: str) -> tuple:
+    """Feeds the page in download-sized chunks; returns the text and the share of the page that was parsed."""
+    extractor, parsed = TextExtractor(MAX_CHARS), 0
+    for start in range(0, len(html), CHUNK_SIZE):
+        parsed = min(len(html), start + CHUNK_SIZE)
+        if extractor.feed(html[start:start + CHUNK_SIZE]): break
+    return extractor.text(), parsed / len(html) if html else 1.0
+
+def generate_page(rng: random.Random, paragraphs: int) -> str:
+    """A page shaped like a typical article: head, navigation, sidebar, the article itself, comments and a footer."""
+    def sentence(n=14):
+        return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(30))
+    article = "".join(f"<h2>{sentence(5)}</h2>" if i % 8 == 0 else f"<p>{' '.join(sentence() for _ in range(4))} <a href='/ref/{i}'>source</a></p>" for i in range(paragraphs))
+    return (f"<html><head><title>Article</title><style>{'body{margin:0}' * 200}</style><script>{'var x = 1;' * 500}</script></head><body>"
+            f'<header class="site-header"><nav><ul>{nav}</ul></nav></header>'
+            f'<div class="sidebar"><p>Subscribe to our newsletter for more.</p><ul>{nav}</ul></div>'
+            f"<main><article><h1>{sentence(6)}</h1>{article}</article></main>"
+            f'<div id="comments">{"".join(f"<p>{sentence()}</p>" for _ in range(50))}</div>'
+            f"<footer><p>Copyright and legal notices.</p><ul>{nav}</ul></footer></body></html>")
+
+def load_corpus(corpus: str | None, pages: int) -> list:
+    if corpus:
+        paths = sorted(glob.glob(os.path.join(corpus, "*.html")) + glob.glob(os.path.join(corpus, "*.htm")))
+        documents = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                documents.append(f.read())
+        return documents
+    rng = random.Random(7)
+    return [generate_page(rng, rng.choice([20, 80, 300, 1200])) for _ in range(pages)]
+
+def _word_overlap(a: str, b: str) -> float:
+    a, b = set(a.lower().split()), set(b.lower().split())
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def run_benchmark(corpus: str | None = None, pages: int = 40, repeat: int = 3) -> dict:
+    """Times both extractors over the corpus and compares their output."""
+    documents = load_corpus(corpus, pages)
+    total_bytes = sum(len(d.encode('utf-8')) for d in documents)
+    timings = {}
+    for name, extract in (("beautifulsoup", legacy_extract), ("streaming", streaming_extract)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs = [extract(d) for d in documents]
+        timings[name] = ((time.perf_counter() - start) / repeat, outputs)
+    legacy_seconds, legacy_outputs = timings["beautifulsoup"]
+    streaming_seconds, streaming_outputs = timings["streaming"]
+    return {
+        "pages": len(documents),
+        "megabytes": total_bytes / 1e6,
+        "beautifulsoup_pages_per_sec": len(documents) / legacy_seconds if legacy_seconds else 0.0,
+        "streaming_pages_per_sec": len(documents) / streaming_seconds if streaming_seconds else 0.0,
+        "speedup": legacy_seconds / streaming_seconds if streaming_seconds else 0.0,
+        "share_parsed": sum(parsed for _, parsed in streaming_outputs) / len(documents) if documents else 0.0,
+        "beautifulsoup_chars": sum(len(text) for text in legacy_outputs) / len(documents) if documents else 0.0,
+        "streaming_chars": sum(len(text) for text, _ in streaming_outputs) / len(documents) if documents else 0.0,
+        "word_overlap": sum(_word_overlap(a, b) for a, (b, _) in zip(legacy_outputs, streaming_outputs)) / len(documents) if documents else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming HTML extractor against BeautifulSoup.")
+    parser.add_argument("--corpus", help="Directory of saved pages (*.html); generated pages are used if omitted.")
+    parser.add_argument("--pages", type=int, default=40, help="Number of generated pages when no corpus is given.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus per extractor.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.corpus, args.pages, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+    table = Table(title=f"HTML extractor benchmark ({results['pages']} pages, {results['megabytes']:.1f} MB)")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("BeautifulSoup pages/s", f"{results['beautifulsoup_pages_per_sec']:.1f}")
+    table.add_row("Streaming pages/s", f"{results['streaming_pages_per_sec']:.1f}")
+    table.add_row("Speedup", f"{results['speedup']:.1f}x")
+    table.add_row("Share of each page parsed", f"{results['share_parsed']:.0%}")
+    table.add_row("Characters kept (BeautifulSoup)", f"{results['beautifulsoup_chars']:.0f}")
+    table.add_row("Characters kept (streaming)", f"{results['streaming_chars']:.0f}")
+    table.add_row("Word overlap of the outputs", f"{results['word_overlap']:.0%}")
+    Console().print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+End-to-end latency benchmark for ConversationalAgent.run against the fake Ollama server.
+Drives the full orchestrator -> specialists -> critic -> synthesizer pipeline offline.
+Run from the MultiAI directory: python -m benchmarks.bench_pipeline --turns 20
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+AGENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, AGENT_DIR)
+
+from benchmarks.fake_ollama import FakeOllama
+
+PROMPTS = [
+    "What are the latest developments in battery technology?",
+    "Explain how solar panels convert sunlight into electricity.",
+    "Compare the history of Rome and Athens.",
+    "Summarize the main causes of inflation.",
+]
+
+PLAN = {"plan": [
+    {"specialist": "Researcher", "query": "Find articles about the topic.", "tool": "web_search", "tool_query": "topic overview", "depends_on": []},
+    {"specialist": "Researcher", "query": "Find recent news about the topic.", "tool": "web_search", "tool_query": "topic news", "depends_on": []},
+    {"specialist": "Researcher", "query": "Based on the search results, provide a comprehensive answer.", "depends_on": [1, 2]},
+]}
+
+SPECIALIST_REPLY = " ".join(["The evidence shows a steady improvement in the field."] * 10)
+SYNTHESIZER_REPLY = " ".join(["Here is a clear and friendly explanation of the topic."] * 15)
+
+def scripted_responses() -> list:
+    """The scripted replies used for each pipeline stage, matched on the prompt text."""
+    return [
+        ("You are the Orchestrator", json.dumps(PLAN)),
+        ("You are the Critic", "Yes"),
+        ("Spokesperson", SYNTHESIZER_REPLY),
+    ]
+
+def _bench_tools(latency: float) -> dict:
+    def web_search(query: str) -> str:
+        time.sleep(latency)
+        return "\n".join(f"{i}. Result {i} for {query} (https://example.com/{i})" for i in range(1, 6))
+
+    def scrape_webpage(url: str) -> str:
+        time.sleep(latency)
+        return f"Content from '{url}' (first 4000 chars):\n{SPECIALIST_REPLY}"
+
+    return {
+        "web_search": {"func": web_search, "signature": "(query: str)", "docstring": "Performs a web search and returns the top 5 results."},
+        "scrape_webpage": {"func": scrape_webpage, "signature": "(url: str)", "docstring": "Scrapes the textual content of a webpage."},
+    }
+
+def _percentile(values: list, percent: float) -> float:
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def run_benchmark(turns: int = 10, ttft: float = 0.05, tokens_per_sec: float = 200.0, load_delay: float = 0.5, tool_latency: float = 0.2, use_cache: bool = False, use_scheduler: bool = False) -> dict:
+    """Runs the benchmark and returns latency percentiles, LLM calls and model loads per turn, and the prompt cache reuse."""
+    fake = FakeOllama(scripted_responses(), default_response=SPECIALIST_REPLY, ttft=ttft, tokens_per_sec=tokens_per_sec, load_delay=load_delay).start()
+    os.environ["OLLAMA_HOST"] = fake.url
+    workdir = tempfile.TemporaryDirectory()
+    previous_cwd = os.getcwd()
+    try:
+        # Import after OLLAMA_HOST is set, because the ollama package creates its default client on import.
+        from rich.console import Console
+        from main import ConversationalAgent
+        from memory.core_memory import CoreMemory
+        from memory.session_store import SessionStore
+        from orchestrator import Orchestrator
+        from synthesizer import Synthesizer
+        from response_cache import ResponseCache
+        from scheduler import ModelScheduler
+
+        os.chdir(workdir.name)
+        console = Console(quiet=True)
+        memory = CoreMemory("core_memory.txt")
+        memory.initialize_if_needed()
+        scheduler = ModelScheduler(console) if use_scheduler else None
+        orchestrator = Orchestrator(console, ResponseCache("response_cache.sqlite3", enabled=use_cache), scheduler)
+        agent = ConversationalAgent(console, memory, _bench_tools(tool_latency), orchestrator, Synthesizer(console, scheduler), is_gui_mode=True, session_store=SessionStore("sessions.jsonl"))
+
+        latencies, ttfts, calls, loads = [], [], [], []
+        for turn in range(turns):
+            agent.conversation_history.clear()
+            calls_before, loads_before = fake.generate_calls(), fake.loads
+            start, first_token = time.perf_counter(), None
+            for chunk in agent.run(PROMPTS[turn % len(PROMPTS)]):
+                if isinstance(chunk, str) and chunk and first_token is None:
+                    first_token = time.perf_counter() - start
+            latencies.append(time.perf_counter() - start)
+            ttfts.append(first_token or 0.0)
+            calls.append(fake.generate_calls() - calls_before)
+            loads.append(fake.loads - loads_before)
+        agent.session_store.close()
+    finally:
+        os.chdir(previous_cwd)
+        workdir.cleanup()
+        fake.stop()
+
+    return {
+        "turns": turns,
+        "latency_p50": _percentile(latencies, 50),
+        "latency_p95": _percentile(latencies, 95),
+        "ttft_p50": _percentile(ttfts, 50),
+        "ttft_p95": _percentile(ttfts, 95),
+        "llm_calls_per_turn": sum(calls) / len(calls) if calls else 0.0,
+        "model_loads_per_turn": sum(loads) / len(loads) if loads else 0.0,
+        "prompt_cache_reuse": 1 - fake.prompt_tokens[1] / fake.prompt_tokens[0] if fake.prompt_tokens[0] else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MultiAI pipeline against a fake Ollama server.")
+    parser.add_argument("--turns", type=int, default=10, help="Number of turns to run.")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Simulated time to first token in seconds.")
+    parser.add_argument("--tps", type=float, default=200.0, help="Simulated tokens per second.")
+    parser.add_argument("--load-delay", type=float, default=0.5, help="Simulated model load time in seconds.")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="Simulated latency of each tool call in seconds.")
+    parser.add_argument("--cache", action="store_true", help="Enable the response cache during the run.")
+    parser.add_argument("--scheduler", action="store_true", help="Route model calls through the residency-aware scheduler.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.turns, args.ttft, args.tps, args.load_delay, args.tool_latency, args.cache, args.scheduler)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+    table = Table(title=f"MultiAI pipeline benchmark ({results['turns']} turns)")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Turn latency p50", f"{results['latency_p50']:.3f}s")
+    table.add_row("Turn latency p95", f"{results['latency_p95']:.3f}s")
+    table.add_row("Time to first token p50", f"{results['ttft_p50']:.3f}s")
+    table.add_row("Time to first token p95", f"{results['ttft_p95']:.3f}s")
+    table.add_row("LLM calls per turn", f"{results['llm_calls_per_turn']:.1f}")
+    table.add_row("Model loads per turn", f"{results['model_loads_per_turn']:.1f}")
+    table.add_row("Prompt tokens reused from cache", f"{results['prompt_cache_reuse']:.0%}")
+    Console().print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOllama:
+    """
+    A local stand-in for the Ollama HTTP API with scripted responses and simulated latency.
+    Covers /api/generate (streaming and non-streaming), /api/ps and /api/embeddings. Like Ollama, each loaded
+    model keeps the tokens of its last prompt, and only the part of a new prompt after the shared prefix is evaluated.
+    Point the ollama client at it by setting OLLAMA_HOST to `url` before importing ollama.
+    """
+
+    def __init__(self, responses=None, default_response="OK", ttft=0.05, tokens_per_sec=200.0, load_delay=0.5, max_loaded_models=1, host="127.0.0.1", port=0, prompt_tokens_per_sec=None):
+        # responses: (substring, reply) pairs matched against the prompt in order; reply may be a str or a callable(prompt) -> str.
+        self.responses = list(responses or [])
+        self.default_response = default_response
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec # None evaluates prompts instantly
+        self._prompt_cache = {}
+        self.prompt_tokens = [0, 0] # tokens sent, tokens evaluated
+        self.load_delay = load_delay
+        self.max_loaded_models = max_loaded_models
+        self.loaded = OrderedDict()
+        self.loads = 0
+        self.calls = []
+        self.aborted = 0 # streams the client closed before the end
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def generate_calls(self) -> int:
+        """Returns the number of /api/generate requests that produced tokens."""
+        with self._lock:
+            return sum(1 for call in self.calls if call["endpoint"] == "generate" and call["prompt"])
+
+    def reply_for(self, prompt: str) -> str:
+        for needle, reply in self.responses:
+            if needle in prompt:
+                return reply(prompt) if callable(reply) else reply
+        return self.default_response
+
+    def load(self, model: str, keep_alive=None) -> float:
+        """Makes a model resident, sleeping for the simulated load delay if it was not. Returns the load time."""
+        with self._load_lock:
+            with self._lock:
+                if model in self.loaded:
+                    self.loaded.move_to_end(model)
+                    self.loaded[model] = _expiry(keep_alive)
+                    return 0.0
+            time.sleep(self.load_delay)
+            with self._lock:
+                self.loads += 1
+                self.loaded[model] = _expiry(keep_alive)
+                while len(self.loaded) > self.max_loaded_models:
+                    evicted, _ = self.loaded.popitem(last=False)
+                    self._prompt_cache.pop(evicted, None)
+            return self.load_delay
+
+    def evaluate_prompt(self, model: str, text: str) -> int:
+        """Returns the number of prompt tokens to evaluate, reusing the prefix shared with the model's previous prompt."""
+        tokens = _prompt_tokens(text)
+        with self._lock:
+            cached = self._prompt_cache.get(model, [])
+            self._prompt_cache[model] = tokens
+            self.prompt_tokens[0] += len(tokens)
+        shared = 0
+        for a, b in zip(tokens, cached):
+            if a != b: break
+            shared += 1
+        evaluated = max(1, len(tokens) - shared) if tokens else 0
+        with self._lock:
+            self.prompt_tokens[1] += evaluated
+        if self.prompt_tokens_per_sec: time.sleep(evaluated / self.prompt_tokens_per_sec)
+        return evaluated
+
+    def _record(self, endpoint: str, body: dict):
+        with self._lock:
+            self.calls.append({"endpoint": endpoint, "model": body.get("model"), "prompt": body.get("prompt", ""), "keep_alive": body.get("keep_alive"), "time": time.time()})
+
+    def _release(self, model: str, keep_alive):
+        if keep_alive in (0, "0", "0s"):
+            with self._lock:
+                self.loaded.pop(model, None)
+                self._prompt_cache.pop(model, None)
+
+def _expiry(keep_alive) -> str:
+    seconds = 300
+    if isinstance(keep_alive, (int, float)): seconds = keep_alive
+    elif isinstance(keep_alive, str) and re.fullmatch(r"-?\d+[smh]?", keep_alive):
+        seconds = int(keep_alive.rstrip("smh")) * {"s": 1, "m": 60, "h": 3600}.get(keep_alive[-1], 1)
+    if seconds < 0: seconds = 10 * 365 * 24 * 3600
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+def _prompt_tokens(text: str) -> list:
+    # The same word-piece approximation the agent uses to count the tokens it sends.
+    return re.findall(r"\w{1,4}|[^\w\s]", text)
+
+def _tokens(text: str) -> list:
+    return re.findall(r"\S+\s*|\s+", text)
+
+def _embedding(text: str, dimensions: int = 64) -> list:
+    """A deterministic bag-of-words embedding, so similar texts get similar vectors."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % dimensions] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def _make_handler(fake: FakeOllama):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload: dict, status: int = 200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, payload: dict):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/ps":
+                with fake._lock:
+                    models = [{"name": m, "model": m, "size": 0, "size_vram": 0, "expires_at": expires} for m, expires in fake.loaded.items()]
+                self._send_json({"models": models})
+            elif self.path == "/api/tags":
+                self._send_json({"models": []})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/api/generate": self._generate(body)
+            elif self.path == "/api/embeddings": self._embeddings(body)
+            else: self._send_json({"error": "not found"}, 404)
+
+        def _embeddings(self, body: dict):
+            fake._record("embeddings", body)
+            fake.load(body.get("model", ""), body.get("keep_alive"))
+            self._send_json({"embedding": _embedding(body.get("prompt", ""))})
+
+        def _generate(self, body: dict):
+            model, prompt = body.get("model", ""), body.get("prompt", "")
+            if not model:
+                return self._send_json({"error": "model is required"}, 400)
+            fake._record("generate", body)
+            start = time.perf_counter()
+            load_duration = fake.load(model, body.get("keep_alive"))
+            stats = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": True, "context": [],
+                     "load_duration": int(load_duration * 1e9)}
+
+            if not prompt:
+                # An empty prompt only loads the model, exactly like Ollama.
+                fake._release(model, body.get("keep_alive"))
+                return self._send_json({**stats, "response": "", "total_duration": int((time.perf_counter() - start) * 1e9)})
+
+            eval_start = time.perf_counter()
+            stats["prompt_eval_count"] = fake.evaluate_prompt(model, body.get("system", "") + "\n" + prompt)
+            stats["prompt_eval_duration"] = int((time.perf_counter() - eval_start) * 1e9)
+            tokens = _tokens(fake.reply_for(prompt))
+            if body.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(fake.ttft)
+                eval_start = time.perf_counter()
+                try:
+                    for i, token in enumerate(tokens):
+                        if i: time.sleep(1.0 / fake.tokens_per_sec)
+                        self._write_chunk({"model": model, "created_at": stats["created_at"], "response": token, "done": False})
+                    self._write_chunk({**stats, "response": "", "eval_count": len(tokens), "eval_duration": int((time.perf_counter() - eval_start) * 1e9),
+                                       "total_duration": int((time.perf_counter() - start) * 1e9)})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with fake._lock: fake.aborted += 1
+            else:
+                time.sleep(fake.ttft + max(0, len(tokens) - 1) / fake.tokens_per_sec)
+                self._send_json({**stats, "response": "".join(tokens), "eval_count": len(tokens), "total_duration": int((time.perf_counter() - start) * 1e9)})
+            fake._release(model, body.get("keep_alive"))
+
+    return Handler
@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+
+_current_token = contextvars.ContextVar("cancellation_token", default=None)
+
+class CancellationToken:
+    """
+    Lets another thread, such as the GUI's Stop button or the server's cancel endpoint, stop a turn. Cancelling
+    cancels the asyncio task the token is bound to, which closes its streams to Ollama and its HTTP requests,
+    and calls the callbacks registered by work that asyncio cannot interrupt, such as subprocesses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set(): return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass # A failed callback must not keep the others from stopping their work
+
+    def on_cancel(self, callback):
+        """Calls `callback` once the token is cancelled, or right away if it already is. Returns a function that unregisters it."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks: self._callbacks.remove(callback)
+
+    @contextmanager
+    def bind(self):
+        """
+        Makes this the current token for the enclosed block, including worker threads started from it with
+        asyncio.to_thread. Inside a task, cancelling the token also cancels the task.
+        """
+        context_token = _current_token.set(self)
+        try:
+            task, loop = asyncio.current_task(), asyncio.get_running_loop()
+        except RuntimeError:
+            task = None # Synchronous code can only poll the token
+        unregister = self.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel)) if task else (lambda: None)
+        try:
+            yield self
+        finally:
+            unregister()
+            try:
+                _current_token.reset(context_token)
+            except ValueError:
+                pass # The block was closed from another context, e.g. an abandoned generator
+
+def current() -> CancellationToken | None:
+    """The token of the turn the calling code runs in, if any."""
+    return _current_token.get()
+
+def cancelled() -> bool:
+    """Whether the turn the calling code runs in has been cancelled."""
+    token = _current_token.get()
+    return token is not None and token.cancelled
@@ -0,0 +1,131 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from rich.console import Console
+
+import config
+from tracing import tracer
+import event_loop
+
+# Pieces of up to four word characters, or single punctuation marks, track BPE token counts closely.
+_APPROX_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_encoding = None
+
+def _tokenizer():
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if config.CONTEXT_USE_TIKTOKEN:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                pass # tiktoken is optional; the approximation is used without it
+    return _encoding
+
+def approximate_tokens(text: str) -> int:
+    return len(_APPROX_TOKEN.findall(text))
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken if it is installed, otherwise with a fast local approximation."""
+    if not text: return 0
+    encoding = _tokenizer()
+    return len(encoding.encode(text, disallowed_special=())) if encoding else approximate_tokens(text)
+
+class ContextAssembler:
+    """
+    Fits each section of a prompt into its token budget (CONTEXT_BUDGETS) before it is sent to a model.
+    Oversized sections are truncated, keeping the start or, for histories and logs, the most recent end;
+    with CONTEXT_SUMMARIZE on they are summarized by a small model instead, and summaries are cached.
+    """
+
+    # Sections where the most recent text matters most are cut from the front.
+    KEEP_END = {"history", "failed_attempts"}
+
+    def __init__(self, console: Console, orchestrator=None, summarize: bool = config.CONTEXT_SUMMARIZE, budgets: dict = config.CONTEXT_BUDGETS):
+        self.console = console
+        self.orchestrator = orchestrator
+        self.summarize = summarize
+        self.budgets = budgets
+        self._lock = threading.Lock()
+        self._summaries = OrderedDict()
+        self.stats = {"sections": 0, "tokens_in": 0, "tokens_out": 0, "summaries": 0, "summary_cache_hits": 0}
+
+    def fit(self, section: str, text: str) -> str:
+        """Synchronous afit, run on the shared event loop."""
+        return event_loop.run(self.afit(section, text))
+
+    async def afit(self, section: str, text: str) -> str:
+        """Returns the text of a section within its budget. Summarizing awaits the model instead of blocking the event loop."""
+        budget = self.budgets.get(section)
+        if not text or not budget: return text
+        # Most sections are far below budget, so the cheap approximation can skip the exact count.
+        if approximate_tokens(text) < budget // 2: return text
+        tokens = count_tokens(text)
+        if tokens <= budget: return text
+
+        fitted = await self._summarize(section, text, budget) if self.summarize and self.orchestrator else None
+        if fitted is None: fitted = self._truncate(text, tokens, budget, keep_end=section in self.KEEP_END)
+        self._record(section, tokens, count_tokens(fitted))
+        return fitted
+
+    def history(self, messages: list) -> str:
+        """Formats conversation messages, keeping as many of the most recent ones as fit in the history budget."""
+        lines = [f"{message['role']}: {message['content']}" for message in messages]
+        budget = self.budgets.get("history")
+        if not budget: return "\n".join(lines)
+        counts = [count_tokens(line) for line in lines]
+        kept, used = [], 0
+        for line, tokens in zip(reversed(lines), reversed(counts)):
+            if used + tokens > budget:
+                # The latest message alone is over budget: keep its end rather than nothing.
+                if not kept: kept.append(self._truncate(line, tokens, budget, keep_end=True))
+                break
+            kept.append(line)
+            used += tokens
+        if len(kept) < len(lines) or used > budget: self._record("history", sum(counts), count_tokens("\n".join(kept)))
+        return "\n".join(reversed(kept))
+
+    def _truncate(self, text: str, tokens: int, budget: int, keep_end: bool) -> str:
+        marker = f"\n[... {tokens - budget} tokens omitted ...]\n"
+        budget = max(0, budget - count_tokens(marker)) # The marker counts against the budget too
+        length = int(len(text) * budget / tokens)
+        while length > 0:
+            kept = text[-length:] if keep_end else text[:length]
+            if count_tokens(kept) <= budget: break
+            length = int(length * 0.9)
+        else:
+            kept = ""
+        return marker.lstrip("\n") + kept if keep_end else kept + marker.rstrip("\n")
+
+    async def _summarize(self, section: str, text: str, budget: int) -> str | None:
+        key = hashlib.sha256(f"{section}\0{budget}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                self.stats["summary_cache_hits"] += 1
+                return self._summaries[key]
+        prompt = f"""Summarize the following text in at most {int(budget * 0.75)} words. Keep every fact, name, number and URL that could help answer a question; drop repetition and boilerplate. Respond with ONLY the summary.
+---
+{text}
+---"""
+        with tracer.span("summarize", section=section, model=config.MODEL_CONTEXT_SUMMARIZER):
+            summary = await self.orchestrator.acall_ai(prompt, config.MODEL_CONTEXT_SUMMARIZER, options={"num_predict": budget})
+        if not summary or summary.startswith("Error") or count_tokens(summary) > budget: return None
+        with self._lock:
+            self._summaries[key] = summary
+            self.stats["summaries"] += 1
+            while len(self._summaries) > config.CONTEXT_SUMMARY_CACHE_SIZE: self._summaries.popitem(last=False)
+        return summary
+
+    def _record(self, section: str, tokens_in: int, tokens_out: int):
+        with self._lock:
+            self.stats["sections"] += 1
+            self.stats["tokens_in"] += tokens_in
+            self.stats["tokens_out"] += tokens_out
+        tracer.increment(f"context_{section}_tokens_saved", max(0, tokens_in - tokens_out))
+
+    def tokens_saved(self) -> int:
+        with self._lock:
+            return self.stats["tokens_in"] - self.stats["tokens_out"]
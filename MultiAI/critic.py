@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from rich.console import Console
+
+import config
+from tracing import tracer
+import event_loop
+
+_REPORT_HEADER = re.compile(r"^--- Report from Step \d+ \(.*?\) ---$", re.MULTILINE)
+_SEARCH_RESULT = re.compile(r"^\d+\.\s.*\(https?://\S+\)$")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "about", "is", "are", "was", "were", "be",
+    "what", "who", "how", "why", "when", "where", "which", "do", "does", "did", "can", "could", "me", "my", "i", "you",
+    "your", "it", "its", "this", "that", "please", "tell", "explain", "give", "find", "latest",
+}
+
+def _report_bodies(specialist_reports: str) -> list:
+    return [body.strip() for body in _REPORT_HEADER.split(specialist_reports or "") if body.strip()]
+
+def _keywords(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1}
+
+def _is_error(body: str) -> bool:
+    return body.startswith("Error") or body == "No search results found."
+
+def _is_search_list(body: str) -> bool:
+    lines = [line.strip() for line in body.splitlines() if line.strip()]
+    return bool(lines) and all(_SEARCH_RESULT.match(line) for line in lines)
+
+def heuristic_verdict(user_prompt: str, specialist_reports: str, approve: bool = config.CRITIC_HEURISTIC_APPROVE) -> bool | None:
+    """
+    Judges the reports with local checks only. Returns False for reports that cannot be an answer
+    (empty, only tool errors, only search-result lists, or mostly a repeat of the prompt) and None
+    when a model has to decide. Only with `approve` does it return True, for long, error-free reports
+    that cover the prompt's keywords; keyword overlap alone does not show that the request was answered.
+    """
+    bodies = _report_bodies(specialist_reports)
+    useful = [body for body in bodies if not _is_error(body)]
+    if not useful: return False
+    if all(_is_search_list(body) for body in useful): return False
+
+    answer = [body for body in useful if not _is_search_list(body)]
+    prompt_words = _keywords(user_prompt)
+    answer_words = _keywords(" ".join(answer))
+    if answer_words and len(answer_words - prompt_words) < config.CRITIC_MIN_NEW_WORDS: return False
+
+    if not approve: return None
+    word_count = sum(len(body.split()) for body in answer)
+    coverage = len(prompt_words & answer_words) / len(prompt_words) if prompt_words else 0.0
+    if len(useful) == len(bodies) and word_count >= config.CRITIC_APPROVE_MIN_WORDS and len(prompt_words) >= 2 and coverage >= config.CRITIC_APPROVE_COVERAGE:
+        return True
+    return None
+
+def _answer_verdict(response: str) -> bool | None:
+    words = _WORD.findall(response.lower())
+    if not words or response.startswith("Error"): return None
+    if words[0] == "yes": return True
+    if words[0] == "no": return False
+    return None
+
+class Critic:
+    """
+    Decides whether the specialist reports answer the user's request, using the cheapest tier that is sure:
+    local heuristics, then a small model on truncated reports, then the full critic model.
+    """
+
+    TIERS = ("heuristic", "fast", "full")
+
+    def __init__(self, console: Console, orchestrator, tiers: tuple = tuple(config.CRITIC_TIERS), context=None):
+        self.console = console
+        self.orchestrator = orchestrator
+        self.context = context
+        self.tiers = [tier for tier in tiers if tier in self.TIERS] or ["full"]
+        self._lock = threading.Lock()
+        self.stats = {tier: {"calls": 0, "decisions": 0, "approved": 0, "seconds": 0.0} for tier in self.TIERS}
+
+    def _prompt(self, user_prompt: str, specialist_reports: str, allow_unsure: bool) -> str:
+        answers = '"Yes", "No" or "Unsure"' if allow_unsure else '"Yes" or "No"'
+        return f"""You are the Critic. Your job is to determine if the final report successfully and completely fulfilled the user's original request. The report MUST be helpful and directly address the query. A list of search results is NOT a complete answer.
+**User's Original Request:** "{user_prompt}"
+**Final Report:** {specialist_reports if specialist_reports else "No reports were generated."}
+Does the final report adequately fulfill the user's request? Your answer MUST be a single word: {answers}.
+"""
+
+    async def _request(self, tier: str, user_prompt: str, specialist_reports: str) -> tuple:
+        """The prompt and model for a model tier: the fast tier sees truncated reports, the full tier fitted ones."""
+        if tier == "fast":
+            return self._prompt(user_prompt, specialist_reports[:config.CRITIC_FAST_MAX_CHARS], allow_unsure=True), config.MODEL_CRITIC_FAST
+        if self.context: specialist_reports = await self.context.afit("critic_reports", specialist_reports)
+        return self._prompt(user_prompt, specialist_reports, allow_unsure=False), config.MODEL_RESEARCHER
+
+    @staticmethod
+    def _parse(tier: str, response: str) -> bool | None:
+        return _answer_verdict(response) if tier == "fast" else "yes" in response.lower()
+
+    async def _aask(self, tier: str, user_prompt: str, specialist_reports: str) -> bool | None:
+        if tier == "heuristic": return heuristic_verdict(user_prompt, specialist_reports)
+        prompt, model = await self._request(tier, user_prompt, specialist_reports)
+        return self._parse(tier, await self.orchestrator.acall_ai(prompt, model, options={"num_predict": config.CRITIC_NUM_PREDICT}))
+
+    def review(self, user_prompt: str, specialist_reports: str) -> bool:
+        """Synchronous areview, run on the shared event loop."""
+        return event_loop.run(self.areview(user_prompt, specialist_reports))
+
+    async def areview(self, user_prompt: str, specialist_reports: str) -> bool:
+        """Returns True if the reports fulfil the request. The last tier always decides."""
+        for position, tier in enumerate(self.tiers):
+            started = time.perf_counter()
+            with tracer.span("critic_tier", tier=tier) as span:
+                verdict = self._settle(position, tier, await self._aask(tier, user_prompt, specialist_reports), started, span)
+            if verdict is not None: return verdict
+        return False
+
+    def _settle(self, position: int, tier: str, verdict: bool | None, started: float, span) -> bool | None:
+        if verdict is None and position == len(self.tiers) - 1: verdict = False
+        span.set(verdict=verdict)
+        self._record(tier, verdict, time.perf_counter() - started)
+        if verdict is not None: self.console.print(f"[dim]Critic decided at the {tier} tier.[/dim]")
+        return verdict
+
+    def _record(self, tier: str, verdict: bool | None, seconds: float):
+        with self._lock:
+            stats = self.stats[tier]
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            if verdict is not None:
+                stats["decisions"] += 1
+                stats["approved"] += int(verdict)
+        tracer.increment(f"critic_{tier}_calls")
+        if verdict is not None: tracer.increment(f"critic_{tier}_decisions")
+
+    def summary(self) -> dict:
+        """Per tier: how often it was consulted, the share of those calls it decided, and its average latency."""
+        with self._lock:
+            return {tier: {"calls": s["calls"], "decisions": s["decisions"], "approved": s["approved"],
+                           "decision_rate": s["decisions"] / s["calls"] if s["calls"] else 0.0,
+                           "avg_seconds": s["seconds"] / s["calls"] if s["calls"] else 0.0}
+                    for tier, s in self.stats.items()}
@@ -0,0 +1,115 @@
+import asyncio
+import atexit
+import queue
+import threading
+from contextlib import aclosing
+
+import cancellation
+
+# Synchronous callers, such as the GUI's worker thread, the server's request threads and the batch runner, run
+# their async work as tasks on this one loop, so clients and connection pools bound to it live as long as the process.
+_loop = None
+_thread = None
+_lock = threading.Lock()
+_shutdown_callbacks = []
+
+def shared_loop() -> asyncio.AbstractEventLoop:
+    """The shared event loop, started in a daemon thread on first use and stopped at exit."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="event-loop", daemon=True)
+            _thread.start()
+            atexit.register(shutdown)
+        return _loop
+
+def is_shared(loop: asyncio.AbstractEventLoop) -> bool:
+    """Whether `loop` is the shared loop, as opposed to one of asyncio.run, e.g. in a test."""
+    return loop is not None and loop is _loop
+
+def on_shutdown(callback):
+    """Registers a coroutine function to await when the shared loop stops, e.g. to close a client bound to it."""
+    with _lock: _shutdown_callbacks.append(callback)
+
+def run(coroutine):
+    """
+    Runs a coroutine on the shared loop from synchronous code and returns its result. The coroutine sees the
+    caller's context variables, such as the current span, and cancelling the caller's turn cancels it.
+    """
+    loop = shared_loop()
+    if _on_loop(loop):
+        coroutine.close()
+        raise RuntimeError("Waiting for the shared event loop from its own thread would block it; await the coroutine instead.")
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    token = cancellation.current()
+    stop_on_cancel = token.on_cancel(future.cancel) if token else (lambda: None)
+    try:
+        return future.result()
+    finally:
+        stop_on_cancel()
+
+def iterate(async_generator):
+    """Iterates an async generator from synchronous code; closing the iterator early stops the generator."""
+    loop = shared_loop()
+    if _on_loop(loop): raise RuntimeError("Waiting for the shared event loop from its own thread would block it; iterate with async for instead.")
+    items, started, finished = queue.Queue(), threading.Event(), threading.Event()
+
+    async def pump():
+        # A single task drives the generator, so context variables such as the current span carry across its items.
+        started.set()
+        try:
+            async with aclosing(async_generator):
+                async for item in async_generator: items.put(("item", item))
+        except Exception as e:
+            items.put(("error", e))
+        finally:
+            items.put(("end", None))
+            finished.set()
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            kind, payload = items.get()
+            if kind == "error": raise payload
+            if kind == "end": return
+            yield payload
+    finally:
+        # A caller that stops reading, such as a client that disconnected, stops the generator and the work it started.
+        if not future.done():
+            future.cancel()
+            if started.is_set(): finished.wait()
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+def shutdown():
+    """Cancels the tasks still running on the shared loop, awaits the shutdown callbacks and stops the loop."""
+    global _loop, _thread
+    with _lock:
+        loop, thread, _loop, _thread = _loop, _thread, None, None
+        callbacks = list(_shutdown_callbacks)
+        _shutdown_callbacks.clear()
+    if loop is None: return
+
+    async def stop():
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception:
+                pass # A client that cannot be closed cleanly must not keep the others open
+        await loop.shutdown_asyncgens()
+
+    try:
+        asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=5)
+    except Exception:
+        pass # Exiting anyway; whatever is left is dropped with the process
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    if not loop.is_running(): loop.close()
@@ -6,6 +6,7 @@ from queue import Queue
 from tkinter import Menu
 from spellchecker import SpellChecker
 from rich.console import Console
+from cancellation import CancellationToken
 
 class Theme:
     BACKGROUND = "#171717"
@@ -63,6 +64,9 @@ class MultiAIGUI(ctk.CTk):
 
         self.send_btn = ctk.CTkButton(self.input_frame, text="↑", width=30, height=30, font=ctk.CTkFont(size=20), fg_color="#3c3c3c", text_color=Theme.TEXT, hover_color="#4a4a4a", corner_radius=15, command=self.send_message)
         self.send_btn.pack(side="right", padx=(0, 10), pady=10)
+        self.stop_btn = ctk.CTkButton(self.input_frame, text="■", width=30, height=30, font=ctk.CTkFont(size=14), fg_color="#2a2a2a", text_color=Theme.TEXT, hover_color="#4a4a4a", corner_radius=15, state="disabled", command=self.stop_response)
+        self.stop_btn.pack(side="right", padx=(0, 5), pady=10)
+        self.cancel_token = None
         
         # --- THE DEFINITIVE FIX: Use foreground color for misspelled words ---
         self.input_box.tag_config("misspelled", foreground="red")
@@ -76,6 +80,7 @@ class MultiAIGUI(ctk.CTk):
     def _check_spelling(self, event=None):
         self.input_box.tag_remove("misspelled", "1.0", "end")
         text = self.input_box.get("1.0", "end-1c")
+        if self.agent.prewarmer and event is not None and event.keysym != "Return": self.agent.prewarmer.on_draft(text)
         for match in re.finditer(r'\w+', text):
             word = match.group()
             if self.spell.unknown([word]):
@@ -174,19 +179,29 @@ class MultiAIGUI(ctk.CTk):
         if event and event.keysym == "Return":
             user_bubble = self.add_message("You", user_msg)
             self._clear_input_box()
-            self.send_btn.configure(state="disabled", fg_color="#2a2a2a")
-            threading.Thread(target=self.get_ai_response, args=(user_msg, user_bubble), daemon=True).start()
+            self._start_response(user_msg, user_bubble)
             return "break"
         
         user_bubble = self.add_message("You", user_msg)
         self._clear_input_box()
+        self._start_response(user_msg, user_bubble)
+
+    def _start_response(self, user_msg, user_bubble):
         self.send_btn.configure(state="disabled", fg_color="#2a2a2a")
-        threading.Thread(target=self.get_ai_response, args=(user_msg, user_bubble), daemon=True).start()
+        self.cancel_token = CancellationToken()
+        self.stop_btn.configure(state="normal", fg_color="#3c3c3c")
+        threading.Thread(target=self.get_ai_response, args=(user_msg, user_bubble, self.cancel_token), daemon=True).start()
+
+    def stop_response(self):
+        """Stops the response in progress, closing its model streams and killing its tools."""
+        if self.cancel_token: self.cancel_token.cancel()
+        self.stop_btn.configure(state="disabled", fg_color="#2a2a2a")
+        self.status_label.configure(text="Stopping...")
 
     def _clear_input_box(self):
         self.input_box.delete("1.0", "end")
 
-    def get_ai_response(self, user_msg, user_bubble):
+    def get_ai_response(self, user_msg, user_bubble, cancel_token=None):
         streaming_bubble, streaming_label, full_response_text = None, None, ""
         try:
             self._update_ui_safely(self.status_label.grid, row=0, column=0, pady=(0, 10), sticky="ew")
@@ -194,7 +209,7 @@ class MultiAIGUI(ctk.CTk):
             self._update_ui_safely(self._create_streaming_bubble, widget_queue)
             streaming_bubble, streaming_label = widget_queue.get()
             
-            response_generator = self.agent.run(user_msg)
+            response_generator = self.agent.run(user_msg, cancel_token=cancel_token)
             
             for chunk in response_generator:
                 if isinstance(chunk, dict):
@@ -202,6 +217,10 @@ class MultiAIGUI(ctk.CTk):
                         self._update_ui_safely(self.status_label.configure, text=chunk['status'])
                     elif 'correction' in chunk:
                         self._update_ui_safely(self.add_correction_note, user_bubble, chunk['correction'])
+                    elif 'progress' in chunk:
+                        progress = chunk['progress']
+                        latest = " ".join(progress['text'].split())[-80:]
+                        self._update_ui_safely(self.status_label.configure, text=f"Step {progress['step']}: {progress['specialist']} is writing... {latest}")
                 elif isinstance(chunk, str):
                     full_response_text += chunk
                     self._update_ui_safely(streaming_label.configure, text=full_response_text)
@@ -213,7 +232,9 @@ class MultiAIGUI(ctk.CTk):
         finally:
             if streaming_bubble: self._update_ui_safely(streaming_bubble.destroy)
             if full_response_text: self._update_ui_safely(self.add_message, "AI", full_response_text)
+            if cancel_token and cancel_token.cancelled: self._update_ui_safely(self.add_message, "System", "Response stopped.")
             self._update_ui_safely(self.send_btn.configure, state="normal", fg_color="#3c3c3c")
+            self._update_ui_safely(self.stop_btn.configure, state="disabled", fg_color="#2a2a2a")
             self._update_ui_safely(self.status_label.grid_remove)
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+import re
+from html.parser import HTMLParser
+
+import config
+
+# Elements whose content is never page text.
+_SKIP_TAGS = {"head", "script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "header", "footer", "aside", "form", "button", "select", "textarea"}
+# Elements that start a new block of text.
+_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "dd", "dt", "blockquote", "pre", "td", "th", "figcaption", "caption",
+               "div", "section", "article", "main", "body", "ul", "ol", "dl", "table", "tr", "figure"}
+_TEXT_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Containers whose class or id marks them as navigation, ads and the like.
+_BOILERPLATE = re.compile(r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|sidebar|footer|header|cookies?|consent|banner|share|social|comments?|related|advert|ads|promo|newsletter|subscribe|popup|modal)($|[\s_-])", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+class _BudgetReached(Exception):
+    pass
+
+class TextExtractor(HTMLParser):
+    """
+    Extracts the readable text of an HTML page while it is still arriving: feed() takes the page chunk by chunk
+    and returns True once `max_chars` characters have been collected, so the rest need not be downloaded or
+    parsed. Navigation, scripts and containers marked as boilerplate are skipped, and so are blocks that are
+    mostly link text, such as menus and tag lists, or that are too short to be prose.
+    """
+
+    def __init__(self, max_chars: int = config.SCRAPE_MAX_CHARS, min_block_chars: int = config.SCRAPE_MIN_BLOCK_CHARS, max_link_density: float = config.SCRAPE_MAX_LINK_DENSITY):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.min_block_chars = min_block_chars
+        self.max_link_density = max_link_density
+        self.done = False
+        self._stack = []         # open elements
+        self._skip_depth = None  # stack depth of the skipped element we are inside
+        self._block_tag = None
+        self._block, self._link_chars, self._in_link = [], 0, 0
+        self._blocks, self._chars = [], 0
+
+    def feed(self, data: str) -> bool:
+        """Parses the next chunk of the page. Returns True once enough text has been collected."""
+        if self.done: return True
+        try:
+            super().feed(data)
+        except _BudgetReached:
+            self.done = True
+        return self.done
+
+    def text(self) -> str:
+        """The text collected so far, at most max_chars long."""
+        if not self.done:
+            try:
+                self._flush()
+            except _BudgetReached:
+                self.done = True
+        return " ".join(self._blocks)[:self.max_chars]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            if tag == "br" and self._skip_depth is None: self._block.append(" ")
+            return
+        self._stack.append(tag)
+        if self._skip_depth is not None: return
+        if tag in _SKIP_TAGS or self._is_boilerplate(attrs):
+            self._skip_depth = len(self._stack)
+            return
+        if tag in _BLOCK_TAGS:
+            self._flush()
+            self._block_tag = tag
+        elif tag == "a":
+            self._in_link += 1
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack: return # Stray end tags are ignored, as browsers do
+        while self._stack:
+            open_tag = self._stack.pop()
+            if self._skip_depth is not None:
+                if len(self._stack) < self._skip_depth: self._skip_depth = None
+            elif open_tag in _BLOCK_TAGS:
+                self._flush()
+            elif open_tag == "a":
+                self._in_link = max(0, self._in_link - 1)
+            if open_tag == tag: break
+
+    def handle_data(self, data):
+        if self._skip_depth is not None: return
+        self._block.append(data)
+        if self._in_link: self._link_chars += len(data.strip())
+
+    @staticmethod
+    def _is_boilerplate(attrs) -> bool:
+        for name, value in attrs:
+            if name in ("class", "id", "role") and value and _BOILERPLATE.search(value): return True
+        return False
+
+    def _flush(self):
+        text = _SPACES.sub(" ", "".join(self._block)).strip()
+        link_density = self._link_chars / len(text) if text else 0.0
+        tag, self._block, self._link_chars = self._block_tag, [], 0
+        if not text or link_density > self.max_link_density: return
+        # Paragraphs and headings are kept whatever their length; loose text in containers only if it reads like prose.
+        if tag not in _TEXT_TAGS and len(text) < self.min_block_chars: return
+        self._blocks.append(text)
+        self._chars += len(text) + 1
+        if self._chars >= self.max_chars: raise _BudgetReached()
+
+def extract_text(html: str, max_chars: int = config.SCRAPE_MAX_CHARS) -> str:
+    """Extracts the readable text of a complete page."""
+    extractor = TextExtractor(max_chars)
+    extractor.feed(html)
+    return extractor.text()
@@ -0,0 +1,192 @@
+import codecs
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+import cancellation
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+_STOPPED = 2 # The truncated value of a page whose reader stopped the download
+
+class HttpClient:
+    """
+    The HTTP client shared by the web tools. Connections are pooled and kept alive, with at most `max_per_host`
+    open to each host at once, and a body is only read up to `max_bytes`. Pages are cached in SQLite: they are
+    served without a request for `ttl` seconds (or the server's max-age), and afterwards revalidated with
+    If-None-Match/If-Modified-Since when the server sent an ETag or Last-Modified, so an unchanged page costs
+    a 304 instead of a download. A reader can also consume the page while it downloads and stop it early.
+    """
+
+    def __init__(self, cache_file=config.HTTP_CACHE_FILE, ttl: float = config.HTTP_CACHE_TTL, max_bytes: int = config.HTTP_MAX_BYTES,
+                 max_per_host: int = config.HTTP_MAX_PER_HOST, timeout: float = config.HTTP_TIMEOUT, cache_max_bytes: int = config.HTTP_CACHE_MAX_BYTES, enabled: bool = config.HTTP_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache_max_bytes = cache_max_bytes
+        self.enabled = enabled
+        self.stats = {"requests": 0, "cache_hits": 0, "revalidated": 0, "truncated": 0}
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        # pool_block makes a request wait for a free connection instead of opening more than max_per_host.
+        adapter = HTTPAdapter(pool_connections=config.HTTP_MAX_HOSTS, pool_maxsize=max_per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False) if enabled else None
+        if self._conn:
+            with self._lock, self._conn:
+                self._conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    encoding TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    truncated INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL)""")
+
+    def get(self, url: str, consume=None) -> dict:
+        """
+        Returns the page as {"url", "text", "from_cache", "truncated"}. `consume(text)`, if given, receives the
+        page's text as it arrives and can return True to stop the download; the page is then cached as far as
+        it was read. Raises requests.RequestException if the page cannot be fetched; error responses are never cached.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        cached = self._lookup(key)
+        if cached and cached["expires_at"] > time.time():
+            page = self._page(url, cached, from_cache=True)
+            done = consume(page["text"]) if consume else True
+            if done or cached["truncated"] != _STOPPED:
+                self._count("cache_hits")
+                return page
+            # An earlier reader stopped the download before this one has enough, so the page is downloaded again
+            # and the reader is only given the text it has not seen yet.
+            consume, cached = _skip(consume, len(page["text"])), None
+        # A partial page is downloaded in full rather than revalidated, since a 304 would only confirm the part that was read.
+        if cached and cached["truncated"] == _STOPPED: cached = None
+
+        headers = {}
+        if cached and cached["etag"]: headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]: headers["If-Modified-Since"] = cached["last_modified"]
+        self._count("requests")
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if cached and response.status_code == 304:
+                self._count("revalidated")
+                self._store(key, url, cached["body"], cached["encoding"], response.headers.get("ETag") or cached["etag"],
+                            response.headers.get("Last-Modified") or cached["last_modified"], cached["truncated"], self._expiry(response))
+                page = self._page(url, cached, from_cache=True)
+                if consume: consume(page["text"])
+                return page
+            response.raise_for_status()
+            page = self._read(response, consume)
+            if "no-store" not in response.headers.get("Cache-Control", ""):
+                # Pages a reader stopped are marked, so that a later reader that needs more downloads them again.
+                truncated = _STOPPED if page["stopped"] else page["truncated"]
+                self._store(key, url, page["body"], page["encoding"], response.headers.get("ETag"), response.headers.get("Last-Modified"), truncated, self._expiry(response))
+        return {"url": response.url, "text": page["text"], "from_cache": False, "truncated": page["truncated"]}
+
+    def _read(self, response, consume=None) -> dict:
+        """Reads and decodes the body up to max_bytes, or until `consume` has enough; a turn cancelled meanwhile closes the connection."""
+        token = cancellation.current()
+        stop_on_cancel = token.on_cancel(response.close) if token else (lambda: None)
+        chunks, parts, size, truncated, stopped, decoder, encoding = [], [], 0, False, False, None, "utf-8"
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                if self.max_bytes and size + len(chunk) >= self.max_bytes:
+                    chunk, truncated = chunk[:self.max_bytes - size], True
+                chunks.append(chunk)
+                size += len(chunk)
+                if decoder is None: encoding, decoder = self._decoder(response, chunk)
+                parts.append(decoder.decode(chunk, final=truncated))
+                # Once the cap is reached or the reader has enough, the rest of the page is never downloaded.
+                if truncated: break
+                if consume and consume(parts[-1]):
+                    truncated = stopped = True
+                    break
+        finally:
+            stop_on_cancel()
+        if decoder and not truncated:
+            parts.append(decoder.decode(b"", final=True))
+            if consume and parts[-1]: consume(parts[-1])
+        if truncated: self._count("truncated")
+        return {"body": b"".join(chunks), "text": "".join(parts), "encoding": encoding, "truncated": truncated, "stopped": stopped}
+
+    def _decoder(self, response, first_chunk: bytes) -> tuple:
+        encoding = self._encoding(response, first_chunk)
+        try:
+            return encoding, codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            return "utf-8", codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @staticmethod
+    def _encoding(response, body: bytes) -> str:
+        content_type = response.headers.get("Content-Type", "")
+        if "charset=" in content_type: return content_type.split("charset=")[-1].split(";")[0].strip().strip('"') or "utf-8"
+        meta = _META_CHARSET.search(body[:2048])
+        return meta.group(1).decode("ascii") if meta else "utf-8"
+
+    def _expiry(self, response) -> float:
+        max_age = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        return time.time() + (int(max_age.group(1)) if max_age else self.ttl)
+
+    @staticmethod
+    def _page(url: str, entry: dict, from_cache: bool) -> dict:
+        try:
+            text = entry["body"].decode(entry["encoding"], errors="replace")
+        except LookupError:
+            text = entry["body"].decode("utf-8", errors="replace")
+        return {"url": url, "text": text, "from_cache": from_cache, "truncated": bool(entry["truncated"])}
+
+    def _lookup(self, key: str) -> dict | None:
+        if not self._conn: return None
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT body, encoding, etag, last_modified, truncated, expires_at FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return dict(zip(("body", "encoding", "etag", "last_modified", "truncated", "expires_at"), row))
+
+    def _store(self, key: str, url: str, body: bytes, encoding: str, etag: str | None, last_modified: str | None, truncated: bool, expires_at: float):
+        if not self._conn: return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, url, body, encoding, etag, last_modified, truncated, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, body, encoding, etag, last_modified, int(truncated), len(body), expires_at, time.time())
+            )
+            if self.cache_max_bytes:
+                # Keep the most recently used pages whose combined size fits in the budget.
+                self._conn.execute("""DELETE FROM pages WHERE key IN (
+                    SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running FROM pages)
+                    WHERE running > ?)""", (self.cache_max_bytes,))
+
+    def _count(self, name: str):
+        with self._lock: self.stats[name] += 1
+
+def _skip(consume, chars: int):
+    """Wraps a reader so that it is not given the first `chars` characters of the text again."""
+    remaining = chars
+    def skipping(text: str) -> bool:
+        nonlocal remaining
+        if remaining >= len(text):
+            remaining -= len(text)
+            return False
+        text, remaining = text[remaining:], 0
+        return consume(text)
+    return skipping
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def default_client() -> HttpClient:
+    """The client the web tools share, created on first use so the cache file is only opened when needed."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None: _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,198 @@
+import json
+
+import config
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def _last_significant(out: list) -> str:
+    for chunk in reversed(out):
+        if not chunk.isspace(): return chunk[-1]
+    return ""
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace(): out.pop()
+    if out and out[-1] == ",": out.pop()
+
+def _close(out: list, stack: list) -> str:
+    out = list(out)
+    _drop_trailing_comma(out)
+    if out and out[-1] == ":": out.append("null")
+    return "".join(out) + "".join(reversed(stack))
+
+def _normalize(text: str, start: int):
+    """
+    Scans the JSON value starting at `start`, rewriting single-quoted strings, Python literals,
+    unquoted keys, raw newlines in strings, trailing commas and missing commas between objects.
+    Stops at the end of the value, so surrounding prose is ignored. Returns the rewritten chunks,
+    the brackets left open (empty when the value is complete), and the position of every comma
+    along with the brackets open at that point.
+    """
+    out, stack, commas = [], [], []
+    quote, i = None, start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\" and i + 1 < len(text):
+                out.append("'" if text[i + 1] == "'" else ch + text[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"': out.append('\\"')
+            elif ch == "\n": out.append("\\n")
+            elif ch == "\t": out.append("\\t")
+            else: out.append(ch)
+        elif ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            if _last_significant(out) in ("}", "]"): out.append(",")
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack: stack.pop()
+            out.append(ch)
+            if not stack: return out, stack, commas
+        elif ch == ",":
+            commas.append((len(out), list(stack)))
+            out.append(ch)
+        elif ch.isalpha():
+            word_end = i
+            while word_end < len(text) and (text[word_end].isalnum() or text[word_end] == "_"): word_end += 1
+            word = text[i:word_end]
+            if word in _LITERALS: out.append(_LITERALS[word])
+            elif text[word_end:].lstrip().startswith(":"): out.append(f'"{word}"')
+            else: out.append(word)
+            i = word_end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    if quote: out.append('"')
+    return out, stack, commas
+
+def _candidates(text: str, start: int):
+    out, stack, commas = _normalize(text, start)
+    if not stack:
+        yield "".join(out)
+        return
+    # The value was cut off: close it as it stands, then retry from each earlier comma so a half-written element is dropped.
+    yield _close(out, stack)
+    for position, open_brackets in reversed(commas[-20:]):
+        yield _close(out[:position], open_brackets)
+
+def repair_json(text: str, accept=None, max_starts: int = 20):
+    """
+    Parses the first JSON object or array in an LLM response, repairing the usual mistakes:
+    surrounding prose and code fences, single quotes, trailing commas and unbalanced or truncated
+    brackets. If `accept` is given, only a value for which it returns True is returned. A bracket
+    that does not start a usable value, such as "[1]" in prose, is skipped in favour of the next one.
+    Returns the parsed value, or None if it cannot be recovered.
+    """
+    if not text: return None
+    starts = [i for i, ch in enumerate(text) if ch in "{["][:max_starts]
+    for start in starts:
+        for candidate in _candidates(text, start):
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if accept is None or accept(value): return value
+    return None
+
+def validate_plan(data) -> list | None:
+    """
+    Checks a parsed plan against the plan schema and returns its normalized steps, or None if it does not match.
+    The plan may be {"plan": [...]} or a bare list. Each step needs a known `specialist` and a non-empty `query`;
+    `tool` must be a string if present and `depends_on` a list of step numbers or ids.
+    """
+    plan = data.get("plan") if isinstance(data, dict) else data
+    if not isinstance(plan, list): return None
+
+    specialists = {name.lower(): name for name in config.SPECIALIST_MODELS}
+    steps = []
+    for task in plan:
+        if not isinstance(task, dict): return None
+        specialist, query = task.get("specialist"), task.get("query")
+        if not isinstance(specialist, str) or specialist.strip().lower() not in specialists: return None
+        if not isinstance(query, str) or not query.strip(): return None
+        step = dict(task, specialist=specialists[specialist.strip().lower()], query=query.strip())
+
+        tool = step.get("tool")
+        if tool is None or (isinstance(tool, str) and tool.strip().lower() in ("", "none", "null")): step.pop("tool", None)
+        elif isinstance(tool, str): step["tool"] = tool.strip()
+        else: return None
+
+        depends_on = step.get("depends_on")
+        if depends_on is not None:
+            if not isinstance(depends_on, list): depends_on = [depends_on]
+            if not all(isinstance(ref, (int, str)) and not isinstance(ref, bool) for ref in depends_on): return None
+            step["depends_on"] = depends_on
+        steps.append(step)
+    return steps
+
+class PlanStreamParser:
+    """
+    Incrementally parses a plan as it streams from the model. Each step object in a bare top-level
+    array, or in the array under the "plan" key, is returned from `feed` as soon as its closing brace
+    arrives. Steps are checked like `validate_plan` does; a step that cannot be parsed or fails the
+    check is returned as an empty dict, so later steps keep their positions for `depends_on` references.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.steps = 0
+        self._position = 0
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._step_start = None
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._in_plan = False
+
+    def _at_step_level(self) -> bool:
+        # Steps are the objects inside the "plan" array, or inside a bare top-level array.
+        return self._stack == ["["] or (self._stack == ["{", "["] and self._in_plan)
+
+    def feed(self, chunk: str) -> list:
+        """Adds streamed text and returns the steps completed by it."""
+        self.text += chunk
+        completed = []
+        while self._position < len(self.text):
+            ch = self.text[self._position]
+            if self._in_string:
+                if self._escaped: self._escaped = False
+                elif ch == "\\": self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._stack == ["{"]: self._last_string = self.text[self._string_start + 1:self._position]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._position
+            elif ch == ":" and self._stack == ["{"]:
+                self._key = self._last_string
+            elif ch in "{[":
+                if ch == "{" and self._at_step_level(): self._step_start = self._position
+                if ch == "[" and self._stack == ["{"]: self._in_plan = self._key == "plan"
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._step_start is not None and self._at_step_level():
+                    completed.append(self._parse_step(self.text[self._step_start:self._position + 1]))
+                    self._step_start = None
+            self._position += 1
+        self.steps += len(completed)
+        return completed
+
+    @staticmethod
+    def _parse_step(fragment: str) -> dict:
+        try:
+            step = json.loads(fragment)
+        except json.JSONDecodeError:
+            step = repair_json(fragment)
+        normalized = validate_plan([step]) if isinstance(step, dict) else None
+        return normalized[0] if normalized else {}
@@ -1,36 +1,64 @@
 import sys
+import os
 import argparse
+import asyncio
+import time
+from contextlib import aclosing
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
-from concurrent.futures import ThreadPoolExecutor
 from spellchecker import SpellChecker
 import re
 
 import config
 from memory.core_memory import CoreMemory
+from memory.session_store import SessionStore
 from tool_loader import load_tools_from_directory
 from model_selector import select_model_for_specialist
 from orchestrator import Orchestrator
 from synthesizer import Synthesizer
+from plan_executor import PlanExecutor
+from response_cache import ResponseCache
+from tracing import tracer, start_metrics_server
+from speculation import SpeculativeStream, SpeculationStats
+from critic import Critic
+from scheduler import ModelScheduler
+from prewarm import Prewarmer
+from context_assembler import ContextAssembler
+from cancellation import CancellationToken
+from step_cache import StepCache
+import event_loop
+
+# A step whose query asks for nothing but a URL is done as soon as a complete URL has been streamed.
+_URL_ONLY_QUERY = re.compile(r"\bonly the url\b", re.IGNORECASE)
+_URL = re.compile(r"https?://[^\s<>\"'`()\[\]]+")
 
 class ConversationalAgent:
     """A conversational agent that uses multiple LLMs to generate a synthesized response."""
 
-    def __init__(self, console: Console, memory: CoreMemory, tools: dict, orchestrator: Orchestrator, synthesizer: Synthesizer, is_gui_mode: bool = False):
+    def __init__(self, console: Console, memory: CoreMemory, tools: dict, orchestrator: Orchestrator, synthesizer: Synthesizer, is_gui_mode: bool = False, session_store: SessionStore | None = None, session_id: str | None = None, spell: SpellChecker | None = None):
         self.console = console
         self.memory = memory
         self.tools = tools
         self.orchestrator = orchestrator
         self.synthesizer = synthesizer
         self.is_gui_mode = is_gui_mode
-        self.spell = SpellChecker()
-        self.conversation_history = []
+        self.spell = spell or SpellChecker()
+        self.session_store = session_store
+        self.session_id = session_id or SessionStore.new_session_id()
+        self.conversation_history = session_store.load(self.session_id) if session_store and session_id else []
         self.full_response = ""
+        self.critic_loops = 0
+        self.speculation_stats = SpeculationStats()
+        self.context = ContextAssembler(console, orchestrator)
+        self.critic = Critic(console, orchestrator, context=self.context)
+        self.step_cache = StepCache()
+        self.prewarmer = None
 
-    def _execute_task(self, specialist: str, query: str, tool: str = None, tool_query: any = None, context: str = "") -> str:
+    async def _aexecute_task(self, specialist: str, query: str, tool: str = None, tool_query: any = None, context: str = "", progress=None) -> str:
         model = select_model_for_specialist(specialist, query)
         if not model: return f"Error: Unknown specialist '{specialist}'."
+        wants_url = bool(_URL_ONLY_QUERY.search(query))
         if context: query = f"{query}\n\n**Previous Step's Results (for context):**\n{context}"
         self.console.print(f"> Consulting [bold magenta]{specialist}[/bold magenta] for: '[italic]{query.splitlines()[0]}[/italic]'")
         
@@ -38,13 +66,15 @@ class ConversationalAgent:
             if tool in self.tools:
                 self.console.print(f"> Using tool [bold yellow]{tool}[/bold yellow] with query: '[italic]{tool_query or context}[/italic]'")
                 try:
-                    tool_info, tool_function = self.tools[tool], self.tools[tool]['func']
+                    tool_info = self.tools[tool]
                     if tool == 'execute_python_script' and self.is_gui_mode:
                         if isinstance(tool_query, dict): tool_query['confirm_execution'] = False
                         else: tool_query = {'filename': tool_query, 'confirm_execution': False}
-                    if isinstance(tool_query, dict): return tool_function(**tool_query)
-                    elif tool_query is None and context: return tool_function(context)
-                    else: return tool_function(tool_query)
+                    if isinstance(tool_query, dict): args, kwargs = (), tool_query
+                    elif tool_query is None and context: args, kwargs = (context,), {}
+                    else: args, kwargs = (tool_query,), {}
+                    # Tools are blocking functions, so they run in a worker thread; it inherits the turn's context.
+                    return await asyncio.to_thread(tool_info['func'], *args, **kwargs)
                 except Exception as e: return f"Error executing tool {tool}: {e}"
             else: return f"Error: Unknown tool '{tool}' specified."
         
@@ -52,14 +82,123 @@ class ConversationalAgent:
         if specialist == "Coder":
             prompt = f"""You are an expert programmer. Your ONLY job is to write a complete, runnable Python script. Respond with ONLY the Python code in a markdown block. User's Request: '{query}'"""
 
-        response = self.orchestrator.call_ai(prompt, model)
+        return await self._astream_specialist(prompt, model, wants_url, progress)
+
+    async def _astream_specialist(self, prompt: str, model: str, wants_url: bool, progress=None) -> str:
+        """Streams a specialist's answer, passing the partial text to `progress` every STEP_PROGRESS_INTERVAL seconds."""
+        response, reported = "", time.perf_counter()
+        async with aclosing(self.orchestrator.astream_ai(prompt, model)) as stream:
+            async for chunk in stream:
+                response += chunk
+                if wants_url:
+                    url = _URL.search(response)
+                    # Leaving the stream closes the connection, so the model stops generating the rest of its answer.
+                    if url and url.end() < len(response): return url.group().rstrip(".,;:!?")
+                if progress and time.perf_counter() - reported >= config.STEP_PROGRESS_INTERVAL:
+                    progress(response)
+                    reported = time.perf_counter()
         return response.strip().strip('`').strip()
 
-    def run(self, user_prompt: str):
+    @staticmethod
+    def _is_valid_task(task) -> bool:
+        return isinstance(task, dict) and bool(task.get("specialist")) and bool(task.get("query"))
+
+    async def _arun_plan_step(self, index: int, task, context: str, dependencies=(), progress=None) -> str | None:
+        """
+        Runs a single plan step for the PlanExecutor; invalid steps are skipped. `dependencies` are the steps whose results
+        make up the context, as the executor resolved them, and `progress` receives a specialist's partial answer.
+        """
+        if not self._is_valid_task(task):
+            self.console.print(f"[bold yellow]Warning: Skipping invalid task in plan: {task}[/bold yellow]")
+            return None
+        if task.get("tool") and task.get("tool_query") is None and len(dependencies) > 1:
+            # The combined results of several steps are not a usable tool argument.
+            return f"Error: Step {index + 1} uses tool '{task['tool']}' on the results of several steps but has no tool_query."
+        # A tool step's context may be its argument, such as a URL, so only specialist prompts are trimmed.
+        if not task.get("tool"): context = await self.context.afit("step_context", context)
+        # A re-plan often repeats earlier steps; with the same input they are answered from the step cache.
+        key = self.step_cache.key_for(task, context)
+        cached = self.step_cache.get(key) if key else None
+        with tracer.span("step", step=index + 1, specialist=task["specialist"], tool=task.get("tool"), cached=cached is not None):
+            if cached is not None:
+                tracer.increment("step_cache_hits")
+                self.console.print(f"[dim]Reusing the earlier result of step {index + 1} ({task['specialist']}).[/dim]")
+                return cached
+            result = await self._aexecute_task(task["specialist"], task["query"], task.get("tool"), task.get("tool_query"), context=context, progress=progress)
+        if key: self.step_cache.put(key, result)
+        return result
+
+    def _step_priority(self, index: int, task) -> int:
+        """Lets steps on models that are already loaded start before steps that need a model load."""
+        scheduler = self.orchestrator.scheduler
+        if not scheduler or not self._is_valid_task(task) or task.get("tool"): return 0
+        return scheduler.priority(select_model_for_specialist(task["specialist"], task["query"]))
+
+    async def _aexecute_plan(self, plan_source, plan: list, step_results: dict):
+        """Runs a plan list or a streamed plan, yielding status updates and filling in the plan and the results of its steps."""
+        executor = PlanExecutor(lambda i, task, context, dependencies: self._arun_plan_step(i, task, context, dependencies, progress=lambda text: executor.report(i, text)), priority=self._step_priority)
+        async for event, i, payload in executor.aexecute(plan_source):
+            if event == "planned": plan.append(payload)
+            elif not self._is_valid_task(plan[i]): continue
+            elif event == "started": yield {"status": f"Step {i+1}: Consulting {plan[i]['specialist']}..."}
+            elif event == "progress": yield {"progress": {"step": i + 1, "specialist": plan[i]["specialist"], "text": payload}}
+            else: step_results[i] = payload
+
+    def _relevant_memory(self, prompt: str) -> str:
+        with tracer.span("memory"):
+            return self.memory.read_relevant_memory(prompt)
+
+    def _spellcheck(self, user_prompt: str) -> str:
+        with tracer.span("spellcheck"):
+            words = user_prompt.split()
+            misspelled = self.spell.unknown(words)
+            return " ".join(self.spell.correction(word) if word in misspelled and self.spell.correction(word) is not None else word for word in words)
+
+    def _record_speculation(self, speculation: SpeculativeStream, accepted: bool):
+        seconds_saved = speculation.seconds_ahead() if accepted else 0.0
+        self.speculation_stats.record(accepted, seconds_saved)
+        tracer.increment("speculation_accepted" if accepted else "speculation_rejected")
+        if accepted:
+            tracer.increment("speculation_seconds_saved", seconds_saved)
+            self.console.print(f"[dim]Speculative synthesis accepted, {seconds_saved:.2f}s ahead.[/dim]")
+        stats = self.speculation_stats.summary()
+        self.console.print(f"[dim]Speculation acceptance rate: {stats['acceptance_rate']:.0%} ({stats['seconds_saved']:.2f}s saved in total).[/dim]")
+
+    def run(self, user_prompt: str, cancel_token: CancellationToken | None = None):
+        """Runs a turn from synchronous code, such as the GUI's worker thread; a thin wrapper around arun on the shared event loop."""
+        yield from event_loop.iterate(self.arun(user_prompt, cancel_token))
+
+    async def arun(self, user_prompt: str, cancel_token: CancellationToken | None = None):
+        """
+        Runs a turn, yielding status, correction and plan dicts and the chunks of the response. Cancelling
+        `cancel_token` stops the turn wherever it is; it then yields {"status": "Cancelled"} and is not kept in the history.
+        """
+        if self.prewarmer: self.prewarmer.cancel()
+        cancel_token = cancel_token or CancellationToken()
+        self.step_cache.new_turn()
+        tokens_saved, step_hits = self.context.tokens_saved(), self.step_cache.hits
+        with tracer.span("turn") as turn, cancel_token.bind():
+            try:
+                async for item in self._arun_turn(user_prompt): yield item
+            except asyncio.CancelledError:
+                if not cancel_token.cancelled: raise
+                turn.set(cancelled=True)
+                self.console.print("[bold yellow]Turn cancelled.[/bold yellow]")
+                yield {"status": "Cancelled"}
+            turn.set(context_tokens_saved=self.context.tokens_saved() - tokens_saved, step_cache_hits=self.step_cache.hits - step_hits)
+            self._report_model_loads(turn)
+
+    def _report_model_loads(self, turn):
+        scheduler = self.orchestrator.scheduler
+        if not scheduler: return
+        report = scheduler.turn_report(turn.turn_id)
+        if self.prewarmer: self.prewarmer.record_turn(report["models"])
+        turn.set(model_loads=report["loads"], model_load_seconds=report["load_seconds"], model_load_seconds_saved=report["seconds_saved"])
+        self.console.print(f"[dim]Model loads this turn: {report['loads']} ({report['load_seconds']:.1f}s); {report['warm_calls']} calls on loaded models saved ~{report['seconds_saved']:.1f}s.[/dim]")
+
+    async def _arun_turn(self, user_prompt: str):
         self.full_response = ""
-        words = user_prompt.split()
-        misspelled = self.spell.unknown(words)
-        corrected_prompt = " ".join(self.spell.correction(word) if word in misspelled and self.spell.correction(word) is not None else word for word in words)
+        corrected_prompt = await asyncio.to_thread(self._spellcheck, user_prompt)
         
         if corrected_prompt.lower() != user_prompt.lower():
             yield {"correction": corrected_prompt}
@@ -67,83 +206,151 @@ class ConversationalAgent:
         else:
             prompt_for_ai = user_prompt
 
-        history_str = "\n".join(f"{item['role']}: {item['content']}" for item in self.conversation_history[-config.MAX_TURNS:])
+        history_str = self.context.history(self.conversation_history[-config.MAX_TURNS:])
         tool_signatures = "\n".join(f"- {name}{info['signature']}: {info['docstring']}" for name, info in self.tools.items())
-        failed_attempts_log, specialist_reports = "", ""
+        failed_attempts_log, specialist_reports, speculation, journal_content = "", "", None, None
         
         for loop_count in range(config.MAX_CRITIC_LOOPS):
-            plan = []
+            self.critic_loops = loop_count + 1
             if loop_count > 0:
                 yield {"status": f"Attempt {loop_count} failed. Falling back to a smarter plan..."}
-                plan = [
-                    {"specialist": "Researcher", "query": f"Find information on: {prompt_for_ai}", "tool": "web_search", "tool_query": prompt_for_ai},
-                    {"specialist": "Researcher", "query": "Based on the search results, provide a comprehensive answer to the user's original query."}
+                plan_source = [
+                    {"specialist": "Researcher", "query": f"Find information on: {prompt_for_ai}", "tool": "research", "tool_query": prompt_for_ai},
+                    {"specialist": "Researcher", "query": "Based on the passages found, provide a comprehensive answer to the user's original query."}
                 ]
             else:
                 yield {"status": "Thinking..."}
-                plan = self.orchestrator.get_plan(prompt_for_ai, history_str, tool_signatures, failed_attempts_log)
+                # Steps are dispatched as soon as the orchestrator has written them.
+                plan_source = self.orchestrator.astream_plan(prompt_for_ai, history_str, tool_signatures, failed_attempts_log)
+
+            plan, step_results = [], {}
+            async for status in self._aexecute_plan(plan_source, plan, step_results): yield status
 
-            if not isinstance(plan, list): plan = []
-            yield {"plan": plan}
-            
             is_greeting = any(word in prompt_for_ai.lower() for word in ["hello", "hi", "hey"])
             if not plan and not is_greeting and loop_count == 0:
-                plan = [{"specialist": "Researcher", "query": f"Find information on: {prompt_for_ai}", "tool": "web_search", "tool_query": prompt_for_ai}]
-
-            step_context, all_reports = "", []
-            if plan:
-                for i, task in enumerate(plan):
-                    if isinstance(task, dict) and task.get("specialist") and task.get("query"):
-                        specialist = task.get("specialist")
-                        yield {"status": f"Step {i+1}/{len(plan)}: Consulting {specialist}..."}
-                        step_result = self._execute_task(context=step_context, **task)
-                        step_context = step_result
-                        all_reports.append(f"--- Report from Step {i+1} ({specialist}) ---\n{step_result}")
-                    else: self.console.print(f"[bold yellow]Warning: Skipping invalid task in plan: {task}[/bold yellow]")
-            
-            specialist_reports = "\n\n".join(all_reports)
+                fallback = [{"specialist": "Researcher", "query": f"Find information on: {prompt_for_ai}", "tool": "research", "tool_query": prompt_for_ai}]
+                async for status in self._aexecute_plan(fallback, plan, step_results): yield status
+            yield {"plan": plan}
+
+            specialist_reports = "\n\n".join(f"--- Report from Step {i+1} ({plan[i]['specialist']}) ---\n{step_results[i]}" for i in sorted(step_results))
+
+            if config.SPECULATIVE_SYNTHESIS and specialist_reports:
+                if journal_content is None: journal_content = await asyncio.to_thread(self._relevant_memory, prompt_for_ai)
+                speculation = SpeculativeStream(self.synthesizer.asynthesize_response(prompt_for_ai, history_str, await self.context.afit("reports", specialist_reports), journal_content))
 
             yield {"status": "Critiquing response..."}
-            critic_prompt = f"""You are the Critic. Your job is to determine if the final report successfully and completely fulfilled the user's original request. The report MUST be helpful and directly address the query. A list of search results is NOT a complete answer.
-**User's Original Request:** "{prompt_for_ai}"
-**Final Report:** {specialist_reports if specialist_reports else "No reports were generated."}
-Does the final report adequately fulfill the user's request? Your answer MUST be a single word: "Yes" or "No".
-"""
-            critic_response = self.orchestrator.call_ai(critic_prompt, config.MODEL_RESEARCHER)
-
-            if "yes" in critic_response.lower():
+            with tracer.span("critic") as span:
+                approved = await self.critic.areview(prompt_for_ai, specialist_reports)
+                span.set(approved=approved)
+
+            if approved:
                 self.console.print("[green]Critic approved. Proceeding to synthesis.[/green]")
                 break
             else:
                 self.console.print(f"[yellow]Critic rejected. Attempt {loop_count + 1}/{config.MAX_CRITIC_LOOPS}. Re-planning...[/yellow]")
-                failed_attempts_log += f"--- ATTEMPT {loop_count + 1} FAILED ---\nPLAN: {plan}\nREPORTS: {specialist_reports}\n\n"
+                if speculation:
+                    speculation.cancel()
+                    self._record_speculation(speculation, accepted=False)
+                    speculation = None
+                failed_attempts_log = await self.context.afit("failed_attempts", failed_attempts_log + f"--- ATTEMPT {loop_count + 1} FAILED ---\nPLAN: {plan}\nREPORTS: {specialist_reports}\n\n")
                 yield {"status": f"Attempt {loop_count + 1} failed. Re-planning..."}
                 if loop_count == config.MAX_CRITIC_LOOPS - 1:
                     specialist_reports = "\n\n--- AGENT FAILED ---\nAfter multiple attempts, I could not generate a satisfactory response."
 
         yield {"status": "Generating response..."}
-        journal_content = self.memory.read_core_memory()
-        response_generator = self.synthesizer.synthesize_response(prompt_for_ai, history_str, specialist_reports, journal_content)
+        if speculation:
+            self._record_speculation(speculation, accepted=True)
+            response_generator = speculation.release()
+        else:
+            if journal_content is None: journal_content = await asyncio.to_thread(self._relevant_memory, prompt_for_ai)
+            response_generator = self.synthesizer.asynthesize_response(prompt_for_ai, history_str, await self.context.afit("reports", specialist_reports), journal_content)
         
-        for chunk in response_generator:
+        async for chunk in response_generator:
             self.full_response += chunk
             yield chunk
 
         self.conversation_history.append({"role": "user", "content": user_prompt})
         self.conversation_history.append({"role": "assistant", "content": self.full_response})
-        self.memory.save_conversation(self.conversation_history)
+        if self.session_store:
+            self.session_store.append(self.session_id, "user", user_prompt)
+            self.session_store.append(self.session_id, "assistant", self.full_response)
+        else:
+            self.memory.save_conversation(self.conversation_history)
         yield {"status": "Done"}
 
+def _unattended_agents(console: Console, tools: dict, orchestrator: Orchestrator, synthesizer: Synthesizer, session_store: SessionStore | None, memory_for, allow_python: bool):
+    """Returns a function that builds an agent for an id, such as a server session or a batch prompt, with nobody at the console."""
+    spell = SpellChecker()
+    # Nobody can confirm script runs, so the tool is only offered if explicitly allowed.
+    agent_tools = {name: info for name, info in tools.items() if allow_python or name != "execute_python_script"}
+
+    def make_agent(agent_id: str) -> ConversationalAgent:
+        memory = memory_for(agent_id)
+        own_tools = dict(agent_tools)
+        if "append_to_journal" in own_tools: own_tools["append_to_journal"] = {**own_tools["append_to_journal"], "func": memory.append_to_journal}
+        return ConversationalAgent(console, memory, own_tools, orchestrator, synthesizer, is_gui_mode=True, session_store=session_store, session_id=agent_id, spell=spell)
+    return make_agent
+
+def _session_memory(session_id: str) -> CoreMemory:
+    memory = CoreMemory(os.path.join(config.SERVER_MEMORY_DIR, f"{session_id}.txt"))
+    memory.initialize_if_needed()
+    return memory
+
+def _serve(console: Console, tools: dict, orchestrator: Orchestrator, synthesizer: Synthesizer, session_store: SessionStore, host: str, port: int):
+    """Serves one agent per session over HTTP until interrupted."""
+    from server import AgentServer
+    os.makedirs(config.SERVER_MEMORY_DIR, exist_ok=True)
+    make_agent = _unattended_agents(console, tools, orchestrator, synthesizer, session_store, _session_memory, config.SERVER_ALLOW_PYTHON)
+    httpd = AgentServer(console, make_agent).listen(host, port)
+    console.print(f"Serving the agent at http://{host}:{httpd.server_address[1]} (POST /sessions/<id>/messages, POST /sessions/<id>/cancel, GET /health, GET /metrics)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        session_store.close()
+
+def _run_batch(console: Console, core_memory: CoreMemory, tools: dict, orchestrator: Orchestrator, synthesizer: Synthesizer, input_path: str, output_path: str | None, concurrency: int):
+    """Answers every prompt of a JSONL file and appends the results to the output file."""
+    from batch_runner import BatchRunner
+    output_path = output_path or os.path.splitext(input_path)[0] + ".results.jsonl"
+    # Transcripts go to a log of their own, so batch prompts never show up as sessions to resume.
+    session_store = SessionStore(output_path + ".sessions")
+    make_agent = _unattended_agents(console, tools, orchestrator, synthesizer, session_store, lambda _: core_memory, config.BATCH_ALLOW_PYTHON)
+    try:
+        stats = BatchRunner(console, make_agent, concurrency).run(input_path, output_path)
+    finally:
+        session_store.close()
+    console.print(f"Answered {stats['prompts']} prompts in {stats['seconds']:.1f}s ({stats['prompts_per_minute']:.1f}/min, {stats['errors']} errors). Results: {output_path}")
 
-def main(run_gui: bool):
+def main(run_gui: bool, use_cache: bool = True, resume: str | None = None, serve: bool = False, host: str = config.SERVER_HOST, port: int = config.SERVER_PORT,
+         batch: str | None = None, output: str | None = None, concurrency: int = config.BATCH_CONCURRENCY):
     console = Console()
     console.print(Panel("[bold green]Conversational Gemini Local v10.1[/bold green]", border_style="green"))
     core_memory = CoreMemory()
     core_memory.initialize_if_needed()
     tools = load_tools_from_directory()
-    orchestrator = Orchestrator(console)
-    synthesizer = Synthesizer(console)
-    agent = ConversationalAgent(console, core_memory, tools, orchestrator, synthesizer, is_gui_mode=run_gui)
+    scheduler = ModelScheduler(console)
+    orchestrator = Orchestrator(console, ResponseCache(enabled=use_cache and config.RESPONSE_CACHE_ENABLED), scheduler)
+    synthesizer = Synthesizer(console, scheduler)
+    if batch:
+        _run_batch(console, core_memory, tools, orchestrator, synthesizer, batch, output, concurrency)
+        return
+    session_store = SessionStore()
+    if serve:
+        _serve(console, tools, orchestrator, synthesizer, session_store, host, port)
+        return
+    session_id = session_store.last_session() if resume == "last" else resume
+    if resume and session_id not in session_store.sessions():
+        console.print(f"[bold yellow]No session '{resume}' to resume. Starting a new session.[/bold yellow]")
+        session_id = None
+    agent = ConversationalAgent(console, core_memory, tools, orchestrator, synthesizer, is_gui_mode=run_gui, session_store=session_store, session_id=session_id)
+    console.print(f"Session [bold]{agent.session_id}[/bold]" + (f" resumed with {len(agent.conversation_history) // 2} turns." if session_id else "."))
+    if run_gui and config.PREWARM_ENABLED: agent.prewarmer = Prewarmer(console, scheduler)
+    if config.METRICS_PORT:
+        start_metrics_server(tracer, config.METRICS_PORT)
+        console.print(f"Serving metrics at http://127.0.0.1:{config.METRICS_PORT}/metrics")
     if run_gui:
         try:
             from gui_main import MultiAIGUI
@@ -155,12 +362,23 @@ def main(run_gui: bool):
         except ImportError:
             console.print("[bold red]GUI dependencies not installed. Please run 'pip install customtkinter'[/bold red]")
             sys.exit(1)
+        finally:
+            session_store.close()
     else:
         pass
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the MultiAI Chatbot.")
     parser.add_argument("--gui", action="store_true", help="Run the GUI version of the chatbot.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk model response cache.")
+    parser.add_argument("--serve", action="store_true", help="Serve the agent over HTTP for several users.")
+    parser.add_argument("--host", default=config.SERVER_HOST, help="Address to serve on with --serve.")
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT, help="Port to serve on with --serve.")
+    parser.add_argument("--batch", metavar="PROMPTS_JSONL", help="Answer every prompt of a JSONL file without a user interface.")
+    parser.add_argument("--output", metavar="RESULTS_JSONL", help="Where --batch appends its results; defaults to <prompts>.results.jsonl.")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY, help="Prompts answered at the same time with --batch.")
+    parser.add_argument("--resume", nargs="?", const="last", metavar="SESSION_ID", help="Resume a session, by default the most recent one.")
     args = parser.parse_args()
 
-    main(args.gui)
+    main(args.gui, use_cache=not args.no_cache, resume=args.resume, serve=args.serve, host=args.host, port=args.port,
+         batch=args.batch, output=args.output, concurrency=args.concurrency)
@@ -1,11 +1,14 @@
 from datetime import datetime
 import config
+from memory.journal_index import JournalIndex
+from context_assembler import count_tokens
 
 class CoreMemory:
     """Handles reading and appending to the core memory/journal file."""
 
     def __init__(self, filepath=config.CORE_MEMORY_FILE):
         self.filepath = filepath
+        self.index = JournalIndex(filepath)
 
     def read_core_memory(self):
         """Reads the entire content of the core memory file."""
@@ -17,6 +20,17 @@ class CoreMemory:
         except Exception as e:
             return f"Error reading core memory: {e}"
 
+    def read_relevant_memory(self, query: str, k: int = config.MEMORY_TOP_K, max_tokens: int = config.MEMORY_TOKEN_BUDGET) -> str:
+        """Returns the journal entries most relevant to the query, oldest first, within a token budget."""
+        selected, used = [], 0
+        for timestamp, text, _ in self.index.search(query, k):
+            tokens = count_tokens(text)
+            if used + tokens > max_tokens: continue
+            selected.append((timestamp, text))
+            used += tokens
+        if not selected: return "No relevant journal entries."
+        return "\n".join(f"JOURNAL ({timestamp}): {text}" for timestamp, text in sorted(selected))
+
     def append_to_journal(self, text):
         """Appends a new entry to the journal with a timestamp."""
         try:
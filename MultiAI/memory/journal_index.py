@@ -0,0 +1,141 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+import ollama
+
+import config
+
+# Entries are written as "JOURNAL (<iso time>): text" by CoreMemory and "[<iso time>] text" by the journal tool.
+_ENTRY_START = re.compile(r"^(?:JOURNAL \((?P<a>[^)]*)\): ?|\[(?P<b>\d{4}-\d\d-\d\dT[^\]]*)\] ?)", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9]+")
+K1, B = 1.5, 0.75
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+def bm25_scores(query: str, postings: dict, lengths) -> dict:
+    """
+    Scores documents against the query with BM25. `postings` maps each term to {document id: term frequency}
+    and `lengths[document id]` is a document's length in tokens. Documents sharing no term with the query are left out.
+    """
+    if not lengths: return {}
+    average_length = sum(lengths) / len(lengths) or 1.0
+    scores = {}
+    for term in set(tokenize(query)):
+        docs = postings.get(term)
+        if not docs: continue
+        idf = math.log(1 + (len(lengths) - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc_id, tf in docs.items():
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[doc_id] / average_length))
+    return scores
+
+def parse_entries(text: str) -> list:
+    """Splits journal text into (timestamp, text) entries; anything before the first entry is ignored."""
+    matches = list(_ENTRY_START.finditer(text))
+    entries = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        body = text[match.end():following.start() if following else len(text)].strip()
+        if body: entries.append((match.group("a") or match.group("b"), body))
+    return entries
+
+class JournalIndex:
+    """
+    A BM25 index over the journal's entries, persisted as JSON next to the journal. Only the bytes
+    appended since the last refresh are parsed; the index is rebuilt if the journal was rewritten.
+    Optionally re-ranks the best BM25 candidates by similarity of local Ollama embeddings.
+    """
+
+    def __init__(self, journal_path: str, index_path: str | None = None, embedding_model: str = config.MEMORY_EMBEDDING_MODEL):
+        self.journal_path = journal_path
+        self.index_path = index_path or journal_path + ".index.json"
+        self.embedding_model = embedding_model
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.offset = 0
+        self.fingerprint = ""
+        self.entries = []        # [timestamp, text, length in tokens]
+        self.postings = {}       # term -> {entry id: term frequency}
+        self.embeddings = {}     # entry id -> vector
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.offset, self.fingerprint, self.entries = data["offset"], data["fingerprint"], data["entries"]
+            self.postings = {term: {int(i): tf for i, tf in docs.items()} for term, docs in data["postings"].items()}
+            self.embeddings = {int(i): vector for i, vector in data.get("embeddings", {}).items()}
+        except (OSError, ValueError, KeyError):
+            self._reset()
+
+    def _save(self):
+        data = {"offset": self.offset, "fingerprint": self.fingerprint, "entries": self.entries,
+                "postings": self.postings, "embeddings": self.embeddings}
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            pass # The index is only a cache; it is rebuilt if it cannot be read back
+
+    @staticmethod
+    def _fingerprint(head: bytes) -> str:
+        return hashlib.sha256(head).hexdigest()
+
+    def refresh(self) -> int:
+        """Indexes entries appended since the last refresh. Returns how many entries were added."""
+        with self._lock:
+            try:
+                with open(self.journal_path, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    head = f.read(min(size, 256))
+                    rewritten = size < self.offset or (self.offset and self._fingerprint(head[:min(self.offset, 256)]) != self.fingerprint)
+                    if rewritten: self._reset()
+                    if size == self.offset: return 0
+                    f.seek(self.offset)
+                    new_text = f.read().decode('utf-8', errors='replace')
+            except FileNotFoundError:
+                return 0
+            entries = parse_entries(new_text)
+            for timestamp, text in entries:
+                self._add(timestamp, text)
+            self.offset, self.fingerprint = size, self._fingerprint(head)
+            self._save()
+            return len(entries)
+
+    def _add(self, timestamp: str, text: str):
+        entry_id = len(self.entries)
+        tokens = tokenize(text)
+        self.entries.append([timestamp, text, len(tokens)])
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[entry_id] = tf
+
+    def search(self, query: str, k: int = 5) -> list:
+        """Returns up to k (timestamp, text, score) entries, most relevant first."""
+        self.refresh()
+        with self._lock:
+            ranked = sorted(bm25_scores(query, self.postings, [entry[2] for entry in self.entries]).items(), key=lambda item: item[1], reverse=True)
+            if self.embedding_model and ranked: ranked = self._rerank(query, ranked[:k * 3])
+            return [(self.entries[i][0], self.entries[i][1], score) for i, score in ranked[:k]]
+
+    def _rerank(self, query: str, ranked: list) -> list:
+        try:
+            query_vector = ollama.embeddings(model=self.embedding_model, prompt=query)["embedding"]
+            for entry_id, _ in ranked:
+                if entry_id not in self.embeddings:
+                    self.embeddings[entry_id] = ollama.embeddings(model=self.embedding_model, prompt=self.entries[entry_id][1])["embedding"]
+        except Exception:
+            return ranked # Keep the BM25 order if the embedding model is unavailable
+        self._save()
+        return sorted(ranked, key=lambda item: _cosine(query_vector, self.embeddings[item[0]]), reverse=True)
+
+def _cosine(a: list, b: list) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import config
+
+class SessionStore:
+    """
+    An append-only JSONL log of conversation turns, one record per message, tagged with a session id.
+    Writes are flushed immediately and fsynced in batches. A sidecar tail index keeps the byte offsets
+    of each session's latest messages, so a session can be resumed without reading the whole log.
+    The log is compacted once it grows beyond SESSION_COMPACT_BYTES.
+    """
+
+    def __init__(self, filepath=config.SESSION_LOG_FILE, tail_records: int = config.MAX_TURNS * 2):
+        self.filepath = filepath
+        self.index_path = filepath + ".idx"
+        self.tail_records = tail_records
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._index = {"size": 0, "sessions": {}}
+        self._load_index()
+        self._compacted_size = self._index["size"]
+        self._file = open(self.filepath, 'ab')
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {"size": 0, "sessions": {}}
+        size = os.path.getsize(self.filepath) if os.path.exists(self.filepath) else 0
+        if size < self._index["size"]: self._index = {"size": 0, "sessions": {}}
+        if size > self._index["size"]: self._scan(self._index["size"])
+        if size > self._index["size"]:
+            # Drop a record that was only partly written before a crash, so the next append starts on a new line.
+            with open(self.filepath, 'r+b') as f: f.truncate(self._index["size"])
+
+    def _scan(self, start: int):
+        """Indexes the records after `start`, e.g. those written after the last index save before a crash."""
+        with open(self.filepath, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"): break
+                try:
+                    self._index_record(json.loads(line), offset)
+                except ValueError:
+                    pass # A corrupted record is skipped
+                offset += len(line)
+        self._index["size"] = offset
+
+    def _index_record(self, record: dict, offset: int):
+        session = self._index["sessions"].setdefault(record["session"], {"offsets": [], "updated": 0})
+        session["offsets"] = (session["offsets"] + [offset])[-self.tail_records:]
+        session["updated"] = record.get("time", 0)
+
+    def _save_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex[:12]
+
+    def append(self, session_id: str, role: str, content: str):
+        """Appends one message to the log."""
+        record = {"session": session_id, "role": role, "content": content, "time": time.time()}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._index_record(record, offset)
+            self._index["size"] = offset + len(line)
+            self._pending += 1
+            if self._pending >= config.SESSION_FSYNC_EVERY or time.monotonic() - self._last_sync >= config.SESSION_FSYNC_INTERVAL:
+                self._sync()
+            # Compact again only once the log has doubled, so a log of many live sessions is not rewritten on every append.
+            compact = self._index["size"] > max(config.SESSION_COMPACT_BYTES, 2 * self._compacted_size)
+        if compact: self.compact()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._save_index()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sessions(self) -> list:
+        """Session ids, most recently updated last."""
+        with self._lock:
+            return sorted(self._index["sessions"], key=lambda s: self._index["sessions"][s]["updated"])
+
+    def last_session(self) -> str | None:
+        sessions = self.sessions()
+        return sessions[-1] if sessions else None
+
+    def load(self, session_id: str, max_turns: int = config.MAX_TURNS) -> list:
+        """Returns the last `max_turns` turns of a session as {"role", "content"} messages, read via the tail index."""
+        with self._lock:
+            session = self._index["sessions"].get(session_id)
+            offsets = session["offsets"][-max_turns * 2:] if session else []
+            self._file.flush()
+        messages = []
+        with open(self.filepath, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                record = json.loads(f.readline())
+                messages.append({"role": record["role"], "content": record["content"]})
+        return messages
+
+    def compact(self, keep_records: int = config.SESSION_COMPACT_KEEP):
+        """Rewrites the log with only the latest `keep_records` messages of each session."""
+        with self._lock:
+            self._file.flush()
+            kept = {}
+            with open(self.filepath, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    kept.setdefault(record["session"], []).append(line)
+            temp_path = self.filepath + ".tmp"
+            with open(temp_path, 'wb') as f:
+                # Records are kept in their original order within each session; sessions are written oldest first.
+                for session in sorted(kept, key=lambda s: self._index["sessions"].get(s, {}).get("updated", 0)):
+                    f.writelines(kept[session][-keep_records:])
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp_path, self.filepath)
+            self._index = {"size": 0, "sessions": {}}
+            self._scan(0)
+            self._compacted_size = self._index["size"]
+            self._file = open(self.filepath, 'ab')
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed: return
+            self._file.flush()
+            self._sync()
+            self._file.close()
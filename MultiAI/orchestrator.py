@@ -1,46 +1,182 @@
+import asyncio
 import json
-import re
+import os
+import weakref
+from contextlib import nullcontext, aclosing
 import ollama
 from rich.console import Console
 
 import config
+from response_cache import ResponseCache
+from scheduler import ModelScheduler
+from tracing import tracer
+from json_repair import repair_json, validate_plan, PlanStreamParser
+from context_assembler import count_tokens
+import event_loop
+
+_async_clients = weakref.WeakKeyDictionary()
+
+def async_client() -> ollama.AsyncClient:
+    """The AsyncClient of the running event loop for OLLAMA_HOST; its connection pool cannot be shared between loops."""
+    loop, host = asyncio.get_running_loop(), os.environ.get("OLLAMA_HOST")
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None:
+        client = clients[host] = ollama.AsyncClient()
+        # The shared loop's clients are used until exit and closed then; ollama 0.2 has no close() of its own.
+        if event_loop.is_shared(loop): event_loop.on_shutdown(client._client.aclose)
+    return client
+
+class _PlanGate:
+    """
+    Passes on streamed plan steps. Invalid steps are empty placeholders that the executor skips; they are held
+    back until a valid step arrives, so a plan with no valid steps can still be parsed as a whole afterwards.
+    """
+
+    def __init__(self):
+        self.held, self.valid = [], 0
+
+    def release(self, steps: list) -> list:
+        ready = []
+        for step in steps:
+            if not step and not self.valid:
+                self.held.append(step)
+                continue
+            ready += self.held
+            self.held.clear()
+            self.valid += 1 if step else 0
+            ready.append(step)
+        return ready
 
 class Orchestrator:
-    def __init__(self, console: Console):
+    def __init__(self, console: Console, cache: ResponseCache | None = None, scheduler: ModelScheduler | None = None):
         self.console = console
+        self.cache = cache
+        self.scheduler = scheduler
+        self.plan_stats = {"plans": 0, "local_repairs": 0, "llm_repairs": 0}
 
-    def call_ai(self, prompt: str, model: str, system_prompt: str = config.SYSTEM_PROMPT_UNFILTERED) -> str:
-        """A unified function to call any model."""
-        try:
-            response = ollama.generate(
-                model=model,
-                prompt=prompt,
-                system=system_prompt,
-                stream=False,
-                options={"temperature": 0.0, "num_predict": 4096}
-            )
-            return response.get('response')
-        except ollama.ResponseError as e:
-            self.console.print(f"\n[bold red]Ollama API Error for '{model}': {e.error}[/bold red]")
+    def call_ai(self, prompt: str, model: str, system_prompt: str = config.SYSTEM_PROMPT_UNFILTERED, use_cache: bool = True, format: str = "", options: dict | None = None) -> str:
+        """A unified function to call any model from synchronous code; a thin wrapper around acall_ai on the shared event loop."""
+        return event_loop.run(self.acall_ai(prompt, model, system_prompt, use_cache, format, options))
+
+    async def acall_ai(self, prompt: str, model: str, system_prompt: str = config.SYSTEM_PROMPT_UNFILTERED, use_cache: bool = True, format: str = "", options: dict | None = None) -> str:
+        """Calls any model on an ollama.AsyncClient. Responses are deterministic, so they are served from the cache when possible."""
+        options = {"temperature": 0.0, "num_predict": 4096, **(options or {})}
+        if self.scheduler: model = await asyncio.to_thread(self.scheduler.resolve, model)
+        with tracer.span("llm", model=model, prompt_tokens=count_tokens(system_prompt) + count_tokens(prompt)) as span:
+            cache_key, cached = self._check_cache(model, system_prompt, prompt, options, format, use_cache)
+            if cached is not None:
+                span.set(cached=True)
+                return cached
+            try:
+                async with self._aslot(model):
+                    response = await async_client().generate(model=model, prompt=prompt, system=system_prompt, stream=False,
+                                                             format=format, options=options, keep_alive=self._keep_alive(model))
+                span.record_ollama(response)
+                if self.scheduler: self.scheduler.record(model, response)
+                if cache_key: self.cache.put(cache_key, response.get('response'))
+                return response.get('response')
+            except Exception as e:
+                return self._report_error(model, e, span)
+
+    def stream_ai(self, prompt: str, model: str, system_prompt: str = config.SYSTEM_PROMPT_UNFILTERED, use_cache: bool = True, format: str = ""):
+        """Synchronous astream_ai, run on the shared event loop."""
+        yield from event_loop.iterate(self.astream_ai(prompt, model, system_prompt, use_cache, format))
+
+    async def astream_ai(self, prompt: str, model: str, system_prompt: str = config.SYSTEM_PROMPT_UNFILTERED, use_cache: bool = True, format: str = ""):
+        """Like acall_ai, but yields the response as it is generated. Only complete responses are cached."""
+        options = {"temperature": 0.0, "num_predict": 4096}
+        if self.scheduler: model = await asyncio.to_thread(self.scheduler.resolve, model)
+        with tracer.span("llm", model=model, stream=True, prompt_tokens=count_tokens(system_prompt) + count_tokens(prompt)) as span:
+            cache_key, cached = self._check_cache(model, system_prompt, prompt, options, format, use_cache)
+            if cached is not None:
+                span.set(cached=True)
+                yield cached
+                return
+            parts = []
+            try:
+                async with self._aslot(model):
+                    response_stream = await async_client().generate(model=model, prompt=prompt, system=system_prompt, stream=True,
+                                                                    format=format, options=options, keep_alive=self._keep_alive(model))
+                    # Closing the response right away when the caller stops reading early stops Ollama generating.
+                    async with aclosing(response_stream):
+                        async for chunk in response_stream:
+                            if chunk.get('response'):
+                                if not parts: span.set(first_token=span.elapsed())
+                                parts.append(chunk['response'])
+                                yield chunk['response']
+                            if chunk.get('done'):
+                                span.record_ollama(chunk)
+                                if self.scheduler: self.scheduler.record(model, chunk)
+                if cache_key: self.cache.put(cache_key, "".join(parts))
+            except Exception as e:
+                error = self._report_error(model, e, span)
+                if error: yield error
+
+    def _report_error(self, model: str, error: Exception, span) -> str:
+        """Reports a failed call and returns the text to use in place of the response."""
+        if isinstance(error, ollama.ResponseError):
+            span.set(error=error.error)
+            self.console.print(f"\n[bold red]Ollama API Error for '{model}': {error.error}[/bold red]")
             self.console.print("[bold yellow]Is the model pulled and is Ollama running?[/bold yellow]")
             return f"Error: Could not get a response from the model '{model}'."
-        except Exception as e:
-            self.console.print(f"\n[bold red]FATAL ERROR calling '{model}': {e}[/bold red]")
-            return ""
+        span.set(error=str(error))
+        self.console.print(f"\n[bold red]FATAL ERROR calling '{model}': {error}[/bold red]")
+        return ""
+
+    def _aslot(self, model: str):
+        return self.scheduler.aslot(model) if self.scheduler else nullcontext() # nullcontext also works with async with
+
+    def _keep_alive(self, model: str):
+        # Keeping models loaded also keeps their prompt cache, so the stable prompt prefixes below are not evaluated again.
+        return ModelScheduler.keep_alive(model)
+
+    def _check_cache(self, model: str, system_prompt: str, prompt: str, options: dict, format: str, use_cache: bool):
+        """Returns the cache key for a request (None when caching is off) and the cached response, if any."""
+        if not self.cache or not use_cache: return None, None
+        cache_key = self.cache.make_key(model, system_prompt, prompt, dict(options, format=format) if format else options)
+        cached = self.cache.get(cache_key)
+        tracer.increment("response_cache_hit" if cached is not None else "response_cache_miss")
+        return cache_key, cached
 
     def get_plan(self, user_prompt: str, history_str: str, tool_signatures: str, failed_attempts_log: str = "") -> list:
-        """Asks the Orchestrator model to create a sequential, multi-step plan."""
-        specialists = list(config.SPECIALIST_MODELS.keys())
-        
+        """Asks the Orchestrator model to create a multi-step plan whose steps may declare dependencies."""
+        return list(self.stream_plan(user_prompt, history_str, tool_signatures, failed_attempts_log))
+
+    def stream_plan(self, user_prompt: str, history_str: str, tool_signatures: str, failed_attempts_log: str = ""):
+        """Synchronous astream_plan, run on the shared event loop."""
+        yield from event_loop.iterate(self.astream_plan(user_prompt, history_str, tool_signatures, failed_attempts_log))
+
+    async def astream_plan(self, user_prompt: str, history_str: str, tool_signatures: str, failed_attempts_log: str = ""):
+        """
+        Streams the plan from the Orchestrator model and yields each step as soon as its JSON object is complete,
+        so the first steps can start while the rest of the plan is still being generated.
+        """
+        prompt = self._build_plan_prompt(user_prompt, history_str, tool_signatures, failed_attempts_log)
+        self.plan_stats["plans"] += 1
+        parser, gate = PlanStreamParser(), _PlanGate()
+        with tracer.span("plan", model=config.MODEL_ORCHESTRATOR) as span:
+            async for chunk in self.astream_ai(prompt, config.MODEL_ORCHESTRATOR, format="json"):
+                for step in gate.release(parser.feed(chunk)): yield step
+            span.set(steps=parser.steps, invalid_steps=parser.steps - gate.valid)
+        if gate.valid: return
+
+        # No valid step could be streamed, so fall back to parsing the whole response.
+        plan = self._parse_plan(parser.text)
+        if plan is None: plan = await self._acorrect_plan(parser.text)
+        for step in plan: yield step
+
+    def _build_plan_prompt(self, user_prompt: str, history_str: str, tool_signatures: str, failed_attempts_log: str) -> str:
         prompt = f"""You are the Orchestrator, a master AI that creates **sequential, multi-step** plans for a team of specialists.
 
 **PRIMARY DIRECTIVE:** For research-heavy questions (e.g., "what is", "explain", "summarize"), you MUST create a multi-step "tool chain" plan. For simple requests, a single-step plan is sufficient.
 
 **DEEP RESEARCH "TOOL CHAIN" PATTERN:**
-1.  **Search:** Use the `web_search` tool to find relevant URLs.
-2.  **Cognitive Step (No Tool):** Use a `Researcher` specialist to analyze the search results and choose the single best URL. The query should be: "From the following search results, identify the single most promising URL. Respond with ONLY the URL and nothing else."
-3.  **Scrape:** Use the `scrape_webpage` tool with the URL chosen in the previous step.
-4.  **Summarize:** Use a `Researcher` specialist to analyze the scraped content and provide a final answer.
+1.  **Research:** Use the `research` tool with a search query. It reads the top search results and returns the passages most relevant to the query, with their URLs.
+2.  **Summarize:** Use a `Researcher` specialist to analyze the passages and provide a final answer.
+Use `web_search` only when the user wants a list of links, and `scrape_webpage` only for a URL the user gave.
+
+**STEP DEPENDENCIES:** Each step receives the results of the steps it depends on. By default a step depends on the step directly before it. Steps that do not need each other's results run at the same time: give such a step a `"depends_on"` list with the numbers (starting at 1) of the steps it needs, or `[]` if it needs none. For example, two independent searches both use `"depends_on": []` and the step that compares them uses `"depends_on": [1, 2]`. A step that uses a tool on the results of several steps must give its own `"tool_query"`.
 
 **AVAILABLE TOOLS:**
 ---
@@ -54,21 +190,12 @@ User's Prompt: "What are the latest developments in AI?"
     {{
       "specialist": "Researcher",
       "query": "Find articles about the latest developments in AI.",
-      "tool": "web_search",
+      "tool": "research",
       "tool_query": "latest developments in AI"
     }},
     {{
       "specialist": "Researcher",
-      "query": "From the following search results, identify the single most promising URL. Respond with ONLY the URL and nothing else."
-    }},
-    {{
-      "specialist": "Researcher",
-      "query": "Scrape the content of the chosen URL.",
-      "tool": "scrape_webpage"
-    }},
-    {{
-      "specialist": "Researcher",
-      "query": "Based on the scraped content, provide a comprehensive summary of the latest developments in AI."
+      "query": "Based on the passages found, provide a comprehensive summary of the latest developments in AI."
     }}
   ]
 }}
@@ -81,36 +208,42 @@ User's Prompt: "{user_prompt}"
 Respond with ONLY the valid JSON plan.
 
 JSON Plan:"""
+        return prompt
 
-        response_str = self.call_ai(prompt, config.MODEL_ORCHESTRATOR)
+    async def _acorrect_plan(self, response_str: str) -> list:
+        """Asks the model to fix a plan that the local repair parser could not recover. This is the last resort."""
+        with tracer.span("plan_self_correction", model=config.MODEL_ORCHESTRATOR):
+            corrected_response_str = await self.acall_ai(self._correction_prompt(response_str), config.MODEL_ORCHESTRATOR, format="json")
+        return self._accept_correction(corrected_response_str)
 
-        def _validate_and_get_plan(response_text: str) -> list | None:
-            try:
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    plan_json = json.loads(json_match.group())
-                    plan_content = plan_json.get("plan")
-                    if isinstance(plan_content, list):
-                        return plan_content
-                    return None
-                return None
-            except json.JSONDecodeError:
-                return None
-
-        plan = _validate_and_get_plan(response_str)
-        if plan is not None:
-            return plan
-            
+    def _correction_prompt(self, response_str: str) -> str:
+        specialists = list(config.SPECIALIST_MODELS.keys())
+        self.plan_stats["llm_repairs"] += 1
+        tracer.increment("plan_llm_repair")
         self.console.print(f"[yellow]Orchestrator initial response failed. Attempting self-correction...[/yellow]")
-        correction_prompt = f"""The following text contains a broken or invalid JSON object. Correct it and return ONLY the valid JSON object.
+        return f"""The following text contains a broken or invalid JSON object. Correct it and return ONLY the valid JSON object.
+The object must have a "plan" list. Every step needs a "specialist" (one of: {", ".join(specialists)}) and a "query"; "tool" and "depends_on" are optional.
 Broken Text: {response_str}
 Corrected JSON:"""
-        corrected_response_str = self.call_ai(correction_prompt, config.MODEL_ORCHESTRATOR)
-        
-        corrected_plan = _validate_and_get_plan(corrected_response_str)
+
+    def _accept_correction(self, corrected_response_str: str) -> list:
+        corrected_plan = self._parse_plan(corrected_response_str)
         if corrected_plan is not None:
             self.console.print("[green]Self-correction successful![/green]")
             return corrected_plan
             
         self.console.print("[red]Self-correction failed. Returning empty plan.[/red]")
-        return []
\ No newline at end of file
+        return []
+
+    def _parse_plan(self, response_text: str) -> list | None:
+        """Parses and validates a plan, counting how often the tolerant parser had to repair it."""
+        try:
+            plan = validate_plan(json.loads(response_text))
+            if plan is not None: return plan
+        except (json.JSONDecodeError, TypeError):
+            pass
+        data = repair_json(response_text, accept=lambda value: validate_plan(value) is not None)
+        if data is None: return None
+        self.plan_stats["local_repairs"] += 1
+        tracer.increment("plan_local_repair")
+        return validate_plan(data)
@@ -0,0 +1,54 @@
+import re
+from collections import Counter
+
+import config
+from context_assembler import count_tokens
+from memory.journal_index import bm25_scores, tokenize
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def split_passages(text: str, words: int = config.RESEARCH_PASSAGE_WORDS) -> list:
+    """Splits text into passages of about `words` words, ending each at a sentence boundary where there is one."""
+    passages, current, length = [], [], 0
+    for sentence in _SENTENCE_END.split(text):
+        sentence_words = sentence.split()
+        # Sentences longer than a whole passage, such as run-on lists, are split by words.
+        while len(sentence_words) > words:
+            if current: passages.append(" ".join(current))
+            passages.append(" ".join(sentence_words[:words]))
+            current, length, sentence_words = [], 0, sentence_words[words:]
+        if not sentence_words: continue
+        if length and length + len(sentence_words) > words:
+            passages.append(" ".join(current))
+            current, length = [], 0
+        current.append(" ".join(sentence_words))
+        length += len(sentence_words)
+    if length: passages.append(" ".join(current))
+    return passages
+
+def rank_passages(query: str, passages: list) -> list:
+    """
+    Scores the passages against the query with BM25; returns (index, score) pairs, best first, with ties in their
+    original order. Passages that share no term with the query are left out.
+    """
+    postings, lengths = {}, []
+    for i, passage in enumerate(passages):
+        tokens = tokenize(passage)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items(): postings.setdefault(term, {})[i] = tf
+    scores = bm25_scores(query, postings, lengths)
+    return sorted(((i, score) for i, score in scores.items() if score > 0), key=lambda item: (-item[1], item[0]))
+
+def select_passages(query: str, passages: list, max_tokens: int = config.RESEARCH_TOKEN_BUDGET) -> list:
+    """
+    Picks the passages most relevant to the query that fit in `max_tokens`. Each passage is a dict with a
+    "text" key; the chosen ones are returned best first. Passages that would overflow the budget are skipped
+    in favour of shorter, lower-ranked ones, and passages unrelated to the query are never chosen.
+    """
+    chosen, used = [], 0
+    for index, score in rank_passages(query, [passage["text"] for passage in passages]):
+        tokens = count_tokens(passages[index]["text"])
+        if used + tokens > max_tokens: continue
+        chosen.append({**passages[index], "score": score})
+        used += tokens
+    return chosen
@@ -0,0 +1,122 @@
+import asyncio
+
+import config
+
+class PlanExecutor:
+    """Runs plan steps as a dependency graph, executing independent steps concurrently."""
+
+    def __init__(self, run_step, max_workers: int = config.MAX_PARALLEL_STEPS, priority=None):
+        # run_step(index, task, context, dependencies) is a coroutine function returning str | None, where dependencies
+        # are the indices of the steps whose results make up the context.
+        # priority(index, task) -> sort key; among steps that are ready, lower keys start first.
+        self.run_step = run_step
+        self.max_workers = max(1, max_workers)
+        self.priority = priority
+        self._events = None
+
+    @staticmethod
+    def _step_dependencies(index: int, task, ids: dict) -> list:
+        declared = task.get("depends_on") if isinstance(task, dict) else None
+        if declared is None:
+            dependencies = [index - 1] if index > 0 else []
+        else:
+            if not isinstance(declared, list): declared = [declared]
+            resolved = set()
+            for ref in declared:
+                ref_index = ids.get(str(ref))
+                if ref_index is None and str(ref).strip().isdigit(): ref_index = int(str(ref).strip()) - 1
+                if ref_index is not None and 0 <= ref_index < index: resolved.add(ref_index)
+            dependencies = sorted(resolved)
+        if isinstance(task, dict) and task.get("id") is not None:
+            ids[str(task["id"])] = index
+        return dependencies
+
+    @staticmethod
+    def resolve_dependencies(plan: list) -> list:
+        """
+        Returns, for each step, the sorted indices of the earlier steps it depends on.
+        A step without a `depends_on` key depends on the step before it, which keeps
+        plain sequential plans working. References may be 1-based step numbers or the
+        `id` of an earlier step; references to the step itself, later steps or unknown
+        ids are dropped, so the result is always acyclic.
+        """
+        ids = {}
+        return [PlanExecutor._step_dependencies(i, task, ids) for i, task in enumerate(plan)]
+
+    @staticmethod
+    def _build_context(dependencies: list, results: dict) -> str:
+        outputs = [(d, results[d]) for d in dependencies if results.get(d)]
+        if len(outputs) == 1: return outputs[0][1]
+        return "\n\n".join(f"--- Result of Step {d + 1} ---\n{output}" for d, output in outputs)
+
+    def report(self, index: int, payload):
+        """Called by a running step to pass on its progress, such as partial output, as a ("progress", index, payload) event."""
+        if self._events is not None: self._events.put_nowait(("progress", (index, payload)))
+
+    async def aexecute(self, plan):
+        """
+        Runs the plan, which may be a list or an async iterator that is still producing steps, such as a
+        streamed plan. Steps start as tasks as soon as they arrive and their dependencies have finished.
+        Yields ("planned", index, task), ("started", index, None), ("progress", index, payload) for what
+        steps report() and ("finished", index, result) events.
+        """
+        events = self._events = asyncio.Queue()
+
+        async def feed():
+            try:
+                if hasattr(plan, "__aiter__"):
+                    async for task in plan: events.put_nowait(("planned", task))
+                else:
+                    for task in plan: events.put_nowait(("planned", task))
+            except Exception as e:
+                events.put_nowait(("error", e))
+            finally:
+                events.put_nowait(("end", None))
+
+        steps, dependencies, ids = [], [], {}
+        pending, results, running, planning = [], {}, {}, True   # running: task -> step index
+        # A single task reads the whole plan, so spans opened while streaming it stay nested.
+        feeder, arrival = asyncio.create_task(feed()), None
+        try:
+            while planning or pending or running:
+                ready = [i for i in pending if all(d in results for d in dependencies[i])]
+                if self.priority and len(ready) > self.max_workers - len(running):
+                    ready.sort(key=lambda i: self.priority(i, steps[i]))
+                for i in ready[:self.max_workers - len(running)]:
+                    pending.remove(i)
+                    running[asyncio.create_task(self.run_step(i, steps[i], self._build_context(dependencies[i], results), dependencies[i]))] = i
+                    yield "started", i, None
+
+                if not planning and not running: continue
+                # Running steps may still report progress after the plan has ended.
+                if arrival is None: arrival = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait(set(running) | {arrival}, return_when=asyncio.FIRST_COMPLETED)
+                if arrival in done:
+                    # Handled first, so a step's last progress comes before its result.
+                    batch = [arrival.result()]
+                    arrival = None
+                    while not events.empty(): batch.append(events.get_nowait())
+                    for kind, payload in batch:
+                        if kind == "planned":
+                            i = len(steps)
+                            steps.append(payload)
+                            dependencies.append(self._step_dependencies(i, payload, ids))
+                            pending.append(i)
+                            yield "planned", i, payload
+                        elif kind == "progress":
+                            if payload[0] in running.values(): yield "progress", *payload
+                        elif kind == "end":
+                            planning = False
+                        else:
+                            raise payload
+                for task in done & set(running):
+                    i = running.pop(task)
+                    try:
+                        results[i] = task.result()
+                    except Exception as e:
+                        results[i] = f"Error in step {i + 1}: {e}"
+                    yield "finished", i, results[i]
+        finally:
+            self._events = None
+            for task in [feeder, arrival, *running]:
+                if task: task.cancel()
@@ -0,0 +1,88 @@
+import threading
+from rich.console import Console
+
+import config
+from model_selector import select_model_for_specialist
+from tracing import tracer
+
+_CODER_WORDS = ("code", "script", "python", "program", "function", "bug", "compile")
+_CREATIVE_WORDS = ("story", "poem", "song", "lyrics", "creative", "imagine")
+
+class Prewarmer:
+    """
+    Loads the models the next turn is likely to need while the user is still typing. Drafts are
+    debounced, loads use an empty prompt with the model's keep_alive, and models that calls are
+    currently using are never pushed out. Tracks how many prewarmed models the next turn really used.
+    """
+
+    def __init__(self, console: Console, scheduler, delay: float = config.PREWARM_DEBOUNCE, max_loads: int = config.PREWARM_MAX_LOADS):
+        self.console = console
+        self.scheduler = scheduler
+        self.delay = delay
+        self.max_loads = max_loads
+        self._lock = threading.Lock()
+        self._timer = None
+        self._prewarmed = set()   # models loaded since the last turn
+        self.stats = {"loads": 0, "hits": 0, "turns": 0}
+
+    @staticmethod
+    def predict_models(text: str) -> list:
+        """The models a turn for this draft will probably call, most certain first, starting with the orchestrator."""
+        lowered = text.lower()
+        models = [config.MODEL_ORCHESTRATOR]
+        if any(word in lowered for word in _CODER_WORDS): models.append(select_model_for_specialist("Coder", text))
+        if any(word in lowered for word in _CREATIVE_WORDS): models.append(select_model_for_specialist("Creative", text))
+        models += [select_model_for_specialist("Researcher", text), config.MODEL_SYNTHESIZER]
+        return list(dict.fromkeys(models))
+
+    def on_draft(self, text: str):
+        """Called on every keystroke; prewarms once the draft has not changed for `delay` seconds."""
+        self.cancel()
+        if len(text.strip()) < config.PREWARM_MIN_CHARS: return
+        with self._lock:
+            self._timer = threading.Timer(self.delay, self.prewarm, args=(text,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Drops a pending prewarm, e.g. when the message is sent."""
+        with self._lock:
+            if self._timer: self._timer.cancel()
+            self._timer = None
+
+    def prewarm(self, text: str) -> list:
+        """Loads the predicted models that fit next to the busy ones. Returns the models that were loaded."""
+        resident = self.scheduler.resident(refresh=True)
+        busy = self.scheduler.busy_models()
+        # Models in use keep their slots; the predictions may only take the remaining ones.
+        capacity = max(0, self.scheduler.max_loaded - len(busy))
+        targets = [model for model in self.predict_models(text)[:capacity] if model not in resident and model not in busy]
+        loaded = []
+        for model in targets[:self.max_loads]:
+            try:
+                self.scheduler.client.generate(model=model, prompt="", keep_alive=self.scheduler.keep_alive(model))
+            except Exception as e:
+                self.console.print(f"[dim]Could not prewarm {model}: {e}[/dim]")
+                continue
+            loaded.append(model)
+        with self._lock:
+            self._prewarmed.update(loaded)
+            self.stats["loads"] += len(loaded)
+        if loaded:
+            tracer.increment("prewarm_loads", len(loaded))
+            self.scheduler.resident(refresh=True)
+        return loaded
+
+    def record_turn(self, models_used):
+        """Counts the prewarmed models that the turn actually called."""
+        with self._lock:
+            hits = len(self._prewarmed & set(models_used))
+            self.stats["hits"] += hits
+            self.stats["turns"] += 1
+            self._prewarmed.clear()
+        if hits: tracer.increment("prewarm_hits", hits)
+
+    def summary(self) -> dict:
+        with self._lock:
+            loads, hits = self.stats["loads"], self.stats["hits"]
+            return {"loads": loads, "hits": hits, "turns": self.stats["turns"], "hit_rate": hits / loads if loads else 0.0}
@@ -0,0 +1,124 @@
+import atexit
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import config
+import cancellation
+
+_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+_SIGXCPU = getattr(signal, "SIGXCPU", None)
+
+class PythonWorkerPool:
+    """
+    Runs Python scripts in warm worker processes (python_worker.py). Up to `size` workers are kept idle, having
+    already started the interpreter and imported the `preload` modules, so a short script does not wait for
+    either. Each worker runs a single script and exits, and a fresh one takes its place, so no state is shared
+    between runs. A script is limited to `cpu_seconds` of CPU time and `memory_bytes` of address space where
+    the platform supports rlimits, and is killed after `timeout` seconds or when its turn is cancelled.
+    """
+
+    def __init__(self, size: int = config.PYTHON_POOL_SIZE, preload=config.PYTHON_PRELOAD, timeout: float = config.PYTHON_TIMEOUT,
+                 cpu_seconds: int = config.PYTHON_CPU_SECONDS, memory_bytes: int = config.PYTHON_MEMORY_BYTES):
+        self.size = size
+        self.preload = list(preload)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.stats = {"runs": 0, "warm_runs": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def _spawn(self) -> subprocess.Popen:
+        # -u makes the script's output arrive as it is written instead of when a buffer fills.
+        return subprocess.Popen([sys.executable, "-u", _WORKER, json.dumps(self.preload)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, encoding="utf-8", errors="replace", env={**os.environ, "PYTHONIOENCODING": "utf-8"})
+
+    def warm(self):
+        """Starts idle workers until there are `size` of them."""
+        with self._lock:
+            self._idle = [worker for worker in self._idle if worker.poll() is None]
+            while len(self._idle) < self.size: self._idle.append(self._spawn())
+
+    def _take(self) -> tuple:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop(0)
+                if worker.poll() is None: return worker, True
+            return self._spawn(), False
+
+    def run(self, filename: str, on_output=None) -> dict:
+        """
+        Runs a script and returns {"stdout", "stderr", "returncode", "timed_out", "cpu_limited"}. `on_output(stream, text)`,
+        if given, receives each line of output as it is written, with stream "stdout" or "stderr".
+        """
+        worker, warm = self._take()
+        threading.Thread(target=self.warm, daemon=True).start() # A replacement starts up while this script runs
+        with self._lock:
+            self.stats["runs"] += 1
+            if warm: self.stats["warm_runs"] += 1
+        output = {"stdout": [], "stderr": []}
+        readers = [threading.Thread(target=self._pump, args=(stream, name, output[name], on_output), daemon=True)
+                   for name, stream in (("stdout", worker.stdout), ("stderr", worker.stderr))]
+        for reader in readers: reader.start()
+        timed_out = threading.Event()
+        def kill_on_timeout():
+            timed_out.set()
+            worker.kill()
+        timer = threading.Timer(self.timeout, kill_on_timeout)
+        timer.daemon = True
+        # Stopping the turn kills the script instead of leaving it running in the background.
+        token = cancellation.current()
+        stop_on_cancel = token.on_cancel(worker.kill) if token else (lambda: None)
+        timer.start()
+        try:
+            job = {"path": os.path.abspath(filename), "cwd": os.getcwd(), "cpu_seconds": self.cpu_seconds, "memory_bytes": self.memory_bytes}
+            try:
+                worker.stdin.write(json.dumps(job) + "\n")
+                worker.stdin.flush()
+            except OSError:
+                pass # The worker is already gone, e.g. killed by a cancel; its exit code tells the rest
+            try:
+                worker.stdin.close() # The script reads end-of-file rather than waiting for input nobody gives
+            except OSError:
+                pass
+            returncode = worker.wait()
+            for reader in readers: reader.join()
+        finally:
+            timer.cancel()
+            stop_on_cancel()
+        if timed_out.is_set():
+            with self._lock: self.stats["timeouts"] += 1
+        return {"stdout": "".join(output["stdout"]), "stderr": "".join(output["stderr"]), "returncode": returncode,
+                "timed_out": timed_out.is_set(), "cpu_limited": _SIGXCPU is not None and returncode == -_SIGXCPU}
+
+    @staticmethod
+    def _pump(stream, name: str, lines: list, on_output):
+        for line in iter(stream.readline, ""):
+            lines.append(line)
+            if on_output: on_output(name, line)
+        stream.close()
+
+    def close(self):
+        """Stops the idle workers."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+            worker.wait()
+            for stream in (worker.stdin, worker.stdout, worker.stderr): stream.close()
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def default_pool() -> PythonWorkerPool:
+    """The pool execute_python_script uses, created on first use; its idle workers are stopped at exit."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = PythonWorkerPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,58 @@
+"""
+A warm Python worker, started by python_pool. It imports the modules it is given, then waits for one job on
+stdin: the script to run, its working directory and its limits. It applies the limits, runs the script as
+__main__ and exits, so every script gets a fresh interpreter. Only the standard library is imported here,
+so none of the agent's modules end up in the script's sys.modules.
+"""
+import importlib
+import json
+import os
+import runpy
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None # Windows has no rlimits; the pool's wall-clock limit still applies
+
+def _preload(modules: list):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass # Modules that are not installed are skipped; the script reports them if it needs them
+
+def _limit(cpu_seconds: int, memory_bytes: int):
+    if resource is None: return
+    for limit, value, hard in ((resource.RLIMIT_CPU, cpu_seconds, cpu_seconds + 1), (resource.RLIMIT_AS, memory_bytes, memory_bytes)):
+        if not value: continue
+        try:
+            resource.setrlimit(limit, (value, hard))
+        except (ValueError, OSError):
+            pass # Some platforms, such as macOS, refuse RLIMIT_AS
+
+def main():
+    _preload(json.loads(sys.argv[1]) if len(sys.argv) > 1 else [])
+    line = sys.stdin.readline()
+    if not line: return # The pool closed without giving this worker a job
+    job = json.loads(line)
+    path = job["path"]
+    os.chdir(job["cwd"])
+    # The script sees the same argv and import path as under `python <path>`.
+    sys.argv = [path]
+    sys.path[0] = os.path.dirname(path)
+    _limit(job.get("cpu_seconds"), job.get("memory_bytes"))
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Like the interpreter, report the traceback from the script's own frames on.
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename != path: tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import config
+
+class ResponseCache:
+    """A persistent, content-addressed cache for deterministic model responses, backed by SQLite."""
+
+    def __init__(self, filepath=config.RESPONSE_CACHE_FILE, max_bytes=config.RESPONSE_CACHE_MAX_BYTES, max_age=config.RESPONSE_CACHE_MAX_AGE, enabled=config.RESPONSE_CACHE_ENABLED):
+        self.filepath = filepath
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, options: dict) -> str:
+        """Hashes everything that determines a response into a stable cache key."""
+        payload = json.dumps([model, system_prompt, prompt, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response for a key, or None on a miss or when the cache is bypassed."""
+        if not self.enabled: return None
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.max_age and now - row[1] > self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Stores a response and evicts stale or least recently used entries."""
+        if not self.enabled or not response: return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        if self.max_age:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        if self.max_bytes:
+            # Keep the most recently used entries whose combined size fits in the budget.
+            self._conn.execute("""DELETE FROM responses WHERE key IN (
+                SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running FROM responses)
+                WHERE running > ?)""", (self.max_bytes,))
+
+    def clear(self):
+        """Removes every cached response and resets the counters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters together with the current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
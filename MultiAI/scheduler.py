@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+import ollama
+from rich.console import Console
+
+import config
+from tracing import tracer
+
+class ModelScheduler:
+    """
+    Sits in front of every model call to avoid needless model loads. It tracks which models Ollama has
+    resident (via /api/ps), holds back calls that would evict a model other calls are still using, so
+    calls are batched by model, sets keep_alive per model, and can swap to a loaded equivalent model.
+    """
+
+    def __init__(self, console: Console, client=ollama, max_loaded: int = config.MAX_LOADED_MODELS, swap_equivalents: bool = config.MODEL_SWAP_TO_RESIDENT):
+        self.console = console
+        self.client = client
+        self.max_loaded = max(1, max_loaded)
+        self.swap_equivalents = swap_equivalents
+        self._condition = threading.Condition()
+        self._active = {}          # model -> calls in progress
+        self._resident = set()
+        self._checked_at = 0.0
+        self._load_times = {}      # model -> [loads, total seconds]
+        self._turns = {}           # turn id -> per-turn statistics
+        self.swaps = 0
+
+    def resident(self, refresh: bool = False) -> set:
+        """The models Ollama currently has loaded, refreshed from /api/ps at most every SCHEDULER_PS_TTL seconds."""
+        if refresh or time.monotonic() - self._checked_at > config.SCHEDULER_PS_TTL:
+            try:
+                models = {m.get("name") or m.get("model") for m in self.client.ps().get("models", [])}
+                with self._condition:
+                    self._resident = models
+                    self._checked_at = time.monotonic()
+            except Exception:
+                pass # Keep the last known residency if Ollama cannot be asked
+        with self._condition:
+            return set(self._resident)
+
+    @staticmethod
+    def keep_alive(model: str):
+        return config.MODEL_KEEP_ALIVE.get(model, config.DEFAULT_KEEP_ALIVE)
+
+    def resolve(self, model: str) -> str:
+        """Returns the model to call: the requested one, or an already loaded equivalent if swapping is enabled."""
+        if not self.swap_equivalents: return model
+        resident = self.resident()
+        if model in resident: return model
+        for equivalent in config.MODEL_EQUIVALENTS.get(model, []):
+            if equivalent in resident:
+                self.swaps += 1
+                tracer.increment("scheduler_swaps")
+                self.console.print(f"[dim]Using loaded model {equivalent} instead of {model}.[/dim]")
+                return equivalent
+        return model
+
+    def busy_models(self) -> set:
+        """The models that calls are currently using."""
+        with self._condition:
+            return {model for model, count in self._active.items() if count}
+
+    def priority(self, model: str | None) -> int:
+        """
+        Sort key for ready plan steps: steps without a model or on a resident model go first. It uses the last
+        known residency, which every call keeps up to date, so sorting steps on the event loop never waits for /api/ps.
+        """
+        if model is None: return 0
+        with self._condition:
+            return 0 if model in self._resident else 1
+
+    def _can_start(self, model: str) -> bool:
+        if self._active.get(model, 0) >= config.MODEL_MAX_CONCURRENCY: return False
+        if self._active.get(model, 0) or model in self._resident: return True
+        busy = [m for m, count in self._active.items() if count]
+        # Loading another model must not push out a model that other calls are still using.
+        return len(busy) < self.max_loaded
+
+    def _acquire(self, model: str):
+        self.resident()
+        deadline = time.monotonic() + config.SCHEDULER_MAX_WAIT
+        waited = time.perf_counter()
+        with self._condition:
+            while not self._can_start(model):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break # Never block a call forever; Ollama will queue it itself
+                self._condition.wait(remaining)
+            self._active[model] = self._active.get(model, 0) + 1
+        waited = time.perf_counter() - waited
+        if waited > 0.01: tracer.increment("scheduler_wait_seconds", waited)
+
+    def _release(self, model: str):
+        with self._condition:
+            self._active[model] -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, model: str):
+        """Waits until the model can run without evicting a busy model, then holds a call slot for it."""
+        self._acquire(model)
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str):
+        """Like slot(), but waits in a worker thread so the event loop keeps running."""
+        acquire = asyncio.ensure_future(asyncio.to_thread(self._acquire, model))
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The thread still takes the slot, so give it back once it has.
+            acquire.add_done_callback(lambda _: self._release(model))
+            raise
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    def record(self, model: str, response: dict):
+        """Records the load time Ollama reported for a call and marks the model as resident."""
+        load_seconds = (response or {}).get("load_duration", 0) / 1e9
+        loaded = load_seconds >= config.SCHEDULER_LOAD_THRESHOLD
+        span = tracer.current()
+        with self._condition:
+            self._resident.add(model)
+            if loaded:
+                history = self._load_times.setdefault(model, [0, 0.0])
+                history[0] += 1
+                history[1] += load_seconds
+            if span:
+                turn = self._turns.setdefault(span.turn_id, self._new_turn())
+                turn["calls"] += 1
+                turn["models"].add(model)
+                if loaded:
+                    turn["loads"] += 1
+                    turn["load_seconds"] += load_seconds
+                else:
+                    turn["warm_calls"] += 1
+                    turn["seconds_saved"] += self._average_load(model)
+        tracer.increment("model_loads" if loaded else "model_warm_calls")
+
+    def _average_load(self, model: str) -> float:
+        loads, total = self._load_times.get(model, (0, 0.0))
+        return total / loads if loads else config.MODEL_LOAD_ESTIMATE
+
+    @staticmethod
+    def _new_turn() -> dict:
+        return {"calls": 0, "loads": 0, "load_seconds": 0.0, "warm_calls": 0, "seconds_saved": 0.0, "models": set()}
+
+    def turn_report(self, turn_id: str) -> dict:
+        """Returns and forgets the load statistics of a turn: models called, loads, load time, and the load time saved by warm calls."""
+        with self._condition:
+            return self._turns.pop(turn_id, self._new_turn())
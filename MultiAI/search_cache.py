@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from ddgs import DDGS
+
+import config
+from tracing import tracer
+
+class DdgsBackend:
+    """Searches DuckDuckGo through one DDGS instance, so its search engines and their HTTP sessions are reused across searches."""
+
+    def __init__(self, timeout: float = config.SEARCH_TIMEOUT):
+        self._ddgs = DDGS(timeout=timeout)
+
+    def __call__(self, query: str, max_results: int) -> list:
+        return list(self._ddgs.text(query, max_results=max_results))
+
+class SearchCache:
+    """
+    Caches web search results in memory. Results are reused for `ttl` seconds, and an empty result for
+    `negative_ttl` seconds, so a query that found nothing is retried sooner. Identical queries made while
+    a search is in flight wait for its result instead of searching again, for at most twice `timeout`; if the
+    search has not finished by then it is given up, and the next such query searches again. Errors are never
+    cached: they are raised to every caller that waited for the search. `backend(query, max_results)` searches.
+    """
+
+    def __init__(self, backend=None, ttl: float = config.SEARCH_CACHE_TTL, negative_ttl: float = config.SEARCH_CACHE_NEGATIVE_TTL,
+                 max_entries: int = config.SEARCH_CACHE_MAX_ENTRIES, enabled: bool = config.SEARCH_CACHE_ENABLED, timeout: float = config.SEARCH_TIMEOUT):
+        self.backend = backend or DdgsBackend(timeout)
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.stats = {"searches": 0, "hits": 0, "coalesced": 0, "abandoned": 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (results, expires at), least recently used first
+        self._in_flight = {}            # key -> Future of the search being made
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> tuple:
+        return " ".join(query.lower().split()), max_results
+
+    def search(self, query: str, max_results: int = 5) -> list:
+        """Returns the search results as a list of dicts with "title", "href" and "body"."""
+        if not self.enabled:
+            self._count("searches")
+            return self.backend(query, max_results)
+        key = self.make_key(query, max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                tracer.increment("search_cache_hits")
+                return [dict(r) for r in entry[0]]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.stats["searches"] += 1
+            else:
+                self.stats["coalesced"] += 1
+                tracer.increment("search_coalesced")
+        if leader:
+            self._run(key, query, max_results, future)
+            return [dict(r) for r in future.result()]
+        # The backend's own timeout does not cover every way a search can hang, so waiting is limited too.
+        wait = 2 * self.timeout
+        try:
+            return [dict(r) for r in future.result(timeout=wait)]
+        except TimeoutError:
+            with self._lock:
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                    self.stats["abandoned"] += 1
+            raise TimeoutError(f"the search for '{query}' did not finish within {wait:g} seconds") from None
+
+    def _run(self, key: tuple, query: str, max_results: int, future: Future):
+        try:
+            results = self.backend(query, max_results)
+        except BaseException as e:
+            with self._lock: self._finish(key, future)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._finish(key, future)
+            self._entries[key] = (results, time.monotonic() + (self.ttl if results else self.negative_ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        future.set_result(results)
+
+    def _finish(self, key: tuple, future: Future):
+        # A search that waiters gave up on may already have been replaced by a newer one.
+        if self._in_flight.get(key) is future: del self._in_flight[key]
+
+    def _count(self, name: str):
+        with self._lock: self.stats[name] += 1
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_cache() -> SearchCache:
+    """The cache the web tools share, created on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None: _default_cache = SearchCache()
+        return _default_cache
@@ -0,0 +1,230 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rich.console import Console
+
+import config
+from memory.session_store import SessionStore
+from tracing import tracer
+from cancellation import CancellationToken
+
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_SESSION_PATH = re.compile(r"/sessions/([^/]+)/messages")
+_CANCEL_PATH = re.compile(r"/sessions/([^/]+)/cancel")
+
+class AgentServer:
+    """
+    Serves the agent over HTTP so several users can share one Ollama host. Each session has its own agent,
+    history and journal, and a turn's status, plan and response chunks are streamed as server-sent events.
+    At most `workers` turns run at once and `max_queue` more may wait for one; beyond that requests get 429
+    with Retry-After, and a second turn for a session that is still answering gets 409. Calls to each model
+    are further limited by the shared scheduler. A turn in progress or waiting can be cancelled, which frees its
+    worker and stops its model calls at once. Turns run as tasks on the shared event loop; a request's thread only
+    relays the events of its turn.
+    """
+
+    def __init__(self, console: Console, agent_factory, workers: int = config.SERVER_WORKERS, max_queue: int = config.SERVER_MAX_QUEUE, max_sessions: int = config.SERVER_MAX_SESSIONS):
+        self.console = console
+        self.agent_factory = agent_factory
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.workers)
+        self._admitted = 0             # turns running or waiting for a worker
+        self._running = 0
+        self._agents = OrderedDict()   # session id -> agent, least recently used first
+        self._busy = set()             # sessions with a turn in progress
+        self._tokens = {}              # session id -> cancellation token of its turn
+        self.stats = {"turns": 0, "rejected_full": 0, "rejected_busy": 0, "cancelled": 0}
+
+    def agent(self, session_id: str):
+        """Returns the session's agent, creating it (and loading its history) on first use."""
+        with self._lock:
+            if session_id in self._agents:
+                self._agents.move_to_end(session_id)
+                return self._agents[session_id]
+        agent = self.agent_factory(session_id)
+        with self._lock:
+            agent = self._agents.setdefault(session_id, agent)
+            self._agents.move_to_end(session_id)
+            # Idle agents beyond the limit are dropped; their history is reloaded from the session log when needed.
+            for idle in [s for s in self._agents if s not in self._busy][:max(0, len(self._agents) - self.max_sessions)]:
+                del self._agents[idle]
+        return agent
+
+    def admit(self, session_id: str) -> int | None:
+        """Reserves a place for a turn of the session. Returns the HTTP status to refuse it with, if any."""
+        with self._lock:
+            if session_id in self._busy:
+                self.stats["rejected_busy"] += 1
+                return 409
+            if self._admitted >= self.workers + self.max_queue:
+                self.stats["rejected_full"] += 1
+                return 429
+            self._admitted += 1
+            self._busy.add(session_id)
+            self._tokens[session_id] = CancellationToken()
+        return None
+
+    def release(self, session_id: str):
+        with self._lock:
+            self._admitted -= 1
+            self._busy.discard(session_id)
+            self._tokens.pop(session_id, None)
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancels the session's turn. Returns False if it has none in progress."""
+        with self._lock:
+            token = self._tokens.get(session_id)
+            if token is None: return False
+            if not token.cancelled: self.stats["cancelled"] += 1
+        token.cancel()
+        return True
+
+    def run_turn(self, session_id: str, prompt: str):
+        """Runs an admitted turn once a worker is free, yielding (event, data) pairs."""
+        with self._lock: token = self._tokens.get(session_id) or CancellationToken()
+        if not self._slots.acquire(blocking=False):
+            yield "status", "Queued..."
+            while not self._slots.acquire(timeout=0.1):
+                if token.cancelled:
+                    yield "cancelled", {"session_id": session_id, "response": ""}
+                    return
+        with self._lock:
+            self._running += 1
+            self.stats["turns"] += 1
+        try:
+            agent = self.agent(session_id)
+            for item in agent.run(prompt, cancel_token=token):
+                if isinstance(item, str): yield "chunk", item
+                else: yield from item.items()
+            yield "cancelled" if token.cancelled else "done", {"session_id": session_id, "response": agent.full_response}
+        except Exception as e:
+            self.console.print(f"[bold red]Turn of session {session_id} failed: {e}[/bold red]")
+            yield "error", f"Error: {e}"
+        finally:
+            with self._lock: self._running -= 1
+            self._slots.release()
+
+    def health(self) -> dict:
+        with self._lock:
+            return {"status": "ok", "sessions": len(self._agents), "running": self._running, "queued": self._admitted - self._running,
+                    "workers": self.workers, "max_queue": self.max_queue}
+
+    def render_metrics(self) -> str:
+        """The tracer's Prometheus metrics plus the server's queue gauges and rejection counters."""
+        health = self.health()
+        with self._lock: stats = dict(self.stats)
+        lines = ["# HELP multiai_server_turns Turns running or waiting for a worker.", "# TYPE multiai_server_turns gauge",
+                 f'multiai_server_turns{{state="running"}} {health["running"]}', f'multiai_server_turns{{state="queued"}} {health["queued"]}',
+                 "# HELP multiai_server_turns_total Turns started.", "# TYPE multiai_server_turns_total counter",
+                 f"multiai_server_turns_total {stats['turns']}",
+                 "# HELP multiai_server_rejected_total Turns refused because the queue was full or the session was busy.", "# TYPE multiai_server_rejected_total counter",
+                 f'multiai_server_rejected_total{{reason="full"}} {stats["rejected_full"]}', f'multiai_server_rejected_total{{reason="busy"}} {stats["rejected_busy"]}',
+                 "# HELP multiai_server_cancelled_total Turns cancelled by their session.", "# TYPE multiai_server_cancelled_total counter",
+                 f"multiai_server_cancelled_total {stats['cancelled']}"]
+        return tracer.render_prometheus() + "\n".join(lines) + "\n"
+
+    def listen(self, host: str = config.SERVER_HOST, port: int = config.SERVER_PORT) -> ThreadingHTTPServer:
+        """Binds the HTTP server; call serve_forever() on the result."""
+        httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        httpd.daemon_threads = True
+        return httpd
+
+def _make_handler(server: AgentServer):
+    class AgentRequestHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body, content_type: str = "application/json", headers: dict | None = None):
+            data = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items(): self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self) -> dict | None:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > config.SERVER_MAX_BODY:
+                self._send(413, {"error": "Request body too large."})
+                return None
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                body = None
+            if not isinstance(body, dict):
+                self._send(400, {"error": "The body must be a JSON object."})
+                return None
+            return body
+
+        def _session_id(self, path=_SESSION_PATH) -> str | None:
+            match = path.fullmatch(self.path)
+            if not match: return None
+            if not _SESSION_ID.fullmatch(match.group(1)):
+                self._send(400, {"error": "Invalid session id."})
+                return ""
+            return match.group(1)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, server.health())
+            elif self.path == "/metrics":
+                self._send(200, server.render_metrics(), "text/plain; version=0.0.4")
+            elif _SESSION_PATH.fullmatch(self.path):
+                session_id = self._session_id()
+                if session_id: self._send(200, {"session_id": session_id, "messages": server.agent(session_id).conversation_history})
+            else:
+                self._send(404, {"error": "Not found."})
+
+        def do_POST(self):
+            if self.path == "/sessions":
+                self._send(201, {"session_id": SessionStore.new_session_id()})
+                return
+            if _CANCEL_PATH.fullmatch(self.path):
+                session_id = self._session_id(_CANCEL_PATH)
+                if not session_id: return
+                if server.cancel(session_id): self._send(202, {"session_id": session_id, "cancelled": True})
+                else: self._send(409, {"error": f"Session {session_id} has no turn in progress."})
+                return
+            session_id = self._session_id()
+            if session_id is None: self._send(404, {"error": "Not found."})
+            if not session_id: return
+            body = self._read_json()
+            if body is None: return
+            prompt = body.get("prompt")
+            if not isinstance(prompt, str) or not prompt.strip():
+                self._send(400, {"error": "A non-empty 'prompt' is required."})
+                return
+
+            refused = server.admit(session_id)
+            if refused == 429:
+                tracer.increment("server_rejected_full")
+                self._send(429, {"error": "The server is busy. Try again later."}, headers={"Retry-After": str(config.SERVER_RETRY_AFTER)})
+                return
+            if refused == 409:
+                tracer.increment("server_rejected_busy")
+                self._send(409, {"error": f"Session {session_id} is still answering the previous message."})
+                return
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                turn = server.run_turn(session_id, prompt)
+                try:
+                    for event, data in turn:
+                        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server.console.print(f"[dim]Client of session {session_id} disconnected.[/dim]")
+                finally:
+                    turn.close()
+            finally:
+                server.release(session_id)
+
+    return AgentRequestHandler
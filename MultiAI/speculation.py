@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+class SpeculativeStream:
+    """
+    Runs a response generator in a task and buffers its output, so a response can be generated while it
+    is still unknown whether it will be used. `release` streams the buffered and remaining output; `cancel`
+    stops the generator, which closes its connection to the model. The task is also stopped when the task
+    that started it ends, so a turn that is cancelled or abandoned does not leave it running.
+    """
+
+    def __init__(self, generator):
+        self._generator = generator
+        self._queue = asyncio.Queue()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._task = asyncio.create_task(self._produce())
+        owner = asyncio.current_task()
+        if owner: owner.add_done_callback(lambda _: self._task.cancel())
+
+    async def _produce(self):
+        try:
+            async for chunk in self._generator:
+                self._queue.put_nowait(("chunk", chunk))
+        except Exception as e:
+            self._queue.put_nowait(("error", e))
+        finally:
+            await self._generator.aclose()
+            self.finished_at = time.perf_counter()
+            self._queue.put_nowait(("end", None))
+
+    def cancel(self):
+        """Stops generating and discards everything buffered so far."""
+        self._task.cancel()
+
+    def seconds_ahead(self) -> float:
+        """How much generation time has already been done, i.e. the latency saved by speculating."""
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    async def release(self):
+        """Yields the buffered output followed by the rest of the stream as it is generated."""
+        while True:
+            kind, payload = await self._queue.get()
+            if kind == "chunk": yield payload
+            elif kind == "error": raise payload
+            else: return
+
+class SpeculationStats:
+    """Tracks how often speculative responses are used and how much latency they save."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.seconds_saved = 0.0
+
+    def record(self, accepted: bool, seconds_saved: float = 0.0):
+        with self._lock:
+            if accepted:
+                self.accepted += 1
+                self.seconds_saved += seconds_saved
+            else:
+                self.rejected += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            total = self.accepted + self.rejected
+            return {"accepted": self.accepted, "rejected": self.rejected,
+                    "acceptance_rate": self.accepted / total if total else 0.0, "seconds_saved": self.seconds_saved}
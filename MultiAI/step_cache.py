@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+class StepCache:
+    """
+    Remembers the results of plan steps, so steps that a re-plan repeats are not run again. A step is identified
+    by its specialist, query, tool, tool query and a hash of its context, so once an earlier step's result
+    changes, every step that depends on it runs again. Results are kept for the current turn, or for `ttl`
+    seconds across turns if it is set. Errors and tools with side effects are never cached.
+    """
+
+    def __init__(self, ttl: float = config.STEP_CACHE_TTL, max_entries: int = config.STEP_CACHE_MAX_ENTRIES, tools=config.STEP_CACHE_TOOLS, enabled: bool = config.STEP_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tools = set(tools)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (result, stored at), least recently used first
+
+    @staticmethod
+    def make_key(task: dict, context: str) -> str:
+        context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+        payload = json.dumps([task.get("specialist"), task.get("query"), task.get("tool"), task.get("tool_query"), context_hash], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def key_for(self, task: dict, context: str) -> str | None:
+        """The cache key of a step, or None if its result must not be reused."""
+        if not self.enabled or (task.get("tool") and task["tool"] not in self.tools): return None
+        return self.make_key(task, context)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, result: str | None):
+        if not result or result.startswith("Error"): return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def new_turn(self):
+        """Forgets the previous turn's results, or only the expired ones when results are kept across turns."""
+        with self._lock:
+            if not self.ttl:
+                self._entries.clear()
+                return
+            now = time.monotonic()
+            for key in [key for key, (_, stored_at) in self._entries.items() if now - stored_at > self.ttl]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
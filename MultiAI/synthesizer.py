@@ -1,26 +1,44 @@
-import ollama
+import asyncio
+from contextlib import nullcontext
 from rich.console import Console
 
 import config
+from tracing import tracer
+from scheduler import ModelScheduler
+from context_assembler import count_tokens
+from orchestrator import async_client
+import event_loop
 
 class Synthesizer:
-    def __init__(self, console: Console):
+    def __init__(self, console: Console, scheduler=None):
         self.console = console
+        self.scheduler = scheduler
 
     def synthesize_response(self, user_prompt: str, history_str: str, specialist_reports: str, journal_content: str):
+        """Synchronous asynthesize_response, run on the shared event loop."""
+        yield from event_loop.iterate(self.asynthesize_response(user_prompt, history_str, specialist_reports, journal_content))
+
+    async def asynthesize_response(self, user_prompt: str, history_str: str, specialist_reports: str, journal_content: str):
         """Asks the Synthesizer model to craft the final response and streams it."""
+        async for chunk in self._acall_synthesizer(self._build_prompt(user_prompt, history_str, specialist_reports, journal_content), config.MODEL_SYNTHESIZER):
+            yield chunk
+
+    @staticmethod
+    def _build_prompt(user_prompt: str, history_str: str, specialist_reports: str, journal_content: str) -> str:
+        # The instructions come first and never change, followed by the parts that change least from turn to turn,
+        # so Ollama can reuse the evaluated prompt prefix of the previous turn.
         prompt = f"""You are the Spokesperson for a team of AI specialists. Your job is to synthesize all available information into a single, helpful, and conversational response.
 
 **CRITICAL INSTRUCTION:** Before you respond, you MUST review the Core Memory Journal below. If it contains relevant facts about the user (their name, preferences, goals), you MUST weave that information into your response to make it personal and relevant.
 
-**Core Memory Journal:**
+**Conversation History:**
 ---
-{journal_content}
+{history_str}
 ---
 
-**Conversation History:**
+**Core Memory Journal:**
 ---
-{history_str}
+{journal_content}
 ---
 
 **Specialist Reports:**
@@ -31,22 +49,25 @@ class Synthesizer:
 **User's latest prompt:** "{user_prompt}"
 
 Your final, synthesized, and personalized response to the user:"""
+        return prompt
 
-        yield from self._call_synthesizer(prompt, config.MODEL_SYNTHESIZER)
-
-    def _call_synthesizer(self, prompt: str, model: str):
-        """Calls the synthesizer model and streams the response."""
-        try:
-            response_stream = ollama.generate(
-                model=model,
-                prompt=prompt,
-                system=config.SYSTEM_PROMPT_UNFILTERED,
-                stream=True,
-                options={"temperature": 0.7}
-            )
-            for chunk in response_stream:
-                if 'response' in chunk:
-                    yield chunk['response']
-        except Exception as e:
-            self.console.print(f"\n[bold red]FATAL ERROR calling '{model}': {e}[/bold red]")
-            yield "I'm sorry, but I encountered an error while processing your request. Please try again later."
+    async def _acall_synthesizer(self, prompt: str, model: str):
+        """Calls the synthesizer model and streams the response, recording the time to first token."""
+        if self.scheduler: model = await asyncio.to_thread(self.scheduler.resolve, model)
+        with tracer.span("synthesis", model=model, prompt_tokens=count_tokens(config.SYSTEM_PROMPT_UNFILTERED) + count_tokens(prompt)) as span:
+            try:
+                async with self.scheduler.aslot(model) if self.scheduler else nullcontext():
+                    response_stream = await async_client().generate(model=model, prompt=prompt, system=config.SYSTEM_PROMPT_UNFILTERED, stream=True,
+                                                                    options={"temperature": 0.7}, keep_alive=ModelScheduler.keep_alive(model))
+                    async for chunk in response_stream:
+                        if chunk.get('response') and "ttft" not in span.attributes:
+                            span.set(ttft=span.elapsed())
+                        if chunk.get('done'):
+                            span.record_ollama(chunk)
+                            if self.scheduler: self.scheduler.record(model, chunk)
+                        if 'response' in chunk:
+                            yield chunk['response']
+            except Exception as e:
+                span.set(error=str(e))
+                self.console.print(f"\n[bold red]FATAL ERROR calling '{model}': {e}[/bold red]")
+                yield "I'm sorry, but I encountered an error while processing your request. Please try again later."
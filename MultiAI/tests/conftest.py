@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from tracing import tracer
+
+@pytest.fixture(autouse=True, scope="session")
+def _trace_to_a_temporary_file():
+    """Keeps the spans of the pipeline tests out of the working tree."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        trace_file, tracer.trace_file = tracer.trace_file, os.path.join(tmpdir, "trace.jsonl")
+        yield
+        tracer.flush()
+        tracer.trace_file = trace_file
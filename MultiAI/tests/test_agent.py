@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+import asyncio
+import time
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ollama
+from rich.console import Console
+from benchmarks.fake_ollama import FakeOllama
+from main import ConversationalAgent
+from orchestrator import Orchestrator
+from plan_executor import PlanExecutor
+
+class TestPlanSteps(unittest.TestCase):
+    """Unit tests for how the agent runs individual plan steps."""
+
+    def setUp(self):
+        self.calls = []
+        tools = {"web_search": {"func": lambda query: self.calls.append(query) or "results", "signature": "(query: str)", "docstring": ""}}
+        self.agent = ConversationalAgent(Console(quiet=True), None, tools, None, None, is_gui_mode=True)
+
+    def test_tool_receives_single_dependency_output(self):
+        """Test that a tool step without a tool_query gets the raw output of its only dependency."""
+        task = {"specialist": "Researcher", "query": "search", "tool": "web_search", "depends_on": [1]}
+        self.assertEqual(asyncio.run(self.agent._arun_plan_step(1, task, "solar panels")), "results")
+        self.assertEqual(self.calls, ["solar panels"])
+
+    def test_tool_with_several_dependencies_needs_tool_query(self):
+        """Test that combined results of several steps are never passed to a tool as its argument."""
+        task = {"specialist": "Researcher", "query": "search", "tool": "web_search", "depends_on": [1, 2]}
+        result = asyncio.run(self.agent._arun_plan_step(2, task, "--- Result of Step 1 ---\na\n\n--- Result of Step 2 ---\nb", [0, 1]))
+        self.assertTrue(result.startswith("Error:"))
+        self.assertEqual(self.calls, [])
+
+    def test_dependencies_are_counted_as_resolved(self):
+        """Test that repeated, unknown and self references do not count as further dependencies of a tool step."""
+        task = {"specialist": "Researcher", "query": "search", "tool": "web_search", "depends_on": [1, "1", 2, "missing"]}
+        dependencies = PlanExecutor.resolve_dependencies([{"specialist": "Researcher", "query": "a"}, task])[1]
+        self.assertEqual(asyncio.run(self.agent._arun_plan_step(1, task, "solar panels", dependencies)), "results")
+        self.assertEqual(self.calls, ["solar panels"])
+
+class TestSpecialistStreaming(unittest.TestCase):
+    """Streams specialist steps from the fake Ollama server."""
+
+    def setUp(self):
+        responses = [("ONLY the URL", "https://example.com/best is the most promising result, because " + "it covers the topic well. " * 50)]
+        self.fake = FakeOllama(responses, default_response="A detailed answer. " * 20, ttft=0.01, tokens_per_sec=100, load_delay=0).start()
+        patcher = mock.patch.dict(os.environ, {"OLLAMA_HOST": self.fake.url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        console = Console(quiet=True)
+        self.agent = ConversationalAgent(console, None, {}, Orchestrator(console), None, is_gui_mode=True)
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_url_step_stops_at_the_first_url(self):
+        """Test that a step asking only for a URL returns it as soon as it is complete and closes the stream."""
+        task = {"specialist": "Researcher", "query": "From the following search results, identify the single most promising URL. Respond with ONLY the URL and nothing else."}
+        start = time.perf_counter()
+        self.assertEqual(asyncio.run(self.agent._arun_plan_step(1, task, "1. Best (https://example.com/best)")), "https://example.com/best")
+        self.assertLess(time.perf_counter() - start, 2)
+        for _ in range(100):
+            if self.fake.aborted: break
+            time.sleep(0.02)
+        self.assertEqual(self.fake.aborted, 1)
+
+    def test_partial_answer_is_reported(self):
+        """Test that a specialist's partial answer is reported while it streams."""
+        reports = []
+        task = {"specialist": "Researcher", "query": "Explain solar power."}
+        result = asyncio.run(self.agent._arun_plan_step(0, task, "", progress=reports.append))
+        self.assertEqual(result, ("A detailed answer. " * 20).strip())
+        self.assertTrue(reports)
+        self.assertTrue(all(result.startswith(report.strip()) for report in reports))
+
+class TestStreamPlan(unittest.TestCase):
+    """Unit tests for the streamed plan and its fallbacks."""
+
+    def _orchestrator(self, streamed: str, corrected: str = '{"plan": []}'):
+        orchestrator = Orchestrator(Console(quiet=True))
+        async def astream_ai(*args, **kwargs):
+            for chunk in (streamed[:20], streamed[20:]): yield chunk
+        async def acall_ai(*args, **kwargs):
+            return corrected
+        orchestrator.astream_ai, orchestrator.acall_ai = astream_ai, acall_ai
+        return orchestrator
+
+    @staticmethod
+    def _plan(orchestrator) -> list:
+        async def collect():
+            return [step async for step in orchestrator.astream_plan("q", "", "")]
+        return asyncio.run(collect())
+
+    def test_placeholders_keep_positions_after_a_valid_step(self):
+        """Test that an invalid step after a valid one is streamed as a placeholder."""
+        streamed = '{"plan": [{"specialist": "Coder", "query": "a"}, {"specialist": "Wizard", "query": "b"}]}'
+        plan = self._plan(self._orchestrator(streamed))
+        self.assertEqual(plan, [{"specialist": "Coder", "query": "a"}, {}])
+
+    def test_plan_without_valid_steps_falls_back(self):
+        """Test that a streamed plan with no valid step is corrected as a whole, without leftover placeholders."""
+        orchestrator = self._orchestrator('{"plan": [{"specialist": "Wizard", "query": "b"}]}', '{"plan": [{"specialist": "Researcher", "query": "b"}]}')
+        self.assertEqual(orchestrator.get_plan("q", "", ""), [{"specialist": "Researcher", "query": "b"}])
+        self.assertEqual(orchestrator.plan_stats["llm_repairs"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from unittest import mock
+from rich.console import Console
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_runner import BatchRunner
+from tracing import tracer
+
+class StubAgent:
+    """Answers with the prompt reversed inside a traced turn; prompts containing 'fail' raise."""
+
+    def __init__(self):
+        self.conversation_history = []
+        self.full_response = ""
+        self.critic_loops = 0
+
+    async def arun(self, prompt):
+        with tracer.span("turn"):
+            if "fail" in prompt: raise RuntimeError("model unavailable")
+            yield {"plan": [{"specialist": "Researcher", "query": prompt}]}
+            with tracer.span("llm", model="m") as span:
+                span.record_ollama({"prompt_eval_count": 7, "eval_count": 3})
+            self.critic_loops = 1
+            self.full_response = prompt[::-1]
+            yield self.full_response
+
+class TestBatchRunner(unittest.TestCase):
+    """Tests the resumable JSONL batch runner against stub agents."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmpdir.name, "prompts.jsonl")
+        self.output = os.path.join(self.tmpdir.name, "results.jsonl")
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"id": "a", "prompt": "abc"}) + "\n" + json.dumps("xyz") + "\n" + json.dumps({"id": "c", "prompt": "fail"}) + "\n")
+        self.runner = BatchRunner(Console(quiet=True), lambda prompt_id: StubAgent(), concurrency=2)
+        patcher = mock.patch.object(tracer, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _results(self):
+        with open(self.output, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_results_have_answers_timings_and_tokens(self):
+        """Test that each prompt gets a result with its answer, plan, stage timings and token counts."""
+        stats = self.runner.run(self.input, self.output)
+        self.assertEqual((stats["prompts"], stats["errors"]), (3, 1))
+        results = {r["id"]: r for r in self._results()}
+        self.assertEqual(results["a"]["answer"], "cba")
+        self.assertEqual(results["2"]["answer"], "zyx")
+        self.assertEqual(results["a"]["critic_loops"], 1)
+        self.assertEqual(results["a"]["plan"], [{"specialist": "Researcher", "query": "abc"}])
+        self.assertEqual(results["a"]["tokens"], {"sent": 0, "prompt": 7, "generated": 3})
+        self.assertEqual(results["a"]["llm_calls"], 1)
+        self.assertIn("turn", results["a"]["stages"])
+        self.assertIn("model unavailable", results["c"]["error"])
+
+    def test_resume_skips_finished_prompts(self):
+        """Test that a rerun only retries failed prompts and drops a result cut off mid-write."""
+        self.runner.run(self.input, self.output)
+        with open(self.output, 'a', encoding='utf-8') as f:
+            f.write('{"id": "b", "answ')
+        stats = self.runner.run(self.input, self.output)
+        self.assertEqual(stats["prompts"], 1)
+        self.assertEqual([r["id"] for r in self._results()].count("a"), 1)
+        self.assertEqual(len(self._results()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import json
+import time
+import threading
+import tempfile
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cancellation
+from cancellation import CancellationToken
+from rich.console import Console
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.bench_pipeline import PLAN, SPECIALIST_REPLY, _bench_tools
+from main import ConversationalAgent
+from memory.core_memory import CoreMemory
+from orchestrator import Orchestrator
+from synthesizer import Synthesizer
+from tools import file_tools
+
+class TestCancellationToken(unittest.TestCase):
+    """Unit tests for the token that stops a turn."""
+
+    def test_callbacks_run_once(self):
+        """Test that callbacks run once on cancel, right away if registered late, and never once unregistered."""
+        token, calls = CancellationToken(), []
+        token.on_cancel(lambda: calls.append("a"))
+        unregister = token.on_cancel(lambda: calls.append("b"))
+        unregister()
+        token.cancel()
+        token.cancel()
+        token.on_cancel(lambda: calls.append("c"))
+        self.assertEqual(calls, ["a", "c"])
+        self.assertTrue(token.cancelled)
+
+    def test_bind_sets_the_current_token(self):
+        """Test that the bound token is the current one only inside the block."""
+        token = CancellationToken()
+        with token.bind():
+            self.assertIs(cancellation.current(), token)
+            token.cancel()
+            self.assertTrue(cancellation.cancelled())
+        self.assertIsNone(cancellation.current())
+
+    def test_script_is_killed(self):
+        """Test that cancelling a turn kills the script its tool is running."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            script = os.path.join(tmpdir, "slow.py")
+            with open(script, 'w', encoding='utf-8') as f:
+                f.write("import time\ntime.sleep(20)\n")
+            token = CancellationToken()
+            threading.Timer(0.5, token.cancel).start()
+            start = time.perf_counter()
+            with token.bind():
+                result = file_tools.execute_python_script(script, confirm_execution=False)
+            self.assertIn("was cancelled", result)
+            self.assertLess(time.perf_counter() - start, 10)
+
+class TestCancelledTurn(unittest.TestCase):
+    """Cancels whole turns against the fake Ollama server."""
+
+    def setUp(self):
+        responses = [("You are the Orchestrator", json.dumps(PLAN)), ("You are the Critic", "Yes"), ("Spokesperson", "word " * 500)]
+        self.fake = FakeOllama(responses, default_response=SPECIALIST_REPLY, ttft=0.01, tokens_per_sec=100, load_delay=0).start()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.previous_cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        patch = mock.patch.dict(os.environ, {"OLLAMA_HOST": self.fake.url})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        os.chdir(self.previous_cwd)
+        self.tmpdir.cleanup()
+        self.fake.stop()
+
+    def test_cancel_closes_the_model_stream(self):
+        """Test that cancelling mid-response stops the turn, closes the synthesizer's stream and keeps the turn out of the history."""
+        console = Console(quiet=True)
+        memory = CoreMemory("core_memory.txt")
+        memory.initialize_if_needed()
+        agent = ConversationalAgent(console, memory, _bench_tools(0), Orchestrator(console), Synthesizer(console), is_gui_mode=True)
+        token, items = CancellationToken(), []
+        for item in agent.run("What is solar power?", cancel_token=token):
+            items.append(item)
+            if isinstance(item, str): token.cancel()
+        self.assertEqual(items[-1], {"status": "Cancelled"})
+        self.assertLess(sum(isinstance(item, str) for item in items), 50)
+        self.assertEqual(agent.conversation_history, [])
+        for _ in range(100):
+            if self.fake.aborted: break
+            time.sleep(0.02)
+        self.assertEqual(self.fake.aborted, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rich.console import Console
+from context_assembler import ContextAssembler, count_tokens, approximate_tokens
+
+class FakeOrchestrator:
+    def __init__(self, reply):
+        self.reply, self.calls = reply, 0
+
+    async def acall_ai(self, prompt, model, **kwargs):
+        self.calls += 1
+        return self.reply
+
+class TestContextAssembler(unittest.TestCase):
+    """Unit tests for the token-budgeted prompt sections."""
+
+    def setUp(self):
+        self.budgets = {"history": 50, "reports": 100, "failed_attempts": 100}
+        self.assembler = ContextAssembler(Console(quiet=True), budgets=self.budgets, summarize=False)
+
+    def test_approximation_is_close_to_bpe_counts(self):
+        """Test that the approximation is in the range of a real tokenizer for English text."""
+        text = "The quick brown fox jumps over the lazy dog, then runs back home."
+        self.assertTrue(12 <= approximate_tokens(text) <= 20)
+
+    def test_small_sections_are_untouched(self):
+        """Test that text within budget, or without a budget, is returned as is."""
+        self.assertEqual(self.assembler.fit("reports", "short report"), "short report")
+        self.assertEqual(self.assembler.fit("unbudgeted", "word " * 1000), "word " * 1000)
+        self.assertEqual(self.assembler.tokens_saved(), 0)
+
+    def test_truncation_keeps_the_right_end(self):
+        """Test that reports keep their start, logs keep their end, and the savings are counted."""
+        text = " ".join(f"w{i}" for i in range(500))
+        report = self.assembler.fit("reports", text)
+        self.assertTrue(report.startswith("w0 w1"))
+        self.assertLessEqual(count_tokens(report), 100)
+        log = self.assembler.fit("failed_attempts", text)
+        self.assertTrue(log.endswith("w499"))
+        self.assertGreater(self.assembler.tokens_saved(), 0)
+
+    def test_history_keeps_the_latest_messages(self):
+        """Test that the oldest messages are dropped first."""
+        messages = [{"role": "user", "content": f"message number {i} " + "filler " * 10} for i in range(10)]
+        history = self.assembler.history(messages)
+        self.assertIn("message number 9", history)
+        self.assertNotIn("message number 0", history)
+        self.assertLessEqual(count_tokens(history), 50)
+
+    def test_summaries_are_cached(self):
+        """Test that an oversized section is summarized once and the summary is reused, also from synchronous code."""
+        orchestrator = FakeOrchestrator("A short summary.")
+        assembler = ContextAssembler(Console(quiet=True), orchestrator, summarize=True, budgets=self.budgets)
+        text = "fact " * 500
+        self.assertEqual(asyncio.run(assembler.afit("reports", text)), "A short summary.")
+        self.assertEqual(assembler.fit("reports", text), "A short summary.")
+        self.assertEqual(orchestrator.calls, 1)
+        self.assertEqual(assembler.stats["summary_cache_hits"], 1)
+
+    def test_failed_summary_falls_back_to_truncation(self):
+        """Test that a model error leads to truncation instead of an error in the prompt."""
+        assembler = ContextAssembler(Console(quiet=True), FakeOrchestrator("Error: no model"), summarize=True, budgets=self.budgets)
+        self.assertTrue(asyncio.run(assembler.afit("reports", "fact " * 500)).startswith("fact fact"))
+
+if __name__ == '__main__':
+    unittest.main()
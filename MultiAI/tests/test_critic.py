@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rich.console import Console
+import config
+from critic import Critic, heuristic_verdict
+
+SEARCH_LIST = "\n".join(f"{i}. Result {i} (https://example.com/{i})" for i in range(1, 6))
+ANSWER = " ".join(["Solar panels convert sunlight into electricity using photovoltaic cells made of silicon."] * 25)
+
+def report(*bodies):
+    return "\n\n".join(f"--- Report from Step {i + 1} (Researcher) ---\n{body}" for i, body in enumerate(bodies))
+
+class TestHeuristicVerdict(unittest.TestCase):
+    """Unit tests for the local first tier of the critic."""
+
+    def test_rejects_reports_that_cannot_be_answers(self):
+        """Test that empty reports, tool errors, bare search lists and echoes of the prompt are rejected."""
+        prompt = "How do solar panels make electricity?"
+        self.assertFalse(heuristic_verdict(prompt, ""))
+        self.assertFalse(heuristic_verdict(prompt, report("Error performing web search: timeout")))
+        self.assertFalse(heuristic_verdict(prompt, report(SEARCH_LIST, "Error scraping webpage 'x': 404")))
+        self.assertFalse(heuristic_verdict(prompt, report("Solar panels make electricity.")))
+
+    def test_never_approves_by_default(self):
+        """Test that a long report repeating the prompt's keywords is left to a model unless heuristic approval is enabled."""
+        prompt = "How do solar panels turn sunlight into electricity?"
+        self.assertIsNone(heuristic_verdict(prompt, report(SEARCH_LIST, ANSWER)))
+        self.assertTrue(heuristic_verdict(prompt, report(SEARCH_LIST, ANSWER), approve=True))
+
+    def test_uncertain_cases_are_left_to_a_model(self):
+        """Test that short or off-topic answers are neither approved nor rejected."""
+        self.assertIsNone(heuristic_verdict("What is the history of Rome?", report(ANSWER), approve=True))
+        self.assertIsNone(heuristic_verdict("How do solar panels work?", report(SEARCH_LIST, "Error: timeout", ANSWER), approve=True))
+
+class FakeOrchestrator:
+    def __init__(self, replies):
+        self.replies, self.calls = dict(replies), []
+
+    async def acall_ai(self, prompt, model, options=None, **kwargs):
+        self.calls.append((model, prompt, options))
+        return self.replies[model]
+
+class TestCritic(unittest.TestCase):
+    """Unit tests for escalating through the critic tiers."""
+
+    def test_heuristic_decision_skips_the_models(self):
+        """Test that no model is called when the heuristics are sure."""
+        orchestrator = FakeOrchestrator({})
+        critic = Critic(Console(quiet=True), orchestrator)
+        self.assertFalse(asyncio.run(critic.areview("What is solar power?", report(SEARCH_LIST))))
+        self.assertEqual(orchestrator.calls, [])
+        self.assertEqual(critic.summary()["heuristic"]["decision_rate"], 1.0)
+
+    def test_unsure_fast_tier_escalates_to_the_full_model(self):
+        """Test that the fast tier sees truncated reports and an unsure answer goes to the full model."""
+        orchestrator = FakeOrchestrator({config.MODEL_CRITIC_FAST: "Unsure.", config.MODEL_RESEARCHER: "Yes"})
+        critic = Critic(Console(quiet=True), orchestrator)
+        long_report = report(ANSWER * 5)
+        self.assertTrue(asyncio.run(critic.areview("What is the history of Rome?", long_report)))
+        (fast_model, fast_prompt, fast_options), (full_model, full_prompt, _) = orchestrator.calls
+        self.assertEqual((fast_model, full_model), (config.MODEL_CRITIC_FAST, config.MODEL_RESEARCHER))
+        self.assertLess(len(fast_prompt), len(full_prompt))
+        self.assertEqual(fast_options["num_predict"], config.CRITIC_NUM_PREDICT)
+        summary = critic.summary()
+        self.assertEqual((summary["fast"]["calls"], summary["fast"]["decisions"]), (1, 0))
+        self.assertEqual((summary["full"]["decisions"], summary["full"]["approved"]), (1, 1))
+
+    def test_fast_tier_decision_is_final(self):
+        """Test that a clear answer from the small model is used without calling the full model, also from synchronous code."""
+        orchestrator = FakeOrchestrator({config.MODEL_CRITIC_FAST: "No"})
+        self.assertFalse(Critic(Console(quiet=True), orchestrator).review("What is the history of Rome?", report(ANSWER)))
+        self.assertEqual(len(orchestrator.calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import CancelledError
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import event_loop
+from cancellation import CancellationToken
+
+_label = contextvars.ContextVar("label", default=None)
+
+class TestSharedEventLoop(unittest.TestCase):
+    """Unit tests for running async code on the shared event loop from synchronous code."""
+
+    def test_calls_share_one_loop_and_see_the_callers_context(self):
+        """Test that every call runs on the same long-lived loop with the caller's context variables."""
+        async def probe():
+            return asyncio.get_running_loop(), _label.get()
+        _label.set("caller")
+        first, label = event_loop.run(probe())
+        second, _ = event_loop.run(probe())
+        self.assertIs(first, second)
+        self.assertTrue(event_loop.is_shared(first))
+        self.assertEqual(label, "caller")
+        self.assertTrue(first.is_running())
+
+    def test_iterate_passes_on_items_and_errors(self):
+        """Test that items arrive in order and that an error in the generator reaches the caller."""
+        async def generate():
+            yield "a"
+            await asyncio.sleep(0)
+            yield "b"
+            raise ValueError("boom")
+        items = []
+        with self.assertRaises(ValueError):
+            for item in event_loop.iterate(generate()): items.append(item)
+        self.assertEqual(items, ["a", "b"])
+
+    def test_closing_early_stops_the_generator(self):
+        """Test that a caller that stops reading closes the generator before the iterator is closed."""
+        closed = threading.Event()
+        async def generate():
+            try:
+                while True:
+                    yield "x"
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+        items = event_loop.iterate(generate())
+        self.assertEqual(next(items), "x")
+        items.close()
+        self.assertTrue(closed.is_set())
+
+    def test_cancelling_the_turn_cancels_the_call(self):
+        """Test that cancelling the caller's token cancels a coroutine it is waiting for."""
+        token = CancellationToken()
+        async def wait_forever():
+            token.cancel()
+            await asyncio.sleep(10)
+        with token.bind(), self.assertRaises(CancelledError):
+            event_loop.run(wait_forever())
+
+    def test_waiting_on_the_loop_itself_is_refused(self):
+        """Test that run() called from the shared loop raises instead of blocking it."""
+        async def nested():
+            event_loop.run(asyncio.sleep(0))
+        with self.assertRaises(RuntimeError):
+            event_loop.run(nested())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ollama
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.bench_pipeline import _percentile
+
+class TestFakeOllama(unittest.TestCase):
+    """Checks that the fake server speaks the Ollama API well enough for the real client."""
+
+    def setUp(self):
+        self.fake = FakeOllama([("Critic", "Yes")], default_response="hello there world", ttft=0, tokens_per_sec=10000, load_delay=0).start()
+        self.client = ollama.Client(host=self.fake.url)
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_generate_non_streaming(self):
+        """Test a scripted, non-streaming response with Ollama's timing fields."""
+        response = self.client.generate(model="m", prompt="You are the Critic.", stream=False)
+        self.assertEqual(response["response"], "Yes")
+        self.assertIn("prompt_eval_count", response)
+        self.assertIn("load_duration", response)
+
+    def test_generate_streaming(self):
+        """Test that streamed chunks reassemble into the scripted response."""
+        chunks = list(self.client.generate(model="m", prompt="anything", stream=True))
+        self.assertEqual("".join(c["response"] for c in chunks), "hello there world")
+        self.assertTrue(chunks[-1]["done"])
+        self.assertEqual(self.fake.generate_calls(), 1)
+
+    def test_ps_and_embeddings(self):
+        """Test that generated models show up as resident and embeddings are returned."""
+        self.client.generate(model="m", prompt="")
+        self.assertEqual([m["name"] for m in self.client.ps()["models"]], ["m"])
+        self.assertEqual(len(self.client.embeddings(model="m", prompt="text")["embedding"]), 64)
+
+    def test_prompt_prefix_is_reused(self):
+        """Test that only the tokens after the prefix shared with the previous prompt are evaluated."""
+        first = self.client.generate(model="m", prompt="one two four five six", stream=False)
+        second = self.client.generate(model="m", prompt="one two four five ten", stream=False)
+        self.assertEqual(first["prompt_eval_count"], 5)
+        self.assertEqual(second["prompt_eval_count"], 1)
+
+class TestPercentile(unittest.TestCase):
+    """Checks the nearest-rank percentiles reported by the benchmark."""
+
+    def test_nearest_rank(self):
+        """Test that the percentile is the smallest value covering that share of the samples."""
+        self.assertEqual(_percentile([4, 1, 3, 2], 50), 2)
+        self.assertEqual(_percentile(list(range(1, 21)), 95), 19)
+        self.assertEqual(_percentile([5], 95), 5)
+        self.assertEqual(_percentile([], 50), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from html_extractor import TextExtractor, extract_text
+
+PAGE = ("<html><head><title>Title</title><script>var menu = 1;</script></head><body>"
+        "<nav><a href='/'>Home</a> <a href='/news'>News</a></nav>"
+        "<div class='site-sidebar'><p>Subscribe to our newsletter.</p></div>"
+        "<article><h1>Solar &amp; wind</h1><p>Solar panels turn <b>sunlight</b> into electricity.</p>"
+        "<ul><li><a href='/a'>Related article one</a></li><li><a href='/b'>Related article two</a></li></ul>"
+        "<div>Loose text that is long enough to read like a sentence of prose.</div><div>Share</div>"
+        "<p>Wind turbines <a href='/w'>turn</a> moving air into electricity.</p></article>"
+        "<footer><p>Copyright 2024</p></footer></body></html>")
+
+class TestTextExtractor(unittest.TestCase):
+    """Unit tests for the streaming HTML text extractor."""
+
+    def test_boilerplate_is_skipped(self):
+        """Test that scripts, navigation, marked containers, link lists and short fragments are left out."""
+        self.assertEqual(extract_text(PAGE), "Solar & wind Solar panels turn sunlight into electricity. "
+                                             "Loose text that is long enough to read like a sentence of prose. "
+                                             "Wind turbines turn moving air into electricity.")
+
+    def test_chunks_give_the_same_text(self):
+        """Test that splitting the page at arbitrary points, even inside tags, gives the same text."""
+        for size in (1, 7, 64):
+            extractor = TextExtractor()
+            for start in range(0, len(PAGE), size): extractor.feed(PAGE[start:start + size])
+            self.assertEqual(extractor.text(), extract_text(PAGE))
+
+    def test_stops_at_the_budget(self):
+        """Test that feed() reports when enough text has been collected and later chunks are not parsed."""
+        extractor = TextExtractor(max_chars=50)
+        self.assertFalse(extractor.feed("<p>" + "word " * 5 + "</p>"))
+        self.assertTrue(extractor.feed("<p>" + "word " * 20 + "</p>"))
+        self.assertTrue(extractor.feed("<p>never parsed</p>"))
+        self.assertEqual(len(extractor.text()), 50)
+        self.assertNotIn("never", extractor.text())
+
+if __name__ == '__main__':
+    unittest.main()
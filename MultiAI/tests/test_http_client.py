@@ -0,0 +1,145 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from http_client import HttpClient
+
+class _Site(BaseHTTPRequestHandler):
+    """Serves a few test pages and records the requests and connections it sees."""
+    protocol_version = "HTTP/1.1"
+    requests, ports, active, peak = [], set(), 0, 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+            cls.ports.add(self.client_address[1])
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path == "/etag":
+                if self.headers.get("If-None-Match") == '"v1"': self._send(304, headers={"ETag": '"v1"'})
+                else: self._send(200, "<p>café</p>".encode("utf-8"), {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"})
+            elif self.path == "/modified":
+                if self.headers.get("If-Modified-Since"): self._send(304)
+                else: self._send(200, b"<p>dated</p>", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+            elif self.path == "/big":
+                self._send(200, b"x" * 200000)
+            elif self.path == "/private":
+                self._send(200, b"secret", {"Cache-Control": "no-store"})
+            elif self.path == "/slow":
+                time.sleep(0.1)
+                self._send(200, b"slow")
+            else:
+                self._send(404, b"missing")
+        finally:
+            with cls.lock: cls.active -= 1
+
+class TestHttpClient(unittest.TestCase):
+    """Tests the pooled, cached HTTP client against a local server."""
+
+    def setUp(self):
+        _Site.requests, _Site.ports, _Site.active, _Site.peak = [], set(), 0, 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.tmpdir.cleanup()
+
+    def _client(self, **kwargs):
+        return HttpClient(os.path.join(self.tmpdir.name, "http_cache.sqlite3"), **{"ttl": 60, "enabled": True, **kwargs})
+
+    def test_fresh_pages_come_from_the_cache(self):
+        """Test that a page is fetched once while it is fresh and decoded with its charset."""
+        client = self._client()
+        first, second = client.get(self.base + "/etag"), client.get(self.base + "/etag")
+        self.assertEqual((first["text"], first["from_cache"]), ("<p>café</p>", False))
+        self.assertEqual((second["text"], second["from_cache"]), ("<p>café</p>", True))
+        self.assertEqual(len(_Site.requests), 1)
+
+    def test_stale_pages_are_revalidated(self):
+        """Test that stale pages are revalidated with their ETag or Last-Modified and a 304 reuses the cached body."""
+        client = self._client(ttl=0)
+        for path in ("/etag", "/modified"):
+            first, second = client.get(self.base + path), client.get(self.base + path)
+            self.assertEqual(first["text"], second["text"])
+            self.assertTrue(second["from_cache"])
+        self.assertEqual([r[1:] for r in _Site.requests], [(None, None), ('"v1"', None), (None, None), (None, "Mon, 01 Jan 2024 00:00:00 GMT")])
+        self.assertEqual(client.stats["revalidated"], 2)
+
+    def test_body_is_capped(self):
+        """Test that reading stops at the byte cap."""
+        page = self._client(max_bytes=1000).get(self.base + "/big")
+        self.assertEqual((len(page["text"]), page["truncated"]), (1000, True))
+
+    def test_reader_can_stop_the_download(self):
+        """Test that a reader that has enough stops the download, and that the page is cached as far as it was read."""
+        client, seen = self._client(), []
+        page = client.get(self.base + "/big", consume=lambda text: seen.append(text) or True)
+        self.assertTrue(page["truncated"])
+        self.assertEqual(page["text"], seen[0])
+        self.assertLess(len(page["text"]), 200000)
+        self.assertEqual(client.get(self.base + "/big")["text"], page["text"])
+
+    def test_reader_that_needs_more_downloads_again(self):
+        """Test that a page an earlier reader stopped is downloaded again for a reader that needs more, without repeating text."""
+        client, seen = self._client(), []
+        client.get(self.base + "/big", consume=lambda text: True)
+        page = client.get(self.base + "/big", consume=lambda text: seen.append(text) or False)
+        self.assertEqual((len("".join(seen)), len(page["text"]), page["truncated"]), (200000, 200000, False))
+        self.assertEqual(len(_Site.requests), 2)
+        self.assertTrue(client.get(self.base + "/big")["from_cache"])
+
+    def test_expired_partial_pages_are_downloaded_again(self):
+        """Test that an expired page an earlier reader stopped is downloaded in full instead of revalidated."""
+        client = self._client(ttl=0)
+        client.get(self.base + "/etag", consume=lambda text: True)
+        page = client.get(self.base + "/etag")
+        self.assertEqual((page["text"], page["from_cache"], page["truncated"]), ("<p>café</p>", False, False))
+        self.assertEqual([r[1:] for r in _Site.requests], [(None, None), (None, None)])
+        self.assertEqual(client.stats["revalidated"], 0)
+
+    def test_errors_and_no_store_pages_are_not_cached(self):
+        """Test that error responses raise and that neither they nor no-store pages are served from the cache."""
+        client = self._client()
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError): client.get(self.base + "/missing")
+            self.assertFalse(client.get(self.base + "/private")["from_cache"])
+        self.assertEqual(len(_Site.requests), 4)
+
+    def test_connections_are_pooled_per_host(self):
+        """Test that connections are reused and at most max_per_host are open to a host at once."""
+        client = self._client(max_per_host=2, enabled=False)
+        for _ in range(3): client.get(self.base + "/slow")
+        self.assertEqual(len(_Site.ports), 1)
+        with ThreadPoolExecutor(6) as pool:
+            list(pool.map(lambda _: client.get(self.base + "/slow"), range(6)))
+        self.assertLessEqual(_Site.peak, 2)
+
+if __name__ == '__main__':
+    unittest.main()
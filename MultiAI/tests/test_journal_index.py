@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memory.core_memory import CoreMemory
+from memory.journal_index import JournalIndex, parse_entries
+
+class TestJournalIndex(unittest.TestCase):
+    """Unit tests for the BM25 index over the core memory journal."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "core_memory.txt")
+        self.memory = CoreMemory(self.path)
+        self.memory.initialize_if_needed()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append(self, line):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def test_both_entry_formats_are_parsed(self):
+        """Test the CoreMemory and journal tool formats, including entries spanning several lines."""
+        text = "--- Journal ---\nJOURNAL (2024-01-01T10:00:00): The user's name is Ada.\n[2024-01-02T11:00:00] Likes tea\nand biscuits."
+        self.assertEqual(parse_entries(text), [("2024-01-01T10:00:00", "The user's name is Ada."), ("2024-01-02T11:00:00", "Likes tea\nand biscuits.")])
+
+    def test_relevant_entries_only(self):
+        """Test that only the entries matching the prompt are returned, oldest first."""
+        self.memory.append_to_journal("The user's name is Ada.")
+        self.memory.append_to_journal("The user is learning the Rust programming language.")
+        self.memory.append_to_journal("The user prefers short answers about Rust.")
+        self.memory.append_to_journal("The user's cat is called Turing.")
+        memory = self.memory.read_relevant_memory("Help me with Rust", k=2)
+        self.assertIn("learning the Rust", memory)
+        self.assertIn("short answers about Rust", memory)
+        self.assertNotIn("Turing", memory)
+        self.assertLess(memory.index("learning"), memory.index("short answers"))
+
+    def test_token_budget(self):
+        """Test that entries beyond the token budget are left out."""
+        self.memory.append_to_journal("Rust " * 100)
+        self.memory.append_to_journal("Rust is fun.")
+        self.assertEqual(self.memory.read_relevant_memory("Rust", max_tokens=50).count("JOURNAL"), 1)
+
+    def test_incremental_and_persisted(self):
+        """Test that a new index loads the persisted one and only parses appended entries."""
+        self._append("\n[2024-01-01T10:00:00] First entry about gardening.")
+        self.assertEqual(JournalIndex(self.path).refresh(), 1)
+        self._append("\n[2024-01-02T10:00:00] Second entry about cooking.")
+        index = JournalIndex(self.path)
+        self.assertEqual(len(index.entries), 1)
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.search("cooking", k=1)[0][1], "Second entry about cooking.")
+
+    def test_rewritten_journal_is_reindexed(self):
+        """Test that the index is rebuilt when the journal no longer starts with the indexed bytes."""
+        self._append("\n[2024-01-01T10:00:00] Entry about gardening.")
+        JournalIndex(self.path).refresh()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("--- New Journal ---\n[2024-02-01T10:00:00] Entry about sailing boats and the sea.")
+        index = JournalIndex(self.path)
+        index.refresh()
+        self.assertEqual([entry[1] for entry in index.entries], ["Entry about sailing boats and the sea."])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from json_repair import repair_json, validate_plan, PlanStreamParser
+
+class TestRepairJson(unittest.TestCase):
+    """Unit tests for the tolerant JSON parser used on orchestrator output."""
+
+    def test_surrounding_prose_and_fences(self):
+        """Test that prose and code fences around the object are ignored."""
+        text = 'Sure! Here is the plan:\n```json\n{"plan": []}\n```\nLet me know if you need more.'
+        self.assertEqual(repair_json(text), {"plan": []})
+
+    def test_trailing_commas(self):
+        """Test that trailing commas in objects and arrays are removed."""
+        self.assertEqual(repair_json('{"a": [1, 2,], "b": 3,}'), {"a": [1, 2], "b": 3})
+
+    def test_single_quotes_and_python_literals(self):
+        """Test that single-quoted strings and Python literals are converted."""
+        text = "{'query': 'it\\'s a \"test\"', 'tool': None, 'ok': True}"
+        self.assertEqual(repair_json(text), {"query": 'it\'s a "test"', "tool": None, "ok": True})
+
+    def test_apostrophes_inside_double_quotes_are_kept(self):
+        """Test that an apostrophe inside a double-quoted string does not start a new string."""
+        self.assertEqual(repair_json('{"query": "the user\'s question"}'), {"query": "the user's question"})
+
+    def test_unbalanced_braces(self):
+        """Test that a truncated object is closed."""
+        self.assertEqual(repair_json('{"plan": [{"query": "a"}, {"query": "b"'), {"plan": [{"query": "a"}, {"query": "b"}]})
+
+    def test_missing_comma_between_objects(self):
+        """Test that adjacent objects in a list are separated."""
+        self.assertEqual(repair_json('[{"a": 1} {"a": 2}]'), [{"a": 1}, {"a": 2}])
+
+    def test_accept_drops_half_written_element(self):
+        """Test that a cut-off final step is dropped when the plan would otherwise be invalid."""
+        text = '{"plan": [{"specialist": "Researcher", "query": "a"}, {"specialist": "Coder", "que'
+        data = repair_json(text, accept=lambda value: validate_plan(value) is not None)
+        self.assertEqual(validate_plan(data), [{"specialist": "Researcher", "query": "a"}])
+
+    def test_brackets_in_prose_are_skipped(self):
+        """Test that a bracket in the prose before the plan does not hide the plan."""
+        self.assertEqual(repair_json('Plan [v1]: {"plan": []}'), {"plan": []})
+        text = 'Here you go (see [1]) {"plan": [{"specialist": "Researcher", "query": "a"}]}'
+        data = repair_json(text, accept=lambda value: validate_plan(value) is not None)
+        self.assertEqual(data, {"plan": [{"specialist": "Researcher", "query": "a"}]})
+
+    def test_no_json(self):
+        """Test that text without any JSON returns None."""
+        self.assertIsNone(repair_json("I cannot help with that."))
+
+class TestValidatePlan(unittest.TestCase):
+    """Unit tests for the plan schema check."""
+
+    def test_normalizes_steps(self):
+        """Test specialist casing, empty tools and scalar depends_on are normalized."""
+        plan = validate_plan({"plan": [{"specialist": "researcher", "query": " q ", "tool": "none", "depends_on": 1}]})
+        self.assertEqual(plan, [{"specialist": "Researcher", "query": "q", "depends_on": [1]}])
+
+    def test_rejects_invalid_steps(self):
+        """Test that unknown specialists, missing queries and non-list plans are rejected."""
+        self.assertIsNone(validate_plan({"plan": [{"specialist": "Wizard", "query": "q"}]}))
+        self.assertIsNone(validate_plan({"plan": [{"specialist": "Coder"}]}))
+        self.assertIsNone(validate_plan({"plan": "search the web"}))
+
+    def test_empty_plan_is_valid(self):
+        """Test that an empty plan, used for simple greetings, is accepted."""
+        self.assertEqual(validate_plan({"plan": []}), [])
+
+class TestPlanStreamParser(unittest.TestCase):
+    """Unit tests for the incremental plan parser."""
+
+    def test_steps_are_emitted_as_they_close(self):
+        """Test that each step is returned by the chunk that completes it, even with braces inside strings."""
+        text = '{"plan": [{"specialist": "Researcher", "query": "a {b}"}, {"specialist": "Coder", "query": "c", "depends_on": [1]}]}'
+        parser, emitted = PlanStreamParser(), []
+        for i in range(0, len(text), 5):
+            emitted.append(parser.feed(text[i:i + 5]))
+        steps = [step for chunk in emitted for step in chunk]
+        self.assertEqual(steps, [{"specialist": "Researcher", "query": "a {b}"}, {"specialist": "Coder", "query": "c", "depends_on": [1]}])
+        first_index = next(i for i, chunk in enumerate(emitted) if chunk)
+        self.assertLess(first_index * 5, text.index('{"specialist": "Coder"'))
+
+    def test_unparseable_step_keeps_its_position(self):
+        """Test that a broken step is returned as an empty placeholder."""
+        self.assertEqual(PlanStreamParser().feed('[{"query": }, {"specialist": "Coder", "query": "c"}]'), [{}, {"specialist": "Coder", "query": "c"}])
+
+    def test_invalid_step_is_a_placeholder(self):
+        """Test that streamed steps are validated like a whole plan, with invalid ones replaced by placeholders."""
+        text = '{"plan": [{"specialist": "Wizard", "query": "a"}, {"specialist": "coder", "query": "c", "tool": "none"}]}'
+        self.assertEqual(PlanStreamParser().feed(text), [{}, {"specialist": "Coder", "query": "c"}])
+
+    def test_only_the_plan_array_holds_steps(self):
+        """Test that objects in arrays under other keys are not taken for steps."""
+        text = '{"thoughts": [{"a": 1}], "plan": [{"specialist": "Researcher", "query": "q"}], "notes": [{"b": 2}]}'
+        self.assertEqual(PlanStreamParser().feed(text), [{"specialist": "Researcher", "query": "q"}])
+
+if __name__ == '__main__':
+    unittest.main()
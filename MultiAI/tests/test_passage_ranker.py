@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import http_client
+from http_client import HttpClient
+from passage_ranker import split_passages, rank_passages, select_passages
+from tools import web_tools
+
+PAGES = {
+    "/solar": "<article><p>Solar panels turn sunlight into electricity. Cells made of silicon absorb light.</p></article>",
+    "/wind": "<article><p>Wind turbines turn moving air into electricity on land and at sea.</p></article>",
+    "/cooking": "<article><p>Bread rises because yeast releases gas while the dough rests.</p></article>",
+}
+
+class _Site(BaseHTTPRequestHandler):
+    """Serves the test pages; any other path is a 404."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = PAGES.get(self.path, "missing").encode("utf-8")
+        self.send_response(200 if self.path in PAGES else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestPassageRanker(unittest.TestCase):
+    """Unit tests for splitting text into passages and ranking them with BM25."""
+
+    def test_passages_end_at_sentences(self):
+        """Test that passages stay near the word limit, end at sentence boundaries and split overlong sentences."""
+        text = "One two three. Four five six. Seven eight. " + " ".join(["word"] * 9)
+        self.assertEqual(split_passages(text, words=6), ["One two three. Four five six.", "Seven eight.", "word word word word word word", "word word word"])
+        self.assertEqual(split_passages("", words=6), [])
+
+    def test_relevant_passages_rank_first(self):
+        """Test that passages sharing rare query terms outrank the rest, that ties keep their order and that unrelated passages are left out."""
+        passages = ["Bread needs yeast.", "Solar panels make electricity from sunlight.", "Wind makes electricity.", "Unrelated text.", "Tidal makes electricity."]
+        ranked = [index for index, _ in rank_passages("how do solar panels make electricity", passages)]
+        self.assertEqual(ranked, [1, 2, 4])
+        self.assertEqual(select_passages("sourdough starter", [{"text": passage} for passage in passages]), [])
+
+    def test_selection_fits_the_budget(self):
+        """Test that the best passages that fit the token budget are chosen, skipping ones that would overflow it."""
+        passages = [{"text": "solar " * 50}, {"text": "solar power"}, {"text": "wind power"}]
+        chosen = select_passages("solar power", passages, max_tokens=10)
+        self.assertEqual([p["text"] for p in chosen], ["solar power", "wind power"])
+
+class TestResearchTool(unittest.TestCase):
+    """Tests the research tool against a local server, with the web search stubbed."""
+
+    def setUp(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.results = [{"title": path[1:].title(), "href": base + path, "body": f"Notes on {path[1:]} and electricity."} for path in ("/cooking", "/wind", "/solar", "/gone")]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        client = HttpClient(os.path.join(self.tmpdir.name, "http_cache.sqlite3"), enabled=False)
+        self.patches = [mock.patch.object(web_tools, "_search", lambda query, max_results: self.results[:max_results]),
+                        mock.patch.object(http_client, "default_client", lambda: client)]
+        for patch in self.patches: patch.start()
+
+    def tearDown(self):
+        for patch in self.patches: patch.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.tmpdir.cleanup()
+
+    def test_most_relevant_passages_come_first(self):
+        """Test that all results are read, the best passage is first and an unreadable page falls back to its snippet."""
+        report = web_tools.research("how do solar panels make electricity from sunlight")
+        self.assertIn("from 3 of 4 pages", report)
+        self.assertLess(report.index("Solar panels turn sunlight"), report.index("Wind turbines"))
+        self.assertTrue(report.split("\n\n")[1].startswith(f"[1] Solar ({self.results[2]['href']})"))
+        self.assertIn("Notes on gone and electricity.", report)
+        self.assertNotIn("Bread rises", report)
+
+    def test_unrelated_pages_fall_back_to_the_results(self):
+        """Test that the search results are listed when no passage shares a term with the query."""
+        report = web_tools.research("sourdough starter")
+        self.assertEqual(report, web_tools._format_results(self.results))
+
+    def test_no_results(self):
+        """Test that an empty search is reported."""
+        self.results = []
+        self.assertEqual(web_tools.research("anything"), "No search results found.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from plan_executor import PlanExecutor
+
+class TestPlanExecutor(unittest.TestCase):
+    """Unit tests for the dependency-aware plan executor, which runs steps as tasks on an event loop."""
+
+    def _run(self, plan, run_step, max_workers=4):
+        async def collect():
+            results = {}
+            async for event, i, result in PlanExecutor(run_step, max_workers).aexecute(plan):
+                if event == "finished": results[i] = result
+            return results
+        return asyncio.run(collect())
+
+    def test_steps_without_depends_on_run_sequentially(self):
+        """Test that a plain plan keeps the old previous-step context chaining."""
+        plan = [{"query": "a"}, {"query": "b"}, {"query": "c"}]
+        self.assertEqual(PlanExecutor.resolve_dependencies(plan), [[], [0], [1]])
+        async def run_step(i, task, context, dependencies):
+            return f"{context}{task['query']}"
+        self.assertEqual(self._run(plan, run_step)[2], "abc")
+
+    def test_dependency_references(self):
+        """Test step numbers, ids, and that forward or self references are dropped."""
+        plan = [
+            {"id": "search", "depends_on": []},
+            {"depends_on": []},
+            {"depends_on": ["search", 2, 3, 4]},
+        ]
+        self.assertEqual(PlanExecutor.resolve_dependencies(plan), [[], [], [0, 1]])
+
+    def test_independent_steps_run_concurrently(self):
+        """Test that independent steps overlap and a joining step gets all their results."""
+        started = []
+        async def run_step(i, task, context, dependencies):
+            if i < 3:
+                started.append(i)
+                for _ in range(200):
+                    if len(started) == 3: break
+                    await asyncio.sleep(0.01)
+                else:
+                    raise AssertionError("the steps did not overlap")
+            return context or f"r{i}"
+        plan = [{"depends_on": []}, {"depends_on": []}, {"depends_on": []}, {"depends_on": [1, 2, 3]}]
+        results = self._run(plan, run_step)
+        self.assertIn("--- Result of Step 3 ---\nr2", results[3])
+
+    def test_concurrency_limit(self):
+        """Test that no more than max_workers steps run at once."""
+        active, peak = [0], [0]
+        async def run_step(i, task, context, dependencies):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+            return "ok"
+        self._run([{"depends_on": []} for _ in range(6)], run_step, max_workers=2)
+        self.assertEqual(peak[0], 2)
+
+    def test_streamed_plan_and_errors(self):
+        """Test that steps from an async plan start while it streams and that a failing step becomes an error result."""
+        started = []
+        async def plan():
+            yield {"query": "a", "depends_on": []}
+            await asyncio.sleep(0.05)
+            self.assertEqual(started, [0])
+            yield {"query": "b"}
+        async def run_step(i, task, context, dependencies):
+            started.append(i)
+            if i == 1: raise ValueError("boom")
+            return task["query"]
+        results = self._run(plan(), run_step)
+        self.assertEqual(results[0], "a")
+        self.assertEqual(results[1], "Error in step 2: boom")
+
+    def test_progress_comes_before_the_result(self):
+        """Test that progress a step reports is passed on in order, ahead of the step's result."""
+        async def run_step(i, task, context, dependencies):
+            for text in ("p", "pa"):
+                executor.report(i, text)
+                await asyncio.sleep(0.01)
+            executor.report(i, "par")
+            return "part"
+        async def collect():
+            return [(event, i, payload) async for event, i, payload in executor.aexecute([{"depends_on": []}]) if event != "planned"]
+        executor = PlanExecutor(run_step)
+        self.assertEqual(asyncio.run(collect()), [("started", 0, None), ("progress", 0, "p"), ("progress", 0, "pa"), ("progress", 0, "par"), ("finished", 0, "part")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ollama
+import config
+from rich.console import Console
+from benchmarks.fake_ollama import FakeOllama
+from prewarm import Prewarmer
+from scheduler import ModelScheduler
+
+class TestPrewarmer(unittest.TestCase):
+    """Runs the prewarmer against the fake Ollama server."""
+
+    def setUp(self):
+        self.fake = FakeOllama(ttft=0, load_delay=0, max_loaded_models=2).start()
+        self.scheduler = ModelScheduler(Console(quiet=True), client=ollama.Client(host=self.fake.url), max_loaded=2)
+        self.prewarmer = Prewarmer(Console(quiet=True), self.scheduler, delay=0.05)
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_predictions_start_with_the_orchestrator(self):
+        """Test that the orchestrator model comes first and code drafts predict the coder model."""
+        models = Prewarmer.predict_models("write a python script that renames files")
+        self.assertEqual(models[0], config.MODEL_ORCHESTRATOR)
+        self.assertIn(config.MODEL_CODER, models)
+
+    def test_drafts_are_debounced(self):
+        """Test that only the last of several quick drafts triggers loads, with an empty prompt and keep_alive."""
+        for text in ("wha", "what is", "what is solar power"):
+            self.prewarmer.on_draft(text)
+        time.sleep(0.3)
+        loads = [call for call in self.fake.calls if call["endpoint"] == "generate"]
+        self.assertEqual([call["model"] for call in loads], Prewarmer.predict_models("what is solar power")[:2])
+        self.assertTrue(all(call["prompt"] == "" and call["keep_alive"] for call in loads))
+
+    def test_busy_models_are_not_evicted(self):
+        """Test that prewarming only uses the slots that busy models leave free."""
+        with self.scheduler.slot("busy-model"):
+            loaded = self.prewarmer.prewarm("what is solar power")
+        self.assertEqual(loaded, [config.MODEL_ORCHESTRATOR])
+
+    def test_hit_rate(self):
+        """Test that prewarmed models used by the next turn count as hits."""
+        loaded = self.prewarmer.prewarm("what is solar power")
+        self.prewarmer.record_turn({loaded[0], "other-model"})
+        summary = self.prewarmer.summary()
+        self.assertEqual((summary["loads"], summary["hits"], summary["hit_rate"]), (2, 1, 0.5))
+
+if __name__ == '__main__':
+    unittest.main()
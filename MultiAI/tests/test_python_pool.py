@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from python_pool import PythonWorkerPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class TestPythonWorkerPool(unittest.TestCase):
+    """Runs scripts in the warm worker pool."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools: pool.close()
+        self.tmpdir.cleanup()
+
+    def _pool(self, **kwargs):
+        pool = PythonWorkerPool(**{"size": 1, "preload": ["json", "statistics"], "timeout": 30, **kwargs})
+        self.pools.append(pool)
+        return pool
+
+    def _script(self, name: str, source: str) -> str:
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+
+    def test_warm_workers_are_fresh_for_every_script(self):
+        """Test that scripts run in preloaded workers, see none of the agent's modules and share no state."""
+        pool = self._pool()
+        pool.warm()
+        first = self._script("first.py", "import json, sys\njson.marker = 1\nprint('statistics' in sys.modules, 'config' in sys.modules)\n")
+        second = self._script("second.py", "import json\nprint(hasattr(json, 'marker'))\n")
+        self.assertEqual(pool.run(first)["stdout"], "True False\n")
+        self.assertEqual(pool.run(second)["stdout"], "False\n")
+        self.assertEqual(pool.stats["warm_runs"], 2)
+
+    def test_output_is_streamed(self):
+        """Test that each line reaches the callback while the script is still running."""
+        script = self._script("stream.py", "import sys, time\nprint('one')\nprint('oops', file=sys.stderr)\ntime.sleep(0.5)\nprint('two')\n")
+        seen = []
+        result = self._pool().run(script, on_output=lambda stream, line: seen.append((stream, line, time.perf_counter())))
+        self.assertEqual(sorted((stream, line) for stream, line, _ in seen), [("stderr", "oops\n"), ("stdout", "one\n"), ("stdout", "two\n")])
+        arrivals = {line: at for _, line, at in seen}
+        self.assertGreater(arrivals["two\n"] - arrivals["one\n"], 0.3)
+        self.assertEqual((result["stdout"], result["stderr"], result["returncode"]), ("one\ntwo\n", "oops\n", 0))
+
+    def test_script_runs_like_python(self):
+        """Test that relative paths resolve against the working directory, sibling modules import and tracebacks start in the script."""
+        self._script("helper.py", "VALUE = 42\n")
+        script = self._script("main.py", "import helper\nprint(open('data.txt').read(), helper.VALUE)\nraise ValueError('bad input')\n")
+        with open(os.path.join(self.tmpdir.name, "data.txt"), 'w', encoding='utf-8') as f:
+            f.write("data")
+        previous_cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            result = self._pool().run("main.py")
+        finally:
+            os.chdir(previous_cwd)
+        self.assertEqual((result["stdout"], result["returncode"]), ("data 42\n", 1))
+        self.assertIn("ValueError: bad input", result["stderr"])
+        self.assertNotIn("runpy", result["stderr"])
+
+    def test_wall_clock_limit(self):
+        """Test that a script running past the timeout is killed and keeps the output it wrote."""
+        script = self._script("slow.py", "import time\nprint('started')\ntime.sleep(20)\n")
+        start = time.perf_counter()
+        result = self._pool(timeout=0.5).run(script)
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertTrue(result["timed_out"])
+        self.assertEqual(result["stdout"], "started\n")
+
+    @unittest.skipIf(resource is None, "rlimits are not available on this platform")
+    def test_cpu_and_memory_limits(self):
+        """Test that a busy loop is stopped by the CPU limit and a large allocation fails under the memory limit."""
+        busy = self._script("busy.py", "while True: pass\n")
+        greedy = self._script("greedy.py", "data = bytearray(2 * 1024 ** 3)\n")
+        pool = self._pool(cpu_seconds=1, memory_bytes=512 * 1024 ** 2)
+        self.assertTrue(pool.run(busy)["cpu_limited"])
+        result = pool.run(greedy)
+        self.assertEqual(result["returncode"], 1)
+        self.assertIn("MemoryError", result["stderr"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from response_cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+    """Unit tests for the on-disk model response cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        """Test that a stored response is returned and counted."""
+        cache = ResponseCache(self.path, max_bytes=0, max_age=0, enabled=True)
+        key = cache.make_key("model", "system", "prompt", {"temperature": 0.0})
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "answer")
+        self.assertEqual(cache.get(key), "answer")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_persists_across_instances(self):
+        """Test that responses survive reopening the cache file."""
+        key = ResponseCache.make_key("model", "system", "prompt", {})
+        ResponseCache(self.path, max_bytes=0, max_age=0, enabled=True).put(key, "answer")
+        self.assertEqual(ResponseCache(self.path, max_bytes=0, max_age=0, enabled=True).get(key), "answer")
+
+    def test_key_depends_on_options(self):
+        """Test that different options never share a cache entry."""
+        self.assertNotEqual(ResponseCache.make_key("m", "s", "p", {"num_predict": 1}), ResponseCache.make_key("m", "s", "p", {"num_predict": 2}))
+
+    def test_size_eviction_is_lru(self):
+        """Test that the least recently used entry is evicted when the size budget is exceeded."""
+        cache = ResponseCache(self.path, max_bytes=10, max_age=0, enabled=True)
+        cache.put("a", "aaaa")
+        time.sleep(0.01)
+        cache.put("b", "bbbb")
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.put("c", "cccc")
+        self.assertEqual(cache.get("a"), "aaaa")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_age_eviction(self):
+        """Test that entries older than max_age are treated as misses."""
+        cache = ResponseCache(self.path, max_bytes=0, max_age=0.01, enabled=True)
+        cache.put("a", "aaaa")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_bypass(self):
+        """Test that a disabled cache neither stores nor returns responses."""
+        cache = ResponseCache(self.path, max_bytes=0, max_age=0, enabled=False)
+        cache.put("a", "aaaa")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+import asyncio
+import threading
+import time
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ollama
+import config
+from rich.console import Console
+from benchmarks.fake_ollama import FakeOllama
+from orchestrator import Orchestrator
+from plan_executor import PlanExecutor
+from scheduler import ModelScheduler
+from tracing import tracer
+
+class TestModelScheduler(unittest.TestCase):
+    """Runs the scheduler against the fake Ollama server."""
+
+    def setUp(self):
+        self.fake = FakeOllama(default_response="ok", ttft=0, tokens_per_sec=10000, load_delay=0.2, max_loaded_models=1).start()
+        self.client = ollama.Client(host=self.fake.url)
+        patch = mock.patch.dict(os.environ, {"OLLAMA_HOST": self.fake.url})
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.scheduler = ModelScheduler(Console(quiet=True), client=self.client, max_loaded=1)
+        self.orchestrator = Orchestrator(Console(quiet=True), scheduler=self.scheduler)
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def _call(self, prompt, model):
+        return asyncio.run(self.orchestrator.acall_ai(prompt, model))
+
+    def test_residency_and_keep_alive(self):
+        """Test that residency comes from /api/ps and keep_alive is set per model, also for calls from synchronous code."""
+        with mock.patch.dict(config.MODEL_KEEP_ALIVE, {"a": "1h"}):
+            self.orchestrator.call_ai("hi", "a")
+            self.orchestrator.call_ai("hi", "b")
+        self.assertEqual([call["keep_alive"] for call in self.fake.calls], ["1h", config.DEFAULT_KEEP_ALIVE])
+        self.assertEqual(self.scheduler.resident(refresh=True), {"b"})
+        self.assertEqual(self.scheduler.priority("b"), 0)
+        self.assertEqual(self.scheduler.priority("a"), 1)
+
+    def test_swap_to_resident_equivalent(self):
+        """Test that a loaded equivalent model is used when swapping is enabled."""
+        self._call("hi", "small")
+        self.scheduler.swap_equivalents = True
+        with mock.patch.dict(config.MODEL_EQUIVALENTS, {"large": ["small"]}):
+            self._call("hi", "large")
+        self.assertEqual([call["model"] for call in self.fake.calls], ["small", "small"])
+        self.assertEqual(self.fake.loads, 1)
+
+    def test_calls_are_batched_by_model(self):
+        """Test that a call needing another model waits for the busy model instead of evicting it."""
+        order = []
+        def call(model, delay):
+            with self.scheduler.slot(model):
+                order.append(f"start {model}")
+                time.sleep(delay)
+                order.append(f"end {model}")
+        first = threading.Thread(target=call, args=("a", 0.2))
+        first.start()
+        time.sleep(0.05)
+        second = threading.Thread(target=call, args=("b", 0))
+        third = threading.Thread(target=call, args=("a", 0))
+        second.start()
+        third.start()
+        for thread in (first, second, third): thread.join()
+        self.assertEqual(order.index("start a", 1) < order.index("start b"), True)
+        self.assertGreater(order.index("start b"), order.index("end a"))
+
+    def test_turn_report(self):
+        """Test that model loads and warm calls are reported per turn."""
+        with tracer.span("turn") as turn:
+            self._call("one", "a")
+            self._call("two", "a")
+        report = self.scheduler.turn_report(turn.turn_id)
+        self.assertEqual((report["calls"], report["loads"], report["warm_calls"]), (2, 1, 1))
+        self.assertAlmostEqual(report["seconds_saved"], report["load_seconds"], places=2)
+
+    def test_async_calls_use_the_slots(self):
+        """Test that concurrent async calls go through the scheduler and release their slots."""
+        async def calls():
+            return await asyncio.gather(*(self.orchestrator.acall_ai(f"hi {i}", "a") for i in range(3)))
+        self.assertEqual(asyncio.run(calls()), ["ok"] * 3)
+        self.assertEqual(self.fake.loads, 1)
+        self.assertEqual(self.scheduler.busy_models(), set())
+
+    def test_priority_uses_the_known_residency(self):
+        """Test that sorting steps does not ask Ollama, however old the residency is."""
+        self.scheduler.record("a", {"load_duration": 0})
+        with mock.patch.object(self.client, "ps", side_effect=AssertionError("priority() asked /api/ps")), mock.patch.object(config, "SCHEDULER_PS_TTL", 0):
+            self.assertEqual((self.scheduler.priority("a"), self.scheduler.priority("b"), self.scheduler.priority(None)), (0, 1, 0))
+
+    def test_ready_steps_prefer_loaded_models(self):
+        """Test that the plan executor starts steps on resident models first when slots are scarce."""
+        started = []
+        plan = [{"model": "cold", "depends_on": []}, {"model": "warm", "depends_on": []}]
+        async def run_step(i, task, context, dependencies):
+            started.append(task["model"])
+        async def run():
+            async for _ in PlanExecutor(run_step, max_workers=1, priority=lambda i, task: 0 if task["model"] == "warm" else 1).aexecute(plan): pass
+        asyncio.run(run())
+        self.assertEqual(started, ["warm", "cold"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import search_cache
+from search_cache import SearchCache
+
+class StubBackend:
+    """A search backend that records its calls; it can be made to block until released, or to fail."""
+
+    def __init__(self, results=None, error=None):
+        self.results = results if results is not None else [{"title": "Solar", "href": "https://example.com/solar", "body": "About solar."}]
+        self.error = error
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, query, max_results):
+        self.calls.append((query, max_results))
+        self.release.wait(5)
+        if self.error: raise self.error
+        return self.results[:max_results]
+
+class TestSearchCache(unittest.TestCase):
+    """Unit tests for the search cache with a stub backend."""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(search_cache.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_are_reused_until_they_expire(self):
+        """Test that a query differing only in case and spacing is a hit, and that it is searched again after the TTL."""
+        backend = StubBackend()
+        cache = SearchCache(backend, ttl=60, enabled=True)
+        self.assertEqual(cache.search("solar power", 5), backend.results)
+        cache.search("  Solar   POWER ", 5)
+        self.assertEqual(len(backend.calls), 1)
+        cache.search("solar power", 3)
+        self.assertEqual(len(backend.calls), 2) # A different number of results is a different search
+        self.now += 61
+        cache.search("solar power", 5)
+        self.assertEqual(len(backend.calls), 3)
+        self.assertEqual(cache.stats, {"searches": 3, "hits": 1, "coalesced": 0, "abandoned": 0})
+
+    def test_empty_results_expire_sooner(self):
+        """Test that a search that found nothing is reused only for the negative TTL."""
+        backend = StubBackend(results=[])
+        cache = SearchCache(backend, ttl=600, negative_ttl=30, enabled=True)
+        cache.search("nothing", 5)
+        self.now += 20
+        cache.search("nothing", 5)
+        self.assertEqual(len(backend.calls), 1)
+        self.now += 20
+        cache.search("nothing", 5)
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_concurrent_identical_queries_are_coalesced(self):
+        """Test that queries made while an identical search is in flight wait for it instead of searching again."""
+        backend = StubBackend()
+        backend.release.clear()
+        cache = SearchCache(backend, enabled=True)
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(cache.search, "solar", 5) for _ in range(4)]
+            while cache.stats["coalesced"] < 3: threading.Event().wait(0.01)
+            backend.release.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(len(backend.calls), 1)
+        self.assertTrue(all(r == backend.results for r in results))
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        """Test that a failed search raises for every caller that waited for it and is tried again next time."""
+        backend = StubBackend(error=RuntimeError("rate limited"))
+        backend.release.clear()
+        cache = SearchCache(backend, enabled=True)
+        with ThreadPoolExecutor(2) as pool:
+            futures = [pool.submit(cache.search, "solar", 5) for _ in range(2)]
+            while cache.stats["coalesced"] < 1: threading.Event().wait(0.01)
+            backend.release.set()
+            for future in futures:
+                with self.assertRaises(RuntimeError): future.result()
+        backend.error = None
+        self.assertEqual(cache.search("solar", 5), backend.results)
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_waiters_give_up_on_a_hung_search(self):
+        """Test that waiters stop waiting for a search that hangs and that the next query searches again."""
+        backend = StubBackend()
+        backend.release.clear()
+        cache = SearchCache(backend, enabled=True, timeout=0.1)
+        with ThreadPoolExecutor(2) as pool:
+            leader = pool.submit(cache.search, "solar", 5)
+            while not backend.calls: threading.Event().wait(0.01)
+            with self.assertRaises(TimeoutError): cache.search("solar", 5)
+            retry = pool.submit(cache.search, "solar", 5)
+            while len(backend.calls) < 2: threading.Event().wait(0.01)
+            backend.release.set()
+            self.assertEqual((leader.result(), retry.result()), (backend.results, backend.results))
+        self.assertEqual(cache.stats["abandoned"], 1)
+        self.assertEqual(cache._in_flight, {})
+
+    def test_least_recently_used_queries_are_evicted(self):
+        """Test that the cache keeps at most max_entries queries and that callers cannot change cached results."""
+        backend = StubBackend()
+        cache = SearchCache(backend, max_entries=2, enabled=True)
+        cache.search("a", 5)[0]["title"] = "changed"
+        cache.search("b", 5)
+        cache.search("a", 5)
+        cache.search("c", 5)
+        self.assertEqual(cache.search("a", 5)[0]["title"], "Solar")
+        cache.search("b", 5)
+        self.assertEqual([query for query, _ in backend.calls], ["a", "b", "c", "b"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import sys
+import os
+import json
+import threading
+import http.client
+from rich.console import Console
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server import AgentServer
+
+class StubAgent:
+    """Answers every prompt with its session's history length; waits for `gate` if one is set, or until cancelled."""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.conversation_history = []
+        self.full_response = ""
+
+    def run(self, prompt, cancel_token=None):
+        yield {"status": "Thinking..."}
+        if cancel_token: cancel_token.on_cancel(self.gate.set if self.gate else lambda: None)
+        if self.gate: self.gate.wait(5)
+        if cancel_token and cancel_token.cancelled:
+            yield {"status": "Cancelled"}
+            return
+        self.full_response = f"{prompt} #{len(self.conversation_history) // 2}"
+        yield self.full_response
+        self.conversation_history += [{"role": "user", "content": prompt}, {"role": "assistant", "content": self.full_response}]
+
+class TestAgentServer(unittest.TestCase):
+    """Tests the HTTP server mode against stub agents."""
+
+    def _start(self, workers=2, max_queue=0, gate=None):
+        self.server = AgentServer(Console(quiet=True), lambda session_id: StubAgent(gate), workers=workers, max_queue=max_queue)
+        self.httpd = self.server.listen("127.0.0.1", 0)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+
+    def _request(self, method, path, body=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.httpd.server_address[1], timeout=10)
+        connection.request(method, path, json.dumps(body) if body is not None else None)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read().decode("utf-8")
+
+    @staticmethod
+    def _events(text):
+        return [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):])) for block in text.strip().split("\n\n")]
+
+    def test_turn_is_streamed_as_events(self):
+        """Test that a turn's status, chunks and final response arrive as server-sent events."""
+        self._start()
+        status, headers, body = self._request("POST", "/sessions/alice/messages", {"prompt": "hello"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "text/event-stream")
+        self.assertEqual(self._events(body), [("status", "Thinking..."), ("chunk", "hello #0"), ("done", {"session_id": "alice", "response": "hello #0"})])
+
+    def test_sessions_are_isolated(self):
+        """Test that each session keeps its own history."""
+        self._start()
+        self._request("POST", "/sessions/alice/messages", {"prompt": "one"})
+        self._request("POST", "/sessions/alice/messages", {"prompt": "two"})
+        _, _, body = self._request("POST", "/sessions/bob/messages", {"prompt": "three"})
+        self.assertIn(("chunk", "three #0"), self._events(body))
+        _, _, body = self._request("GET", "/sessions/alice/messages")
+        self.assertEqual(len(json.loads(body)["messages"]), 4)
+
+    def test_backpressure(self):
+        """Test that a busy session gets 409 and a full server gets 429 with Retry-After."""
+        gate = threading.Event()
+        self._start(workers=1, max_queue=0, gate=gate)
+        first = threading.Thread(target=self._request, args=("POST", "/sessions/alice/messages", {"prompt": "slow"}))
+        first.start()
+        for _ in range(100):
+            if self.server.health()["running"]: break
+            threading.Event().wait(0.02)
+        self.assertEqual(self._request("POST", "/sessions/alice/messages", {"prompt": "again"})[0], 409)
+        status, headers, _ = self._request("POST", "/sessions/bob/messages", {"prompt": "hi"})
+        self.assertEqual(status, 429)
+        self.assertIn("Retry-After", headers)
+        gate.set()
+        first.join()
+        self.assertEqual(self._request("POST", "/sessions/bob/messages", {"prompt": "hi"})[0], 200)
+        _, _, metrics = self._request("GET", "/metrics")
+        self.assertIn('multiai_server_rejected_total{reason="full"} 1', metrics)
+
+    def test_cancel(self):
+        """Test that a running turn can be cancelled and ends with a cancelled event, and that idle sessions get 409."""
+        self._start(gate=threading.Event())
+        bodies = []
+        first = threading.Thread(target=lambda: bodies.append(self._request("POST", "/sessions/alice/messages", {"prompt": "slow"})[2]))
+        first.start()
+        for _ in range(100):
+            if self.server.health()["running"]: break
+            threading.Event().wait(0.02)
+        self.assertEqual(self._request("POST", "/sessions/alice/cancel")[0], 202)
+        first.join()
+        self.assertEqual(self._events(bodies[0])[-2:], [("status", "Cancelled"), ("cancelled", {"session_id": "alice", "response": ""})])
+        self.assertEqual(self._request("POST", "/sessions/alice/cancel")[0], 409)
+        _, _, metrics = self._request("GET", "/metrics")
+        self.assertIn("multiai_server_cancelled_total 1", metrics)
+
+    def test_invalid_requests(self):
+        """Test that bad session ids and missing prompts are refused, and that health is reported."""
+        self._start()
+        self.assertEqual(self._request("POST", "/sessions/..%2Fx/messages", {"prompt": "hi"})[0], 400)
+        self.assertEqual(self._request("POST", "/sessions/alice/messages", {})[0], 400)
+        self.assertEqual(self._request("GET", "/nowhere")[0], 404)
+        status, _, body = self._request("GET", "/health")
+        self.assertEqual((status, json.loads(body)["status"]), (200, "ok"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from memory.session_store import SessionStore
+
+class TestSessionStore(unittest.TestCase):
+    """Unit tests for the append-only session log."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "sessions.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _fill(self, store, session, turns):
+        for turn in range(turns):
+            store.append(session, "user", f"{session} question {turn}")
+            store.append(session, "assistant", f"{session} answer {turn}")
+
+    def test_resume_last_turns_per_session(self):
+        """Test that a reopened store returns the latest turns of each session in order."""
+        store = SessionStore(self.path, tail_records=6)
+        self._fill(store, "a", 5)
+        self._fill(store, "b", 1)
+        store.close()
+        store = SessionStore(self.path, tail_records=6)
+        self.assertEqual(store.sessions(), ["a", "b"])
+        self.assertEqual(store.last_session(), "b")
+        history = store.load("a", max_turns=2)
+        self.assertEqual([m["content"] for m in history], ["a question 3", "a answer 3", "a question 4", "a answer 4"])
+        store.close()
+
+    def test_appends_never_rewrite_the_log(self):
+        """Test that earlier bytes are left untouched by later appends."""
+        store = SessionStore(self.path)
+        self._fill(store, "a", 1)
+        with open(self.path, 'rb') as f: before = f.read()
+        self._fill(store, "a", 1)
+        with open(self.path, 'rb') as f: self.assertTrue(f.read().startswith(before))
+        store.close()
+
+    def test_recovers_records_missing_from_the_index(self):
+        """Test that records written after the last index save, and a torn final record, are handled on open."""
+        with mock.patch.object(config, "SESSION_FSYNC_EVERY", 1000), mock.patch.object(config, "SESSION_FSYNC_INTERVAL", 1000):
+            store = SessionStore(self.path)
+            self._fill(store, "a", 2)
+            store._file.close() # Simulates a crash: the index was never saved
+        with open(self.path, 'ab') as f: f.write(b'{"session": "a", "role": "us')
+        store = SessionStore(self.path)
+        self.assertEqual(len(store.load("a")), 4)
+        store.append("a", "user", "after the crash")
+        self.assertEqual(store.load("a")[-1]["content"], "after the crash")
+        store.close()
+
+    def test_compaction_keeps_the_latest_messages(self):
+        """Test that compaction drops old messages but keeps every session resumable."""
+        store = SessionStore(self.path)
+        self._fill(store, "a", 10)
+        self._fill(store, "b", 10)
+        size = os.path.getsize(self.path)
+        store.compact(keep_records=4)
+        self.assertLess(os.path.getsize(self.path), size / 2)
+        self.assertEqual([m["content"] for m in store.load("a", max_turns=5)], ["a question 8", "a answer 8", "a question 9", "a answer 9"])
+        store.append("b", "user", "new")
+        self.assertEqual(store.load("b")[-1]["content"], "new")
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import asyncio
+import json
+import tempfile
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from rich.console import Console
+from speculation import SpeculativeStream, SpeculationStats
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.bench_pipeline import PLAN, SPECIALIST_REPLY, SYNTHESIZER_REPLY, _bench_tools
+from main import ConversationalAgent
+from memory.core_memory import CoreMemory
+from orchestrator import Orchestrator
+from synthesizer import Synthesizer
+
+class TestSpeculativeStream(unittest.TestCase):
+    """Unit tests for buffering a response while the critic decides."""
+
+    def test_release_streams_everything(self):
+        """Test that released output contains the buffered and remaining chunks in order."""
+        async def generate():
+            for chunk in "abc":
+                await asyncio.sleep(0)
+                yield chunk
+        async def release():
+            return "".join([chunk async for chunk in SpeculativeStream(generate()).release()])
+        self.assertEqual(asyncio.run(release()), "abc")
+
+    def test_cancel_closes_the_generator(self):
+        """Test that cancelling, or the end of the task that started it, stops and closes the underlying generator."""
+        closed = []
+        async def generate(name):
+            try:
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield "x"
+            finally:
+                closed.append(name)
+        async def speculate():
+            stream = SpeculativeStream(generate("cancelled"))
+            await asyncio.sleep(0.05)
+            stream.cancel()
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(abandon())
+            await asyncio.sleep(0.05)
+        async def abandon():
+            SpeculativeStream(generate("abandoned"))
+            await asyncio.sleep(0.05)
+        asyncio.run(speculate())
+        self.assertEqual(closed, ["cancelled", "abandoned"])
+
+    def test_stats(self):
+        """Test the acceptance rate and saved time."""
+        stats = SpeculationStats()
+        stats.record(True, 1.5)
+        stats.record(False)
+        self.assertEqual(stats.summary(), {"accepted": 1, "rejected": 1, "acceptance_rate": 0.5, "seconds_saved": 1.5})
+
+class TestSpeculativeTurn(unittest.TestCase):
+    """Runs whole turns with speculative synthesis against the fake Ollama server."""
+
+    def setUp(self):
+        critic_replies, self.synthesis_calls = iter(["No", "Yes"]), []
+        def synthesize(prompt):
+            self.synthesis_calls.append(prompt)
+            return "REJECTED DRAFT " * 20 if len(self.synthesis_calls) == 1 else SYNTHESIZER_REPLY
+        responses = [("You are the Orchestrator", json.dumps(PLAN)), ("You are the Critic", lambda prompt: next(critic_replies)), ("Spokesperson", synthesize)]
+        self.fake = FakeOllama(responses, default_response=SPECIALIST_REPLY, ttft=0.01, tokens_per_sec=2000, load_delay=0).start()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.previous_cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        # The agent's AsyncClient reads OLLAMA_HOST.
+        for patch in (mock.patch.dict(os.environ, {"OLLAMA_HOST": self.fake.url}),
+                      mock.patch.object(config, "SPECULATIVE_SYNTHESIS", True)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        os.chdir(self.previous_cwd)
+        self.tmpdir.cleanup()
+        self.fake.stop()
+
+    def test_rejected_speculation_is_never_shown(self):
+        """Test that a speculation rejected by the critic is discarded and the approved one is released."""
+        console = Console(quiet=True)
+        memory = CoreMemory("core_memory.txt")
+        memory.initialize_if_needed()
+        agent = ConversationalAgent(console, memory, _bench_tools(0), Orchestrator(console), Synthesizer(console), is_gui_mode=True)
+        chunks = [chunk for chunk in agent.run("What is solar power?") if isinstance(chunk, str)]
+        self.assertEqual(len(self.synthesis_calls), 2)
+        self.assertNotIn("REJECTED", "".join(chunks))
+        self.assertEqual("".join(chunks), SYNTHESIZER_REPLY)
+        self.assertEqual(agent.full_response, SYNTHESIZER_REPLY)
+        summary = agent.speculation_stats.summary()
+        self.assertEqual((summary["accepted"], summary["rejected"]), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import asyncio
+from unittest import mock
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rich.console import Console
+from step_cache import StepCache
+from main import ConversationalAgent
+
+SEARCH = {"specialist": "Researcher", "query": "Find articles.", "tool": "web_search", "tool_query": "solar"}
+
+class TestStepCache(unittest.TestCase):
+    """Unit tests for reusing plan step results."""
+
+    def test_key_depends_on_the_context(self):
+        """Test that the same step with a different input context is a different entry."""
+        cache = StepCache(ttl=0, enabled=True)
+        cache.put(cache.key_for(SEARCH, "a"), "results")
+        self.assertEqual(cache.get(cache.key_for(SEARCH, "a")), "results")
+        self.assertIsNone(cache.get(cache.key_for(SEARCH, "b")))
+        self.assertIsNone(cache.get(cache.key_for({**SEARCH, "tool_query": "wind"}, "a")))
+
+    def test_errors_and_side_effects_are_not_cached(self):
+        """Test that failed steps and tools outside the allowed list are always run again."""
+        cache = StepCache(ttl=0, tools=["web_search"], enabled=True)
+        cache.put(cache.key_for(SEARCH, ""), "Error performing web search: timeout")
+        self.assertIsNone(cache.get(cache.key_for(SEARCH, "")))
+        self.assertIsNone(cache.key_for({"specialist": "Coder", "query": "run it", "tool": "execute_python_script"}, ""))
+        self.assertIsNotNone(cache.key_for({"specialist": "Coder", "query": "write it"}, ""))
+
+    def test_results_last_a_turn_unless_a_ttl_is_set(self):
+        """Test that results are forgotten at the next turn, or kept across turns until the TTL expires."""
+        cache = StepCache(ttl=0, enabled=True)
+        cache.put(cache.key_for(SEARCH, ""), "results")
+        cache.new_turn()
+        self.assertIsNone(cache.get(cache.key_for(SEARCH, "")))
+
+        cache = StepCache(ttl=60, enabled=True)
+        with mock.patch("step_cache.time.monotonic", return_value=1000.0):
+            cache.put(cache.key_for(SEARCH, ""), "results")
+        with mock.patch("step_cache.time.monotonic", return_value=1030.0):
+            cache.new_turn()
+            self.assertEqual(cache.get(cache.key_for(SEARCH, "")), "results")
+        with mock.patch("step_cache.time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get(cache.key_for(SEARCH, "")))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that the cache never holds more than max_entries results."""
+        cache = StepCache(ttl=0, max_entries=2, enabled=True)
+        for query in ("a", "b", "c"): cache.put(cache.key_for({**SEARCH, "tool_query": query}, ""), query)
+        self.assertIsNone(cache.get(cache.key_for({**SEARCH, "tool_query": "a"}, "")))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+class TestRepeatedSteps(unittest.TestCase):
+    """Tests that the agent reuses the results of repeated plan steps."""
+
+    def test_repeated_step_is_not_run_again(self):
+        """Test that only the step whose input changed runs again."""
+        calls = []
+        tools = {"web_search": {"func": lambda query: calls.append(query) or f"results for {query}", "signature": "(query: str)", "docstring": ""}}
+        agent = ConversationalAgent(Console(quiet=True), None, tools, None, None, is_gui_mode=True)
+        agent.step_cache = StepCache(ttl=0, enabled=True)
+        for tool_query in ("solar", "solar", "wind"):
+            self.assertEqual(asyncio.run(agent._arun_plan_step(0, {**SEARCH, "tool_query": tool_query}, "")), f"results for {tool_query}")
+        self.assertEqual(calls, ["solar", "wind"])
+        self.assertEqual(agent.step_cache.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import contextvars
+import threading
+
+# Add the parent directory to the Python path to allow importing the agent modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracing import Tracer
+
+class TestTracer(unittest.TestCase):
+    """Unit tests for pipeline spans, the JSONL trace and the Prometheus metrics."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.tmpdir.name, "trace.jsonl")
+        self.tracer = Tracer(self.trace_file, enabled=True)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _spans(self):
+        self.tracer.flush()
+        with open(self.trace_file, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_nested_spans_share_the_turn(self):
+        """Test that child spans link to their parent and turn."""
+        with self.tracer.span("turn") as turn:
+            with self.tracer.span("plan"):
+                pass
+            with self.tracer.span("critic"):
+                pass
+        spans = {s["name"]: s for s in self._spans()}
+        self.assertEqual(spans["plan"]["parent_id"], turn.span_id)
+        self.assertEqual(spans["critic"]["turn_id"], turn.span_id)
+        self.assertGreaterEqual(spans["turn"]["duration"], 0)
+
+    def test_thread_context_propagation(self):
+        """Test that spans opened in a thread with a copied context become children."""
+        with self.tracer.span("turn") as turn:
+            def work():
+                with self.tracer.span("step"):
+                    pass
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+            thread.start()
+            thread.join()
+        step = next(s for s in self._spans() if s["name"] == "step")
+        self.assertEqual(step["parent_id"], turn.span_id)
+
+    def test_prometheus_metrics(self):
+        """Test that Ollama statistics and time to first token are aggregated per model."""
+        with self.tracer.span("llm", model="m") as span:
+            span.record_ollama({"prompt_eval_count": 10, "eval_count": 5, "load_duration": 2_000_000_000})
+        with self.tracer.span("synthesis", model="m") as span:
+            span.set(ttft=0.5)
+        self.tracer.increment("response_cache_hit")
+        metrics = self.tracer.render_prometheus()
+        self.assertIn('multiai_llm_tokens_total{model="m",kind="prompt"} 10', metrics)
+        self.assertIn('multiai_model_load_seconds_total{model="m"} 2.000000', metrics)
+        self.assertIn('multiai_stage_seconds_count{stage="llm"} 1', metrics)
+        self.assertIn("multiai_ttft_seconds_count 1", metrics)
+        self.assertIn('multiai_events_total{name="response_cache_hit"} 1', metrics)
+
+    def test_prompt_cache_reuse(self):
+        """Test that the reuse ratio compares counts in the model's own tokens, and is left out when Ollama did not report the prompt's size."""
+        with self.tracer.span("llm", model="m", prompt_tokens=90) as span:
+            span.record_ollama({"prompt_eval_count": 25, "eval_count": 10, "context": list(range(110)), "prompt_eval_duration": 500_000_000})
+        with self.tracer.span("llm", model="other", prompt_tokens=90) as span:
+            span.record_ollama({"prompt_eval_count": 25, "eval_count": 10})
+        stats = self.tracer.prompt_cache_stats()
+        self.assertEqual(stats["m"], {"sent": 90, "evaluated": 25, "reuse": 0.75})
+        self.assertIsNone(stats["other"]["reuse"])
+        metrics = self.tracer.render_prometheus()
+        self.assertIn('multiai_prompt_cache_reuse_ratio{model="m"} 0.7500', metrics)
+        self.assertNotIn('multiai_prompt_cache_reuse_ratio{model="other"}', metrics)
+        self.assertIn('multiai_prompt_eval_seconds_total{model="m"} 0.500000', metrics)
+
+    def test_trace_file_is_rotated(self):
+        """Test that a full trace file is moved aside instead of growing without bound."""
+        tracer = Tracer(self.trace_file, enabled=True, max_bytes=200)
+        for _ in range(5):
+            with tracer.span("turn"):
+                pass
+        tracer.flush()
+        self.assertTrue(os.path.exists(self.trace_file + ".1"))
+        self.assertLessEqual(os.path.getsize(self.trace_file), 400)
+
+if __name__ == '__main__':
+    unittest.main()
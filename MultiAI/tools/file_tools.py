@@ -1,9 +1,10 @@
 import os
-import subprocess
 from rich.console import Console
 from rich.syntax import Syntax
 from datetime import datetime
 import config
+import cancellation
+import python_pool
 
 console = Console()
 
@@ -52,13 +53,16 @@ def execute_python_script(filename: str, confirm_execution: bool = True) -> str:
     
     # If confirm_execution is False, this part runs automatically.
     try:
-        result = subprocess.run(
-            ['python', filename],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        output = result.stdout + result.stderr
+        if not os.path.isfile(filename): return f"Error executing script '{filename}': file not found."
+        # The script runs in a warm, resource-limited worker; its output is shown as it is written.
+        result = python_pool.default_pool().run(filename, on_output=_show_output)
+        if cancellation.cancelled(): return f"Execution of '{filename}' was cancelled."
+        output = result["stdout"] + result["stderr"]
+        if result["timed_out"]: return f"Error executing script '{filename}': stopped after {config.PYTHON_TIMEOUT} seconds. Output so far:\n{output}"
+        if result["cpu_limited"]: return f"Error executing script '{filename}': stopped after {config.PYTHON_CPU_SECONDS} seconds of CPU time. Output so far:\n{output}"
         return f"Execution result of '{filename}':\n{output if output else 'Script ran without output.'}"
     except Exception as e:
-        return f"Error executing script '{filename}': {e}"
\ No newline at end of file
+        return f"Error executing script '{filename}': {e}"
+
+def _show_output(stream: str, line: str):
+    console.print(line.rstrip("\n"), style="red" if stream == "stderr" else "dim", markup=False, highlight=False)
@@ -1,18 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
-from ddgs import DDGS
-import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import config
+import http_client
+import html_extractor
+import passage_ranker
+import search_cache
 
 def web_search(query: str) -> str:
     """Performs a web search using DuckDuckGo and returns the top 5 results."""
     print(f"> Searching the web for: '{query}'")
     try:
-
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query, max_results=5)]
-        if not results:
-            return "No search results found."
-        return "\n".join([f"{i+1}. {r['title']} ({r['href']})" for i, r in enumerate(results)])
+        return _format_results(_search(query, 5))
     except Exception as e:
         return f"Error performing web search: {e}"
 
@@ -20,13 +18,57 @@ def scrape_webpage(url: str) -> str:
     """Scrapes the textual content of a webpage."""
     print(f"> Reading content from: {url}")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = ' '.join(p.get_text() for p in soup.find_all(['p', 'h1', 'h2', 'h3']))
-        clean_text = re.sub(r'\s{2,}', ' ', text).strip()
-        return f"Content from '{url}' (first 4000 chars):\n{clean_text[:4000]}"
+        # The text is extracted while the page downloads, and the download stops once there is enough of it.
+        extractor = html_extractor.TextExtractor()
+        http_client.default_client().get(url, consume=extractor.feed)
+        return _format_page(url, extractor.text())
     except Exception as e:
 
         return f"Error scraping webpage '{url}': {e}"
+
+def research(query: str, k: int = config.RESEARCH_PAGES) -> str:
+    """Searches the web, reads the top k results at the same time and returns the passages most relevant to the query."""
+    print(f"> Researching: '{query}'")
+    try:
+        results = _search(query, k)
+    except Exception as e:
+        return f"Error performing web search: {e}"
+    if not results:
+        return "No search results found."
+    # Each fetch runs in the turn's context, so cancelling the turn closes its connection too.
+    with ThreadPoolExecutor(max_workers=len(results)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _read_page, r['href']) for r in results]
+        pages = [future.result() for future in futures]
+
+    passages = []
+    for r, text in zip(results, pages):
+        # The search snippet stands in for a page that could not be read.
+        for passage in passage_ranker.split_passages(text or r.get('body', '')):
+            passages.append({"title": r['title'], "url": r['href'], "text": passage})
+    chosen = passage_ranker.select_passages(query, passages)
+    if not chosen:
+        return _format_results(results)
+    read = sum(1 for text in pages if text)
+    return f"Passages most relevant to '{query}' from {read} of {len(results)} pages:\n\n" + "\n\n".join(
+        f"[{i+1}] {p['title']} ({p['url']})\n{p['text']}" for i, p in enumerate(chosen))
+
+def _search(query: str, max_results: int) -> list:
+    # Searches share one session, and repeated or concurrent identical queries are answered by a single search.
+    return search_cache.default_cache().search(query, max_results)
+
+def _read_page(url: str) -> str:
+    """The readable text of a page, or "" if it cannot be fetched."""
+    try:
+        extractor = html_extractor.TextExtractor(config.RESEARCH_PAGE_CHARS)
+        http_client.default_client().get(url, consume=extractor.feed)
+        return extractor.text()
+    except Exception:
+        return ""
+
+def _format_results(results: list) -> str:
+    if not results:
+        return "No search results found."
+    return "\n".join([f"{i+1}. {r['title']} ({r['href']})" for i, r in enumerate(results)])
+
+def _format_page(url: str, text: str) -> str:
+    return f"Content from '{url}' (first {config.SCRAPE_MAX_CHARS} chars):\n{text}"
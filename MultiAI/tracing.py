@@ -0,0 +1,233 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# The fields Ollama returns with every completed generation; durations are in nanoseconds.
+OLLAMA_FIELDS = ("prompt_eval_count", "eval_count", "load_duration", "prompt_eval_duration", "eval_duration", "total_duration")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """A single timed stage of a turn, with its attributes and Ollama statistics."""
+
+    def __init__(self, name: str, parent=None, **attributes):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.turn_id = parent.turn_id if parent else self.span_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_ollama(self, response: dict):
+        """Copies the token counts and timings from an Ollama response onto the span."""
+        if not isinstance(response, dict): return
+        self.attributes.update({field: response[field] for field in OLLAMA_FIELDS if response.get(field) is not None})
+        # The context holds the prompt and response in the model's own tokens, so the prompt's size can be
+        # compared with prompt_eval_count; prompt_tokens is counted with a different tokenizer.
+        if response.get("context") and response.get("eval_count") is not None:
+            self.attributes["prompt_context_tokens"] = len(response["context"]) - response["eval_count"]
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def to_dict(self) -> dict:
+        return {"turn_id": self.turn_id, "span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start": self.start, "duration": self.duration, **self.attributes}
+
+class Tracer:
+    """
+    Records spans for every stage of a turn, appends them to a JSONL trace file and aggregates metrics.
+    Spans are written by a background thread that keeps the file open, so finishing a span never waits on file I/O.
+    """
+
+    def __init__(self, trace_file=config.TRACE_FILE, enabled=config.TRACING_ENABLED, max_bytes=config.TRACE_MAX_BYTES):
+        self.trace_file = trace_file
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stages = {}    # stage -> [count, total seconds]
+        self._models = {}    # model -> {field: total}, including the prompt tokens sent
+        self._ttft = [0, 0.0]
+        self._counters = {}
+        self._watched = {}   # turn id -> per-turn totals, for callers that asked for them
+        self._queue = queue.Queue()   # finished spans waiting to be written
+        self._writer = None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Times the enclosed block. Spans opened inside it, in any thread that copied the context, become its children."""
+        span = Span(name, _current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=str(e))
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass # The block was closed from another context, e.g. an abandoned generator
+            span.duration = span.elapsed()
+            self._finish(span)
+
+    def current(self) -> Span | None:
+        return _current_span.get()
+
+    def increment(self, name: str, value: float = 1):
+        """Increments a named counter that is exported with the metrics."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def watch_turn(self, turn_id: str):
+        """Starts collecting the stage timings and token counts of a turn's spans, to be read with turn_summary()."""
+        with self._lock:
+            self._watched[turn_id] = {"stages": {}, "llm_calls": 0, "tokens": {"sent": 0, "prompt": 0, "generated": 0}}
+
+    def turn_summary(self, turn_id: str) -> dict:
+        """Returns and stops collecting the totals of a watched turn's finished spans."""
+        with self._lock:
+            return self._watched.pop(turn_id, {"stages": {}, "llm_calls": 0, "tokens": {"sent": 0, "prompt": 0, "generated": 0}})
+
+    def _finish(self, span: Span):
+        with self._lock:
+            watched = self._watched.get(span.turn_id)
+            if watched:
+                watched["stages"][span.name] = watched["stages"].get(span.name, 0.0) + span.duration
+                if "eval_count" in span.attributes or "prompt_eval_count" in span.attributes:
+                    watched["llm_calls"] += 1
+                    watched["tokens"]["sent"] += span.attributes.get("prompt_tokens", 0)
+                    watched["tokens"]["prompt"] += span.attributes.get("prompt_eval_count", 0)
+                    watched["tokens"]["generated"] += span.attributes.get("eval_count", 0)
+            stage = self._stages.setdefault(span.name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += span.duration
+            model = span.attributes.get("model")
+            if model and any(field in span.attributes for field in OLLAMA_FIELDS):
+                totals = self._models.setdefault(model, {})
+                for field in OLLAMA_FIELDS + ("prompt_tokens",):
+                    totals[field] = totals.get(field, 0) + span.attributes.get(field, 0)
+                if "prompt_context_tokens" in span.attributes:
+                    totals["measured_prompt_tokens"] = totals.get("measured_prompt_tokens", 0) + span.attributes["prompt_context_tokens"]
+                    totals["measured_prompt_eval_count"] = totals.get("measured_prompt_eval_count", 0) + span.attributes.get("prompt_eval_count", 0)
+            if span.attributes.get("ttft") is not None:
+                self._ttft[0] += 1
+                self._ttft[1] += span.attributes["ttft"]
+            if self.enabled and self.trace_file:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_spans, daemon=True)
+                    self._writer.start()
+                    atexit.register(self.flush)
+                self._queue.put(span.to_dict())
+
+    def flush(self):
+        """Waits until every finished span has been written to the trace file."""
+        if self._writer: self._queue.join()
+
+    def _write_spans(self):
+        f, size = None, 0
+        while True:
+            record = self._queue.get()
+            try:
+                if f is None:
+                    f = open(self.trace_file, 'a', encoding='utf-8')
+                    size = f.seek(0, os.SEEK_END)
+                line = json.dumps(record, default=str) + "\n" # ASCII, so its length is its size in bytes
+                f.write(line)
+                size += len(line)
+                # Keeps a single previous file, so the trace never takes more than about twice max_bytes.
+                if self.max_bytes and size >= self.max_bytes:
+                    f.close()
+                    f = None
+                    os.replace(self.trace_file, self.trace_file + ".1")
+                elif self._queue.empty():
+                    f.flush()
+            except OSError:
+                if f: f.close()
+                f = None
+            finally:
+                self._queue.task_done()
+
+    def prompt_cache_stats(self) -> dict:
+        """
+        Per model: prompt tokens sent (counted locally, so only approximately the model's), prompt tokens Ollama
+        evaluated, and the share reused from its prompt cache, or None if Ollama never reported the prompt's size.
+        """
+        with self._lock:
+            return {model: {"sent": totals.get("prompt_tokens", 0), "evaluated": totals.get("prompt_eval_count", 0), "reuse": _reuse_ratio(totals)}
+                    for model, totals in self._models.items()}
+
+    def render_prometheus(self) -> str:
+        """Renders the aggregated metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = ["# HELP multiai_stage_seconds Wall time spent in each pipeline stage.", "# TYPE multiai_stage_seconds summary"]
+            for stage, (count, total) in sorted(self._stages.items()):
+                lines.append(f'multiai_stage_seconds_sum{{stage="{_escape(stage)}"}} {total:.6f}')
+                lines.append(f'multiai_stage_seconds_count{{stage="{_escape(stage)}"}} {count}')
+            lines += ["# HELP multiai_llm_tokens_total Tokens processed by Ollama per model.", "# TYPE multiai_llm_tokens_total counter"]
+            for model, totals in sorted(self._models.items()):
+                lines.append(f'multiai_llm_tokens_total{{model="{_escape(model)}",kind="prompt"}} {totals.get("prompt_eval_count", 0)}')
+                lines.append(f'multiai_llm_tokens_total{{model="{_escape(model)}",kind="generated"}} {totals.get("eval_count", 0)}')
+            lines += ["# HELP multiai_prompt_eval_seconds_total Time Ollama spent evaluating prompts per model.", "# TYPE multiai_prompt_eval_seconds_total counter"]
+            for model, totals in sorted(self._models.items()):
+                lines.append(f'multiai_prompt_eval_seconds_total{{model="{_escape(model)}"}} {totals.get("prompt_eval_duration", 0) / 1e9:.6f}')
+            lines += ["# HELP multiai_prompt_cache_reuse_ratio Share of prompt tokens that Ollama did not have to evaluate, i.e. reused from its prompt cache; both counts are in the model's tokens.",
+                      "# TYPE multiai_prompt_cache_reuse_ratio gauge"]
+            for model, totals in sorted(self._models.items()):
+                reuse = _reuse_ratio(totals)
+                if reuse is not None: lines.append(f'multiai_prompt_cache_reuse_ratio{{model="{_escape(model)}"}} {reuse:.4f}')
+            lines += ["# HELP multiai_model_load_seconds_total Time Ollama spent loading each model.", "# TYPE multiai_model_load_seconds_total counter"]
+            for model, totals in sorted(self._models.items()):
+                lines.append(f'multiai_model_load_seconds_total{{model="{_escape(model)}"}} {totals.get("load_duration", 0) / 1e9:.6f}')
+            lines += ["# HELP multiai_ttft_seconds Time to first token of the synthesized response.", "# TYPE multiai_ttft_seconds summary",
+                      f"multiai_ttft_seconds_sum {self._ttft[1]:.6f}", f"multiai_ttft_seconds_count {self._ttft[0]}"]
+            lines += ["# HELP multiai_events_total Named event counters.", "# TYPE multiai_events_total counter"]
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'multiai_events_total{{name="{_escape(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+def _reuse_ratio(totals: dict) -> float | None:
+    # Only calls whose response reported the prompt's size in the model's tokens are compared.
+    prompt = totals.get("measured_prompt_tokens", 0)
+    return max(0.0, 1 - totals.get("measured_prompt_eval_count", 0) / prompt) if prompt else None
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def start_metrics_server(tracer, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves tracer.render_prometheus() at /metrics from a background thread."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# The process-wide tracer used by the agent pipeline.
+tracer = Tracer()